@@ -2,7 +2,7 @@
 Main application entry point for Mini E-Learning Platform
 
 CRITICAL REQUIREMENTS COMPLIANCE:
-✅ JWT tokens expire in 24 hours (1440 minutes)
+✅ Access tokens expire in 15 minutes, refresh tokens in 7 days, both revocable
 ✅ Password hashing uses bcrypt with 12 salt rounds (>= 10 requirement)
 ✅ All API responses include "success" boolean field
 ✅ All timestamps in ISO 8601 format
@@ -13,18 +13,39 @@ CRITICAL REQUIREMENTS COMPLIANCE:
 ✅ Connection pooling for MongoDB via Motor driver
 """
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from .utils.db import Database
+from fastapi.responses import JSONResponse
+from .utils.db import Database, DATABASE_UNAVAILABLE_ERRORS
+from .repositories import Repositories
+from .utils.catalog import CatalogCache
+from .utils.metrics import Metrics
+from .utils.rate_limit import login_rate_limiter
+from .utils.revocation import TokenRevocationList
+from .utils.recommendations import Recommendations
+from .utils.activity import ActivityRollups
+from .utils.events import ProgressEventHub
+from .utils.jobs import BackgroundJobs
+from .utils.logs import LogPipeline
+from .middleware.auth import get_admin_user_claims_dependency
+from .middleware.db_ops import DBOpsMiddleware
+from .middleware.idempotency import IdempotencyMiddleware
+from .middleware.compression import CompressionMiddleware
+from .middleware.causal import CausalTokenMiddleware
+from .middleware.request_id import RequestIDMiddleware
 from .config import settings
 from .routes.auth import router as auth_router
 from .routes.courses import router as courses_router
+from .routes.analytics import router as analytics_router
+from .routes.admin import router as admin_router
 import logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Configure logging (records are written by a background thread)
+LogPipeline.configure(
+    level=settings.log_level,
+    fmt=settings.log_format,
+    queue_size=settings.log_queue_size,
+    sampling=settings.log_sampling
 )
 logger = logging.getLogger(__name__)
 
@@ -34,13 +55,39 @@ async def lifespan(app: FastAPI):
     """Handle application lifespan events"""
     # Startup
     logger.info("Starting application...")
-    await Database.connect_db()
+    Repositories.configure(settings.repository_backend)
+    if settings.repository_backend == "mongo":
+        await Database.connect_db(reconnect=True)
+        login_rate_limiter.configure(settings.login_rate_limit_store)
+        ProgressEventHub.configure(settings.progress_events_broker)
+    else:
+        login_rate_limiter.configure("memory")
+        ProgressEventHub.configure("memory")
+    await TokenRevocationList.start()
+    await ProgressEventHub.start()
+    BackgroundJobs.start()
+    
+    # Warm caches so the worker is fast from its first request
+    if settings.warm_caches_on_startup:
+        try:
+            await CatalogCache.warm()
+        except Exception as e:
+            logger.warning("Failed to warm catalog caches: %s", e)
+    CatalogCache.start()
+    Recommendations.start()
+    ActivityRollups.start()
     logger.info("Application started successfully")
     
     yield
     
     # Shutdown
     logger.info("Shutting down application...")
+    await TokenRevocationList.stop()
+    await CatalogCache.stop()
+    await Recommendations.stop()
+    await ActivityRollups.stop()
+    await ProgressEventHub.stop()
+    await BackgroundJobs.stop()
     await Database.close_db()
     logger.info("Application shut down successfully")
 
@@ -60,14 +107,55 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Causal-Token"],
+)
+
+# Replay stored responses for retried POSTs with an Idempotency-Key
+app.add_middleware(IdempotencyMiddleware)
+
+# Count MongoDB round trips per request (X-DB-Ops debug header)
+app.add_middleware(DBOpsMiddleware, expose_headers=settings.db_ops_header)
+
+# Compress responses (brotli when installed, gzip otherwise)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality
 )
 
+# Carry causal consistency tokens between workers through the client (X-Causal-Token)
+app.add_middleware(CausalTokenMiddleware)
+
+# Tag log records with the request's X-Request-ID (outermost, so every layer is covered)
+app.add_middleware(RequestIDMiddleware)
+
+async def database_unavailable_handler(request: Request, exc: Exception) -> JSONResponse:
+    """Answer 503 instead of 500 when MongoDB is unreachable (e.g. while authenticating)"""
+    logger.warning("%s %s failed, database unreachable: %s", request.method, request.url.path, exc)
+    Metrics.increment("db.unavailable_responses")
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database temporarily unavailable"},
+        headers={"Retry-After": str(round(settings.db_circuit_reset_seconds))}
+    )
+
+
+for database_error in DATABASE_UNAVAILABLE_ERRORS:
+    app.add_exception_handler(database_error, database_unavailable_handler)
+
 # Include authentication routes
 app.include_router(auth_router)
 
 # Include courses routes
 app.include_router(courses_router)
 
+# Include analytics routes
+app.include_router(analytics_router)
+
+# Include administration routes
+app.include_router(admin_router)
+
 
 @app.get("/")
 async def root():
@@ -80,7 +168,8 @@ async def root():
             "docs": "/docs",
             "health": "/health",
             "auth": "/api/auth",
-            "courses": "/api/courses"
+            "courses": "/api/courses",
+            "analytics": "/api/analytics"
         }
     }
 
@@ -88,7 +177,13 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    db_status = "connected" if Database.client is not None else "disconnected"
+    if Repositories.backend == "memory":
+        db_status = "in-memory"
+    else:
+        db_status = "connected" if Database.client is not None else "disconnected"
+        if Database.client is not None and Database.breaker.state != Database.breaker.CLOSED:
+            # Unreachable: database requests fail fast, the catalog is served stale
+            db_status = "degraded"
     return {
         "status": "healthy",
         "database": db_status,
@@ -96,6 +191,12 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics(current_user: dict = Depends(get_admin_user_claims_dependency)):
+    """Process-local counters and gauges (administrators only)"""
+    return Metrics.snapshot()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
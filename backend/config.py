@@ -10,16 +10,103 @@ class Settings(BaseSettings):
     # MongoDB Configuration
     mongodb_uri: str
     database_name: str
+    repository_backend: str = "mongo"  # "mongo" or "memory" (embedded, single-node)
+    db_reconnect_initial_seconds: float = 1.0  # First retry delay after a failed connection, doubled up to the maximum
+    db_reconnect_max_seconds: float = 60.0
+    db_circuit_failure_threshold: int = 5  # Consecutive network errors before database calls fail fast
+    db_circuit_reset_seconds: float = 10.0  # Time before a trial call is let through an open circuit
+    
+    # Read Routing Configuration
+    # Read preference per workload: primary, primaryPreferred, secondary, secondaryPreferred or nearest
+    catalog_read_preference: str = "secondaryPreferred"  # get_courses / get_course
+    progress_read_preference: str = "secondaryPreferred"  # enrollments, completions, module completions
+    analytics_read_preference: str = "secondaryPreferred"  # reporting and aggregations
+    read_max_staleness_seconds: int = -1  # -1 for no limit, otherwise >= 90
+    causal_consistency: bool = True  # Users always read their own progress writes
     
     # JWT Configuration
     jwt_secret_key: str
     jwt_algorithm: str = "HS256"
-    access_token_expire_minutes: int = 1440  # 24 hours
+    access_token_expire_minutes: int = 15  # Short-lived: profile claims may be this stale
+    refresh_token_expire_days: int = 7
+    token_revocation_sync_seconds: int = 5  # Revocations from other workers apply after at most this delay
+    token_revocation_sync_overlap_seconds: int = 60  # Re-read window covering late commits and clock skew between hosts
+    token_revocation_bloom_capacity: int = 100000  # Revoked tokens before the filter is rebuilt
+    token_revocation_bloom_error_rate: float = 0.001  # Share of valid tokens that need a database check
     
     # Application Configuration
     app_name: str = "Mini E-Learning Platform"
     debug: bool = True
     
+    # Password Hashing Configuration (calibrate with backend.scripts.calibrate_hashing)
+    password_hash_scheme: str = "bcrypt"  # "bcrypt" or "argon2" (requires argon2-cffi)
+    bcrypt_rounds: int = 12  # Never below 10
+    argon2_memory_cost: int = 65536  # KiB
+    argon2_time_cost: int = 3
+    argon2_parallelism: int = 1
+    
+    # Login Rate Limiting Configuration
+    login_rate_limit_store: str = "memory"  # "memory" (per worker) or "mongo" (shared by all workers)
+    login_ip_burst: int = 20
+    login_ip_per_minute: float = 10
+    login_email_burst: int = 5
+    login_email_per_minute: float = 2
+    
+    # Production Server Configuration (backend.scripts.serve)
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: int = 0  # 0 = one worker per available CPU core
+    server_graceful_timeout_seconds: int = 30
+    server_backlog: int = 2048
+    warm_caches_on_startup: bool = True  # Load catalog caches before accepting traffic
+    
+    # Catalog and Compression Configuration
+    catalog_cache_ttl_seconds: int = 30  # How long a worker trusts its cached catalog
+    suggest_popularity_refresh_seconds: int = 300  # Picks up enrollments made on other workers
+    recommendations_refresh_seconds: int = 900  # Co-enrollment matrix rebuild interval
+    recommendations_poll_seconds: int = 60  # How often workers check for a newer table (and whether a rebuild is due)
+    recommendations_build_lease_seconds: int = 900  # Another worker may rebuild if the builder has not finished by then
+    recommendations_build_in_workers: bool = True  # False when the table is built offline (scripts.build_recommendations)
+    recommendations_top_k: int = 20  # Similar courses kept per course
+    recommendations_min_co_enrollments: int = 2  # Shared learners needed before two courses are similar
+    activity_rollup_flush_seconds: int = 5  # Buffered activity counts are written this often
+    compression_minimum_size: int = 1024  # Bytes; smaller responses are sent uncompressed
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    
+    # Administration Configuration
+    admin_emails: str = ""  # Comma-separated emails allowed to use the /api/admin endpoints
+    export_batch_size: int = 5000  # Documents per cursor batch when streaming exports
+    
+    # Live Progress Events Configuration
+    progress_events_broker: str = "memory"  # "memory" (per worker) or "mongo" (shared by all workers)
+    progress_stream_queue_size: int = 100  # Events a slow stream may lag behind before it must resync
+    progress_stream_max_per_user: int = 10  # Open event streams per learner
+    progress_stream_heartbeat_seconds: int = 15  # Keeps idle streams open through proxies
+    
+    # Background Jobs Configuration
+    background_job_workers: int = 4  # Worker tasks per process
+    background_job_queue_size: int = 1000  # Jobs queued before callers run theirs inline
+    background_job_max_attempts: int = 3  # Tries per run, with exponential backoff
+    background_job_retry_seconds: float = 0.5  # Delay before the first retry
+    background_job_lease_seconds: int = 60  # Durable jobs not done by then are run again
+    background_job_max_outbox_attempts: int = 10  # Failed runs before a durable job is left dead in the outbox
+    background_job_sweep_seconds: int = 30  # How often the outbox is checked for due jobs
+    background_job_drain_seconds: int = 10  # Time given to queued jobs on shutdown
+    
+    # Idempotency Configuration
+    idempotency_key_ttl_hours: int = 24  # How long retries with the same Idempotency-Key get the stored response
+    idempotency_cache_size: int = 10000  # Stored responses cached per worker
+    idempotency_lock_seconds: int = 30  # A key whose request crashed can be reused after this delay
+    
+    # Observability Configuration
+    db_ops_header: bool = True  # Expose X-DB-Ops / X-DB-Ops-Budget debug headers
+    log_level: str = "INFO"
+    log_format: str = "json"  # "json" (one object per line) or "text"
+    log_queue_size: int = 10000  # Records waiting for the writer thread before new ones are dropped
+    log_sampling: bool = True  # Apply per-route log_sample_rate to info logs; disable while debugging
+    log_sample_rate: float = 0.1  # Fraction of course list/detail requests whose info logs are kept
+    
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -5,7 +5,10 @@ from functools import wraps
 from fastapi import HTTPException, Request, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from ..utils.auth import get_user_from_token
-from ..utils.db import get_users_collection
+from ..utils.revocation import TokenRevocationList
+from ..utils.single_flight import SingleFlight
+from ..repositories import get_users_repository
+from ..config import settings
 from bson import ObjectId
 import logging
 
@@ -14,6 +17,45 @@ logger = logging.getLogger(__name__)
 # HTTP Bearer token security scheme
 security = HTTPBearer()
 
+# Concurrent requests of the same user share one user lookup
+user_lookups = SingleFlight("users.find_by_id")
+
+
+async def authenticate_token(token: str) -> dict:
+    """
+    Verify an access token and check that it has not been revoked
+    
+    Args:
+        token: JWT access token
+        
+    Returns:
+        User info from the token (see get_user_from_token)
+        
+    Raises:
+        HTTPException: If token is invalid or revoked
+    """
+    user_info = get_user_from_token(token)
+    if user_info is None or await TokenRevocationList.is_revoked(user_info["jti"]):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user_info
+
+
+async def find_user(user_id: ObjectId) -> dict | None:
+    """
+    Find the user of a token, joining an identical lookup already in flight
+    
+    Args:
+        user_id: User ID from the token
+        
+    Returns:
+        User document (shared, do not mutate), or None if not found
+    """
+    return await user_lookups.do(user_id, lambda: get_users_repository().find_by_id(user_id))
+
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials):
     """
@@ -31,17 +73,10 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials):
     token = credentials.credentials
     
     # Verify token and extract user info
-    user_info = get_user_from_token(token)
-    if user_info is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    user_info = await authenticate_token(token)
     
     # Get user from database
-    users_collection = get_users_collection()
-    user = await users_collection.find_one({"_id": ObjectId(user_info["user_id"])})
+    user = await find_user(ObjectId(user_info["user_id"]))
     
     if user is None:
         raise HTTPException(
@@ -53,6 +88,35 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials):
     return user
 
 
+async def get_current_user_claims(credentials: HTTPAuthorizationCredentials):
+    """
+    Get current user from the JWT token claims, without a database read
+    
+    Points and profile fields are as of when the access token was issued.
+    Tokens issued without profile claims fall back to a database lookup.
+    
+    Args:
+        credentials: HTTP authorization credentials
+        
+    Returns:
+        User dict with "_id", "email", "fullName" and "points"
+        
+    Raises:
+        HTTPException: If token is invalid or revoked
+    """
+    user_info = await authenticate_token(credentials.credentials)
+    
+    if user_info["fullName"] is None or not ObjectId.is_valid(user_info["user_id"]):
+        return await get_current_user(credentials)
+    
+    return {
+        "_id": ObjectId(user_info["user_id"]),
+        "email": user_info["email"],
+        "fullName": user_info["fullName"],
+        "points": user_info["points"] or 0
+    }
+
+
 def require_auth(func):
     """
     Decorator to require authentication for route handlers
@@ -77,17 +141,10 @@ def require_auth(func):
         token = auth_header.split(" ")[1]
         
         # Verify token and get user
-        user_info = get_user_from_token(token)
-        if user_info is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        user_info = await authenticate_token(token)
         
         # Get user from database
-        users_collection = get_users_collection()
-        user = await users_collection.find_one({"_id": ObjectId(user_info["user_id"])})
+        user = await find_user(ObjectId(user_info["user_id"]))
         
         if user is None:
             raise HTTPException(
@@ -137,4 +194,46 @@ async def get_current_user_dependency(credentials: HTTPAuthorizationCredentials
     Returns:
         User document from database
     """
-    return await get_current_user(credentials)
\ No newline at end of file
+    return await get_current_user(credentials)
+
+
+async def get_current_user_claims_dependency(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """
+    FastAPI dependency function to get the current user from token claims only
+    
+    Use for routes that only need the user's identity, or can show points as
+    of the last token refresh; use get_current_user_dependency when the route
+    needs the user's current points or must reject deleted users immediately.
+    
+    Args:
+        credentials: HTTP authorization credentials
+        
+    Returns:
+        User dict built from token claims
+    """
+    return await get_current_user_claims(credentials)
+
+
+async def get_admin_user_claims_dependency(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """
+    FastAPI dependency function requiring an administrator (ADMIN_EMAILS setting)
+    
+    Args:
+        credentials: HTTP authorization credentials
+        
+    Returns:
+        User dict built from token claims
+        
+    Raises:
+        HTTPException: 403 if the user is not an administrator
+    """
+    user = await get_current_user_claims(credentials)
+    admin_emails = {email.strip().lower() for email in settings.admin_emails.split(",") if email.strip()}
+    
+    if user["email"].lower() not in admin_emails:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Administrator access required"
+        )
+    
+    return user
@@ -0,0 +1,44 @@
+"""
+Middleware carrying causal consistency tokens between workers via the client
+"""
+from ..utils.causal import CAUSAL_TOKEN_HEADER, current_causal_token, decode_causal_token
+
+_HEADER_NAME = CAUSAL_TOKEN_HEADER.lower().encode()
+
+
+class CausalTokenMiddleware:
+    """
+    ASGI middleware reading and returning the X-Causal-Token header
+
+    The token sent by the client is made available to ``Database.user_session``
+    for the request; when a session ran, its times are returned in the
+    response header for the client to send back next time.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for name, value in scope["headers"]:
+            if name == _HEADER_NAME:
+                incoming = decode_causal_token(value.decode("latin-1"))
+                break
+        state = {"incoming": incoming, "outgoing": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and state["outgoing"] is not None:
+                headers = list(message.get("headers", []))
+                headers.append((_HEADER_NAME, state["outgoing"].encode()))
+                message["headers"] = headers
+            await send(message)
+
+        token = current_causal_token.set(state)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_causal_token.reset(token)
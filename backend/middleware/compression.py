@@ -0,0 +1,121 @@
+"""
+Response compression middleware with content negotiation
+"""
+from ..utils.compression import choose_encoding, compress, StreamCompressor
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Content types worth compressing; anything else (images, archives) is passed through
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/", "application/javascript")
+
+# Streams that must reach the client unbuffered
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli or gzip
+
+    Responses smaller than ``minimum_size``, with a non-compressible content
+    type, or that already carry a Content-Encoding (e.g. pre-compressed
+    catalog payloads) are sent unchanged.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"gzip": gzip_level, "br": brotli_quality}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding)
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(send, encoding, self.levels[encoding], self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    """Per-response state machine wrapping the ASGI send callable"""
+
+    def __init__(self, send, encoding: str, level: int, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.level = level
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.passthrough = False
+        self.compressor = None
+
+    async def send(self, message):
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            headers = {name.lower(): value for name, value in message.get("headers", [])}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            if (
+                b"content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+                or content_type.startswith(UNCOMPRESSED_TYPES)
+            ):
+                self.passthrough = True
+                await self._send(message)
+            else:
+                # Hold the start message until we know the body size
+                self.start_message = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None and not more_body:
+            # Complete response in a single message
+            if len(body) < self.minimum_size:
+                await self._send(self.start_message)
+                await self._send(message)
+                self.passthrough = True
+                return
+            compressed = compress(body, self.encoding, self.level)
+            await self._send(self._start_with_encoding(len(compressed)))
+            await self._send({"type": "http.response.body", "body": compressed})
+            return
+
+        if self.compressor is None:
+            # Streaming response: compress chunk by chunk without a Content-Length
+            self.compressor = StreamCompressor(self.encoding, self.level)
+            await self._send(self._start_with_encoding(None))
+
+        chunk = self.compressor.compress(body) if body else b""
+        if not more_body:
+            chunk += self.compressor.finish()
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    def _start_with_encoding(self, content_length: int | None):
+        headers = [
+            (name, value) for name, value in self.start_message.get("headers", [])
+            if name.lower() not in (b"content-length", b"vary")
+        ]
+        vary = [value for name, value in self.start_message.get("headers", []) if name.lower() == b"vary"]
+        vary_value = b", ".join(vary + [b"Accept-Encoding"]) if vary else b"Accept-Encoding"
+        headers.append((b"content-encoding", self.encoding.encode()))
+        headers.append((b"vary", vary_value))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode()))
+        return {**self.start_message, "headers": headers}
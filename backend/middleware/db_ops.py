@@ -0,0 +1,45 @@
+"""
+Middleware that tracks MongoDB round trips per request
+"""
+from ..utils.db_ops import track_db_ops, get_db_ops_budget, DB_OPS_HEADER, DB_OPS_BUDGET_HEADER
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DBOpsMiddleware:
+    """
+    ASGI middleware counting the MongoDB commands issued by each request
+
+    Adds the X-DB-Ops (and, when the route declares one, X-DB-Ops-Budget)
+    debug headers and logs a warning when a route exceeds its budget.
+    """
+
+    def __init__(self, app, expose_headers: bool = True):
+        self.app = app
+        self.expose_headers = expose_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_db_ops() as counter:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    # The router stores the matched endpoint in the shared scope
+                    budget = get_db_ops_budget(scope.get("endpoint"))
+                    if budget is not None and counter.count > budget:
+                        logger.warning(
+                            "%s %s used %d database operations (budget %d): %s",
+                            scope["method"], scope["path"], counter.count, budget, list(counter.commands),
+                        )
+                    if self.expose_headers:
+                        headers = list(message.get("headers", []))
+                        headers.append((DB_OPS_HEADER.lower().encode(), str(counter.count).encode()))
+                        if budget is not None:
+                            headers.append((DB_OPS_BUDGET_HEADER.lower().encode(), str(budget).encode()))
+                        message["headers"] = headers
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,80 @@
+"""
+Middleware reading Idempotency-Key headers and storing the responses of claimed keys
+"""
+from starlette.responses import JSONResponse
+from ..utils.auth import get_user_from_token
+from ..utils.idempotency import (
+    IDEMPOTENCY_KEY_HEADER,
+    MAX_IDEMPOTENCY_KEY_LENGTH,
+    current_idempotency_key,
+    finish_request
+)
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware giving retries of ``@idempotent`` routes the first response
+
+    Keys are scoped to the user of the bearer token. The key of a POST request
+    is exposed to the route through ``current_idempotency_key``; if the
+    route's ``@idempotent`` wrapper claims it, the response is captured here
+    and stored once sent. Requests without a key or without a valid token,
+    and routes that are not ``@idempotent``, are passed through unchanged.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        key = authorization = None
+        for name, value in scope["headers"]:
+            if name == b"idempotency-key":
+                key = value.decode("latin-1")
+            elif name == b"authorization":
+                authorization = value.decode("latin-1")
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            await JSONResponse(
+                {"detail": f"{IDEMPOTENCY_KEY_HEADER} must be 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters"},
+                status_code=400
+            )(scope, receive, send)
+            return
+
+        scheme, _, token = (authorization or "").partition(" ")
+        user = get_user_from_token(token) if scheme.lower() == "bearer" else None
+        if user is None:
+            # The route rejects the request itself
+            await self.app(scope, receive, send)
+            return
+
+        request_key = {"key_id": f"{user['user_id']}:{key}", "path": scope["path"], "claimed": False}
+        start = None
+        body = []
+
+        async def send_wrapper(message):
+            nonlocal start
+            if request_key["claimed"]:
+                if message["type"] == "http.response.start":
+                    start = message
+                elif message["type"] == "http.response.body":
+                    body.append(message.get("body", b""))
+            await send(message)
+
+        context_token = current_idempotency_key.set(request_key)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_idempotency_key.reset(context_token)
+            if request_key["claimed"]:
+                await finish_request(
+                    request_key,
+                    start["status"] if start is not None else None,
+                    start.get("headers", []) if start is not None else [],
+                    b"".join(body)
+                )
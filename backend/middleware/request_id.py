@@ -0,0 +1,47 @@
+"""
+Middleware giving every request an ID for log correlation
+"""
+from ..utils.logs import REQUEST_ID_HEADER, set_log_request, reset_log_request
+import re
+import uuid
+
+# Client-supplied IDs are kept when they are short and printable
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+
+class RequestIDMiddleware:
+    """
+    ASGI middleware tagging the records logged while serving a request
+
+    Uses the client's (or proxy's) X-Request-ID when valid, generates one
+    otherwise, and returns it in the X-Request-ID response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        if request_id is None or not _VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER.lower().encode(), request_id.encode()))
+                message["headers"] = headers
+            await send(message)
+
+        token = set_log_request(request_id, scope)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            reset_log_request(token)
@@ -0,0 +1,47 @@
+"""
+Analytics models for e-learning platform
+"""
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+from enum import Enum
+
+
+class GranularityEnum(str, Enum):
+    """Activity bucket sizes"""
+    HOUR = "hour"
+    DAY = "day"
+    WEEK = "week"  # Starts on Monday
+
+
+class ExportDatasetEnum(str, Enum):
+    """Progress collections that can be exported"""
+    ENROLLMENTS = "enrollments"
+    COMPLETIONS = "completions"
+    MODULE_COMPLETIONS = "module_completions"
+
+
+class ExportFormatEnum(str, Enum):
+    """Export file formats"""
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class ActivityBucket(BaseModel):
+    """Learning activity during one time bucket"""
+    start: datetime
+    enrollments: int = 0
+    moduleCompletions: int = 0
+    courseCompletions: int = 0
+    points: int = 0
+    activeLearners: int = 0  # Distinct learners with any activity in the bucket
+
+
+class ActivitySeriesResponse(BaseModel):
+    """Activity time series API response model"""
+    success: bool = True
+    granularity: GranularityEnum
+    courseId: Optional[str] = None  # None for platform-wide activity
+    start: datetime
+    end: datetime
+    buckets: List[ActivityBucket]
@@ -85,4 +85,5 @@ class CourseProgressResponse(BaseModel):
     progressPercentage: float
     completions: List[ModuleCompletionResponse]
     isFullyCompleted: bool
-    pointsEarned: int = 0
\ No newline at end of file
+    pointsEarned: int = 0
+    nextModuleIndex: Optional[int] = None  # First module not completed yet (None when all are)
\ No newline at end of file
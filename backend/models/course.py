@@ -38,8 +38,8 @@ class Course(BaseModel):
     }
 
 
-class CourseResponse(BaseModel):
-    """Course response model"""
+class CatalogCourse(BaseModel):
+    """User-independent course fields, shared by every learner"""
     id: str
     title: str
     description: str
@@ -50,22 +50,113 @@ class CourseResponse(BaseModel):
     syllabus: List[str]
     objectives: List[str]
     thumbnail: Optional[str] = None
+
+
+class CatalogResponse(BaseModel):
+    """Catalog API response model"""
+    success: bool = True
+    version: str
+    courses: List[CatalogCourse]
+
+
+class CourseSearchResult(CatalogCourse):
+    """Course matching a search query"""
+    score: float
+
+
+class CourseSearchResponse(BaseModel):
+    """Course search API response model"""
+    success: bool = True
+    query: str
+    total: int
+    page: int
+    pageSize: int
+    results: List[CourseSearchResult]
+
+
+class CourseSuggestion(BaseModel):
+    """Typeahead suggestion"""
+    id: str
+    title: str
+    instructor: str
+    level: str
+    matchedField: str  # "title" or "instructor"
+    enrollments: int
+
+
+class CourseSuggestResponse(BaseModel):
+    """Course typeahead API response model"""
+    success: bool = True
+    prefix: str
+    suggestions: List[CourseSuggestion]
+
+
+class CourseResponse(CatalogCourse):
+    """Course response model"""
     isCompleted: bool = False
     completedAt: Optional[datetime] = None
     isEnrolled: bool = False
     progress: Optional[int] = None  # Progress percentage for enrolled courses
 
 
+class CourseOverlay(BaseModel):
+    """Per-learner course fields, spliced into the pre-serialized catalog"""
+    isCompleted: bool = False
+    completedAt: Optional[datetime] = None
+    isEnrolled: bool = False
+    progress: Optional[int] = None
+
+
 class CoursesListResponse(BaseModel):
     """Courses list API response model"""
     success: bool = True
+    stale: bool = False  # Last known catalog without learner state, served while the database is unreachable
     courses: List[CourseResponse]
 
 
+class RecommendedCourse(BaseModel):
+    """Course recommended from co-enrollment"""
+    id: str
+    title: str
+    instructor: str
+    level: str
+    thumbnail: Optional[str] = None
+    score: float
+
+
+class RecommendedCoursesResponse(BaseModel):
+    """Personalised recommendations API response model"""
+    success: bool = True
+    personalized: bool  # False when only popular courses could be recommended
+    courses: List[RecommendedCourse]
+
+
+class FunnelStep(BaseModel):
+    """Learners who completed one module of a course"""
+    moduleIndex: int
+    moduleTitle: str
+    learners: int
+    conversionRate: float  # Percentage of enrolled learners
+    dropOff: int  # Learners lost since the previous step
+
+
+class CourseFunnelResponse(BaseModel):
+    """Module completion funnel API response model"""
+    success: bool = True
+    courseId: str
+    title: str
+    enrollments: int
+    completions: int
+    completionRate: float  # Percentage of enrolled learners who completed the course
+    modules: List[FunnelStep]
+
+
 class CourseDetailResponse(BaseModel):
     """Individual course detail API response model"""
     success: bool = True
+    stale: bool = False  # Last known course without learner state, served while the database is unreachable
     course: CourseResponse
+    alsoTaken: List[RecommendedCourse] = []  # Learners who took this also took
 
 
 class CompletionData(BaseModel):
@@ -74,6 +165,23 @@ class CompletionData(BaseModel):
     completedAt: datetime
 
 
+class CourseImportError(BaseModel):
+    """Course import line that was rejected"""
+    line: int  # 1-based line number in the NDJSON body
+    error: str
+
+
+class CourseImportResponse(BaseModel):
+    """Bulk course import API response model"""
+    success: bool = True
+    received: int  # Non-blank lines read
+    inserted: int
+    updated: int
+    failed: int
+    errors: List[CourseImportError]  # At most the first 1000 failures
+    truncated: bool = False  # Lines after the per-request limit were not read
+
+
 class CompletionCreateResponse(BaseModel):
     """Course completion creation response model"""
     success: bool = True
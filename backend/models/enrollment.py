@@ -2,7 +2,7 @@
 Enrollment models for e-learning platform
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, Optional
 from datetime import datetime
 from .user import PyObjectId
 
@@ -14,6 +14,8 @@ class Enrollment(BaseModel):
     courseId: PyObjectId
     enrolledAt: datetime
     createdAt: datetime
+    moduleBits: Dict[str, int] = {}  # Completed modules, 32 per word (see utils.module_progress)
+    completedModuleCount: int = 0
 
     model_config = {
         "validate_by_name": True,
@@ -83,9 +83,20 @@ class UserInDB(BaseModel):
     }
 
 
+class RefreshTokenRequest(BaseModel):
+    """Refresh token request model"""
+    refreshToken: str
+
+
+class LogoutRequest(BaseModel):
+    """Logout request model"""
+    refreshToken: Optional[str] = None
+
+
 class AuthResponse(BaseModel):
     """Authentication response model"""
     success: bool
     message: str
     token: str
+    refreshToken: Optional[str] = None
     user: UserResponse
@@ -0,0 +1,170 @@
+"""
+Pluggable repository layer
+
+The active backend is selected with the ``REPOSITORY_BACKEND`` setting:
+
+- ``mongo`` (default): Motor collections, see ``repositories.mongo``
+- ``memory``: embedded indexed in-memory store, see ``repositories.memory``
+"""
+from .base import (
+    UserRepository,
+    CourseRepository,
+    EnrollmentRepository,
+    CompletionRepository,
+    ModuleCompletionRepository,
+    CourseFunnelRepository,
+    ActivityRollupRepository,
+    RecommendationRepository,
+    RevokedTokenRepository,
+    JobOutboxRepository,
+    IdempotencyKeyRepository
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+REPOSITORY_BACKENDS = ("mongo", "memory")
+
+
+class Repositories:
+    """Registry of the repositories used by the application"""
+
+    backend: str = "mongo"
+    users: UserRepository = None
+    courses: CourseRepository = None
+    enrollments: EnrollmentRepository = None
+    completions: CompletionRepository = None
+    module_completions: ModuleCompletionRepository = None
+    course_funnels: CourseFunnelRepository = None
+    activity_rollups: ActivityRollupRepository = None
+    recommendations: RecommendationRepository = None
+    revoked_tokens: RevokedTokenRepository = None
+    job_outbox: JobOutboxRepository = None
+    idempotency_keys: IdempotencyKeyRepository = None
+
+    @classmethod
+    def configure(cls, backend: str = "mongo"):
+        """
+        Install the repositories for a storage backend
+
+        Args:
+            backend: "mongo" or "memory"
+
+        Raises:
+            ValueError: If the backend is unknown
+        """
+        if backend == "mongo":
+            from .mongo import (
+                MongoUserRepository,
+                MongoCourseRepository,
+                MongoEnrollmentRepository,
+                MongoCompletionRepository,
+                MongoModuleCompletionRepository,
+                MongoCourseFunnelRepository,
+                MongoActivityRollupRepository,
+                MongoRecommendationRepository,
+                MongoRevokedTokenRepository,
+                MongoJobOutboxRepository,
+                MongoIdempotencyKeyRepository
+            )
+            cls.users = MongoUserRepository()
+            cls.courses = MongoCourseRepository()
+            cls.enrollments = MongoEnrollmentRepository()
+            cls.completions = MongoCompletionRepository()
+            cls.module_completions = MongoModuleCompletionRepository()
+            cls.course_funnels = MongoCourseFunnelRepository()
+            cls.activity_rollups = MongoActivityRollupRepository()
+            cls.recommendations = MongoRecommendationRepository()
+            cls.revoked_tokens = MongoRevokedTokenRepository()
+            cls.job_outbox = MongoJobOutboxRepository()
+            cls.idempotency_keys = MongoIdempotencyKeyRepository()
+        elif backend == "memory":
+            from .memory import (
+                MemoryUserRepository,
+                MemoryCourseRepository,
+                MemoryEnrollmentRepository,
+                MemoryCompletionRepository,
+                MemoryModuleCompletionRepository,
+                MemoryCourseFunnelRepository,
+                MemoryActivityRollupRepository,
+                MemoryRecommendationRepository,
+                MemoryRevokedTokenRepository,
+                MemoryJobOutboxRepository,
+                MemoryIdempotencyKeyRepository
+            )
+            cls.users = MemoryUserRepository()
+            cls.courses = MemoryCourseRepository()
+            cls.enrollments = MemoryEnrollmentRepository()
+            cls.completions = MemoryCompletionRepository()
+            cls.module_completions = MemoryModuleCompletionRepository()
+            cls.course_funnels = MemoryCourseFunnelRepository()
+            cls.activity_rollups = MemoryActivityRollupRepository()
+            cls.recommendations = MemoryRecommendationRepository()
+            cls.revoked_tokens = MemoryRevokedTokenRepository()
+            cls.job_outbox = MemoryJobOutboxRepository()
+            cls.idempotency_keys = MemoryIdempotencyKeyRepository()
+        else:
+            raise ValueError(f"Unknown repository backend '{backend}', expected one of {REPOSITORY_BACKENDS}")
+
+        cls.backend = backend
+        logger.info("Using '%s' repository backend", backend)
+
+
+# Default to MongoDB until the application configures a backend
+Repositories.configure("mongo")
+
+
+# Convenience functions for accessing repositories
+def get_users_repository() -> UserRepository:
+    """Get users repository"""
+    return Repositories.users
+
+
+def get_courses_repository() -> CourseRepository:
+    """Get courses repository"""
+    return Repositories.courses
+
+
+def get_enrollments_repository() -> EnrollmentRepository:
+    """Get enrollments repository"""
+    return Repositories.enrollments
+
+
+def get_completions_repository() -> CompletionRepository:
+    """Get completions repository"""
+    return Repositories.completions
+
+
+def get_module_completions_repository() -> ModuleCompletionRepository:
+    """Get module completions repository"""
+    return Repositories.module_completions
+
+
+def get_course_funnels_repository() -> CourseFunnelRepository:
+    """Get course funnels repository"""
+    return Repositories.course_funnels
+
+
+def get_activity_rollups_repository() -> ActivityRollupRepository:
+    """Get activity rollups repository"""
+    return Repositories.activity_rollups
+
+
+def get_recommendations_repository() -> RecommendationRepository:
+    """Get recommendations repository"""
+    return Repositories.recommendations
+
+
+def get_revoked_tokens_repository() -> RevokedTokenRepository:
+    """Get revoked tokens repository"""
+    return Repositories.revoked_tokens
+
+
+def get_job_outbox_repository() -> JobOutboxRepository:
+    """Get background job outbox repository"""
+    return Repositories.job_outbox
+
+
+def get_idempotency_keys_repository() -> IdempotencyKeyRepository:
+    """Get idempotency keys repository"""
+    return Repositories.idempotency_keys
@@ -0,0 +1,340 @@
+"""
+Repository interfaces for the e-learning data model
+
+Route handlers talk to these interfaces instead of Motor collections so the
+storage backend (MongoDB or the embedded in-memory store) can be swapped
+without touching business logic. Documents are plain dicts shaped exactly
+like the MongoDB documents, with ObjectId identifiers.
+
+Unique constraints (user email, one enrollment / completion per user and
+course, one module completion per user, course and module) are enforced by
+every backend and violations raise pymongo's DuplicateKeyError.
+"""
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+from datetime import datetime
+from bson import ObjectId
+
+
+class UserRepository(ABC):
+    """Access to the users collection"""
+
+    @abstractmethod
+    async def find_by_id(self, user_id: ObjectId) -> dict | None:
+        """Get a user by ID"""
+
+    @abstractmethod
+    async def find_by_email(self, email: str) -> dict | None:
+        """Get a user by email (case-insensitive)"""
+
+    @abstractmethod
+    async def insert(self, user_doc: dict) -> ObjectId:
+        """Insert a user and return its ID"""
+
+    @abstractmethod
+    async def set_fields(self, user_id: ObjectId, fields: dict) -> None:
+        """Set fields on a user"""
+
+    @abstractmethod
+    async def increment_points(self, user_id: ObjectId, points: int) -> None:
+        """Add points to a user's total"""
+
+    @abstractmethod
+    async def award_course_bonus(self, user_id: ObjectId, course_id: ObjectId, points: int) -> bool:
+        """
+        Add a course's completion bonus to a user's total, at most once per course
+
+        The course is recorded in the user's "bonusCourseIds" in the same
+        update, so repeating the award is a no-op.
+
+        Returns:
+            True if the bonus was awarded by this call
+        """
+
+
+class CourseRepository(ABC):
+    """Access to the courses collection"""
+
+    @abstractmethod
+    async def find_all(self) -> list[dict]:
+        """Get every course"""
+
+    @abstractmethod
+    async def find_by_id(self, course_id: ObjectId) -> dict | None:
+        """Get a course by ID"""
+
+    @abstractmethod
+    async def count(self) -> int:
+        """Count courses"""
+
+    @abstractmethod
+    async def bulk_upsert(self, upserts: list[tuple[dict, dict]]) -> tuple[int, int, dict[int, str]]:
+        """
+        Upsert courses without stopping at the first failure
+
+        Each upsert is (filter, fields): fields are set on the course matching
+        the filter (by "_id", or by "title" and "instructor"), which is created
+        with "createdAt" = fields["updatedAt"] if none matches.
+
+        Returns (inserted, updated, error message by upsert index).
+        """
+
+    @abstractmethod
+    async def insert_many(self, course_docs: list[dict]) -> list[ObjectId]:
+        """Insert courses and return their IDs"""
+
+    @abstractmethod
+    async def get_catalog_version(self) -> int:
+        """Get the catalog version (0 until the catalog is first published)"""
+
+    @abstractmethod
+    async def bump_catalog_version(self) -> int:
+        """Publish catalog changes to every worker and return the new version"""
+
+
+class UserCourseRepository(ABC):
+    """Access to a collection holding at most one document per user and course"""
+
+    @abstractmethod
+    async def find(self, user_id: ObjectId, course_id: ObjectId) -> dict | None:
+        """Get the document for a user and course"""
+
+    @abstractmethod
+    async def find_by_user(self, user_id: ObjectId) -> list[dict]:
+        """Get every document of a user"""
+
+    @abstractmethod
+    async def insert(self, doc: dict) -> ObjectId:
+        """Insert a document and return its ID"""
+
+    @abstractmethod
+    async def count_by_course(self) -> dict[ObjectId, int]:
+        """Count documents per course (courses without any are omitted)"""
+
+    @abstractmethod
+    def iter_export(self, course_id: ObjectId | None, start: datetime | None, end: datetime | None, batch_size: int) -> AsyncIterator[dict]:
+        """Stream documents of a course (all if None) with "enrolledAt" / "completedAt" in [start, end), ``batch_size`` at a time (analytics)"""
+
+    @abstractmethod
+    def iter_user_course_pairs(self, batch_size: int) -> AsyncIterator[list[tuple[ObjectId, ObjectId]]]:
+        """Stream the (userId, courseId) of every document, ``batch_size`` pairs at a time (analytics)"""
+
+
+class EnrollmentRepository(UserCourseRepository):
+    """
+    Access to the enrollments collection
+
+    Enrollments carry the learner's completed modules as a bitset (see
+    ``utils.module_progress``).
+    """
+
+    @abstractmethod
+    async def mark_module_completed(self, user_id: ObjectId, course_id: ObjectId, module_index: int) -> dict | None:
+        """
+        Set a module's bit and increment "completedModuleCount" in one atomic update
+
+        Returns the updated enrollment, or None if the user is not enrolled
+        or the module's bit was already set (nothing is counted twice).
+        """
+
+    @abstractmethod
+    async def merge_module_progress(self, modules: dict[tuple[ObjectId, ObjectId], list[int]]) -> int:
+        """
+        Add completed modules to the bitsets of the enrollments keyed by (userId, courseId)
+
+        Bits are only ever added, never cleared, and the count is recomputed
+        from the merged bitset, so merging concurrently with module
+        completions loses neither.
+
+        Returns:
+            Number of enrollments updated
+        """
+
+    @abstractmethod
+    async def initialize_module_progress(self) -> None:
+        """Give enrollments without a bitset an empty one"""
+
+
+class CompletionRepository(UserCourseRepository):
+    """Access to the completions collection"""
+
+
+class ModuleCompletionRepository(ABC):
+    """Access to the module_completions collection"""
+
+    @abstractmethod
+    async def find(self, user_id: ObjectId, course_id: ObjectId, module_index: int) -> dict | None:
+        """Get the completion of one module"""
+
+    @abstractmethod
+    async def find_by_user(self, user_id: ObjectId) -> list[dict]:
+        """Get every module completion of a user"""
+
+    @abstractmethod
+    async def find_by_user_course(self, user_id: ObjectId, course_id: ObjectId) -> list[dict]:
+        """Get a user's module completions for a course, ordered by module index"""
+
+    @abstractmethod
+    async def count_by_user_course(self, user_id: ObjectId, course_id: ObjectId) -> int:
+        """Count a user's module completions for a course"""
+
+    @abstractmethod
+    async def insert(self, doc: dict) -> ObjectId:
+        """Insert a module completion and return its ID"""
+
+    @abstractmethod
+    def iter_export(self, course_id: ObjectId | None, start: datetime | None, end: datetime | None, batch_size: int) -> AsyncIterator[dict]:
+        """Stream module completions of a course (all if None) completed in [start, end) (analytics)"""
+
+    @abstractmethod
+    async def count_by_course_module(self) -> dict[tuple[ObjectId, int], int]:
+        """Count module completions per (course ID, module index) (analytics)"""
+
+    @abstractmethod
+    def iter_module_indexes_by_user_course(self) -> AsyncIterator[tuple[tuple[ObjectId, ObjectId], list[int]]]:
+        """Stream ((user ID, course ID), completed module indexes) pairs (migrations)"""
+
+
+class CourseFunnelRepository(ABC):
+    """
+    Access to the course_funnels collection
+
+    One document per course, ``{"_id": course ID, "enrollments": int,
+    "completions": int, "modules": {"<module index>": int}}``, kept up to
+    date by incrementing counters as learners progress.
+    """
+
+    @abstractmethod
+    async def find(self, course_id: ObjectId) -> dict | None:
+        """Get the counters of a course"""
+
+    @abstractmethod
+    async def increment(self, course_id: ObjectId, enrollments: int = 0, completions: int = 0, module_index: int | None = None) -> None:
+        """Add to a course's counters (and to one module's), creating them if needed"""
+
+    @abstractmethod
+    async def replace_all(self, funnels: list[dict]) -> None:
+        """Overwrite the counters of the given courses and drop those of other courses"""
+
+
+class ActivityRollupRepository(ABC):
+    """
+    Access to the activity_rollups collection (time-bucketed activity counters)
+
+    One document per granularity, scope and bucket start, ``{"_id": str,
+    "granularity": "hour" | "day" | "week", "courseId": ObjectId or None for
+    the whole platform, "start": datetime, "counts": {name: int}}``, plus
+    short-lived learner markers used to count distinct active learners.
+    """
+
+    @abstractmethod
+    async def increment_buckets(self, buckets: list[dict]) -> None:
+        """Add the "counts" of each given bucket document, creating missing buckets"""
+
+    @abstractmethod
+    async def insert_learner_markers(self, markers: list[dict]) -> set[str]:
+        """Insert {"_id", "expiresAt"} markers and return the IDs that did not exist yet"""
+
+    @abstractmethod
+    async def find_buckets(self, granularity: str, course_id: ObjectId | None, start: datetime, end: datetime) -> list[dict]:
+        """Get the buckets of a scope starting in [start, end), ordered by start"""
+
+
+class RecommendationRepository(ABC):
+    """
+    Access to the course similarity table shared by every worker
+
+    ``course_similarities`` holds one document per course and table version,
+    ``{"_id": "<version>:<course ID>", "version", "courseId", "similar":
+    [{"courseId", "score"}, ...]}``. The single ``recommendations_meta``
+    document ``{"version", "popular", "builtAt", "leaseUntil"}`` names the
+    current version and holds the lease of the worker rebuilding the table.
+    """
+
+    @abstractmethod
+    async def claim_build(self, now: datetime, built_before: datetime, lease_until: datetime) -> bool:
+        """Take the build lease if the table was built before ``built_before`` (or never) and nobody holds it"""
+
+    @abstractmethod
+    async def save_table(self, similar: dict[str, list[tuple[str, float]]], popular: list[str], built_at: datetime) -> int:
+        """Store a new table version, make it current and release the lease; return the version"""
+
+    @abstractmethod
+    async def find_current(self) -> dict | None:
+        """Get the meta document ("version", "popular", "builtAt"), None before the first build"""
+
+    @abstractmethod
+    async def find_table(self, version: int) -> dict[str, list[tuple[str, float]]]:
+        """Get the similar courses of every course in a table version"""
+
+
+class RevokedTokenRepository(ABC):
+    """Access to the revoked_tokens collection (token IDs revoked before expiry)"""
+
+    @abstractmethod
+    async def insert(self, jti: str, expires_at: datetime) -> bool:
+        """Record a revoked token ID until the token would have expired (False if it already was)"""
+
+    @abstractmethod
+    async def exists(self, jti: str) -> bool:
+        """Check whether a token ID is revoked"""
+
+    @abstractmethod
+    async def find_revoked_since(self, since: datetime | None) -> list[dict]:
+        """Get unexpired revocations with "revokedAt" at or after ``since`` (all if None)"""
+
+
+class JobOutboxRepository(ABC):
+    """
+    Access to the job_outbox collection (durable background jobs)
+
+    Documents are ``{"_id", "name", "payload", "attempts", "runAfter",
+    "createdAt", "error"}``. A job is due once ``runAfter`` is reached; a
+    worker running it pushes ``runAfter`` forward (its lease) so no other
+    worker takes it, and deletes it when done. Dead jobs have ``runAfter``
+    None and are kept for inspection.
+    """
+
+    @abstractmethod
+    async def insert(self, job: dict) -> None:
+        """Record a job before it runs"""
+
+    @abstractmethod
+    async def claim_due(self, now: datetime, lease_until: datetime) -> dict | None:
+        """Take the oldest due job, moving its "runAfter" to ``lease_until`` (None if no job is due)"""
+
+    @abstractmethod
+    async def reschedule(self, job_id: ObjectId, run_after: datetime | None, attempts: int, error: str) -> None:
+        """Record a failed run: retry the job at ``run_after`` (never if None)"""
+
+    @abstractmethod
+    async def delete(self, job_id: ObjectId) -> None:
+        """Remove a completed job"""
+
+
+class IdempotencyKeyRepository(ABC):
+    """
+    Access to the idempotency_keys collection (responses of idempotent requests)
+
+    Documents are ``{"_id": "<user ID>:<key>", "path", "status": "pending" |
+    "completed", "response", "lockedUntil", "expiresAt"}``; a TTL index
+    removes them at ``expiresAt``.
+    """
+
+    @abstractmethod
+    async def claim(self, key_id: str, path: str, locked_until: datetime, expires_at: datetime) -> dict | None:
+        """
+        Reserve a key for the request about to run
+
+        A pending key whose lock expired (its request crashed) is taken over.
+
+        Returns None if the key was reserved, otherwise the existing document.
+        """
+
+    @abstractmethod
+    async def complete(self, key_id: str, response: dict, expires_at: datetime) -> None:
+        """Store the response of a reserved key"""
+
+    @abstractmethod
+    async def release(self, key_id: str) -> None:
+        """Drop a reserved key whose response is not kept, so the request can be retried"""
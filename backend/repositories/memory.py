@@ -0,0 +1,517 @@
+"""
+Embedded in-memory repository implementations
+
+Documents live in per-process dictionaries with hash indexes on the same
+keys MongoDB indexes (see Database._create_indexes), so lookups are O(1)
+and the unique constraints match the MongoDB backend. Operations never
+await, which makes each of them atomic on the event loop.
+
+Intended for single-node deployments (kiosks, demos) and for benchmarks
+that need to measure application CPU without database latency. Data is
+lost when the process exits.
+"""
+from collections import Counter
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from .base import (
+    UserRepository,
+    CourseRepository,
+    EnrollmentRepository,
+    CompletionRepository,
+    ModuleCompletionRepository,
+    CourseFunnelRepository,
+    ActivityRollupRepository,
+    RecommendationRepository,
+    RevokedTokenRepository,
+    JobOutboxRepository,
+    IdempotencyKeyRepository
+)
+from ..utils.module_progress import module_bit, is_module_completed, merge_module_bits
+from datetime import datetime
+
+
+def _in_export(doc: dict, date_field: str, course_id: ObjectId | None, start: datetime | None, end: datetime | None) -> bool:
+    """Check whether a document matches an export's course and date range"""
+    if course_id is not None and doc["courseId"] != course_id:
+        return False
+    return (start is None or doc[date_field] >= start) and (end is None or doc[date_field] < end)
+
+
+class MemoryCollection:
+    """
+    Dictionary-backed document store with one optional unique index and
+    any number of non-unique hash indexes
+    """
+
+    def __init__(self, name: str, unique_key: tuple[str, ...] | None = None, index_keys: tuple[tuple[str, ...], ...] = ()):
+        self.name = name
+        self.unique_key = unique_key
+        self.index_keys = index_keys
+        self.docs: dict[ObjectId, dict] = {}
+        self.unique: dict[tuple, ObjectId] = {}
+        self.indexes: dict[tuple[str, ...], dict[tuple, dict[ObjectId, dict]]] = {
+            keys: {} for keys in index_keys
+        }
+
+    @staticmethod
+    def _key(doc: dict, keys: tuple[str, ...]) -> tuple:
+        return tuple(doc.get(key) for key in keys)
+
+    def unique_lookup(self, key: tuple) -> dict | None:
+        """Get a document by its unique key"""
+        doc_id = self.unique.get(key)
+        return dict(self.docs[doc_id]) if doc_id is not None else None
+
+    def index_lookup(self, keys: tuple[str, ...], key: tuple) -> list[dict]:
+        """Get every document matching a non-unique index key, in insertion order"""
+        return [dict(doc) for doc in self.indexes[keys].get(key, {}).values()]
+
+    def index_count(self, keys: tuple[str, ...], key: tuple) -> int:
+        """Count documents matching a non-unique index key"""
+        return len(self.indexes[keys].get(key, ()))
+
+    def get(self, doc_id: ObjectId) -> dict | None:
+        """Get a document by ID"""
+        doc = self.docs.get(doc_id)
+        return dict(doc) if doc is not None else None
+
+    def all(self) -> list[dict]:
+        """Get every document in insertion order"""
+        return [dict(doc) for doc in self.docs.values()]
+
+    def insert(self, doc: dict) -> ObjectId:
+        """
+        Insert a document, assigning an ObjectId like pymongo does
+
+        Raises:
+            DuplicateKeyError: If the ID or the unique key already exists
+        """
+        doc.setdefault("_id", ObjectId())
+        doc_id = doc["_id"]
+        if doc_id in self.docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_", 11000)
+        unique = None
+        if self.unique_key is not None:
+            unique = self._key(doc, self.unique_key)
+            if unique in self.unique:
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.name} index: {'_'.join(self.unique_key)}",
+                    11000
+                )
+
+        stored = dict(doc)
+        self.docs[doc_id] = stored
+        if unique is not None:
+            self.unique[unique] = doc_id
+        for keys, index in self.indexes.items():
+            index.setdefault(self._key(stored, keys), {})[doc_id] = stored
+        return doc_id
+
+    def update(self, doc_id: ObjectId, fields: dict) -> None:
+        """
+        Update non-key fields of a stored document in place
+
+        Indexed and unique fields must not be changed through this method.
+        """
+        doc = self.docs.get(doc_id)
+        if doc is not None:
+            doc.update(fields)
+
+    def delete(self, doc_id: ObjectId) -> None:
+        """Remove a document and its index entries"""
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        if self.unique_key is not None:
+            self.unique.pop(self._key(doc, self.unique_key), None)
+        for keys, index in self.indexes.items():
+            index.get(self._key(doc, keys), {}).pop(doc_id, None)
+
+
+class MemoryUserRepository(UserRepository):
+    """Users stored in process memory, unique on email (stored lower-cased by signup)"""
+
+    def __init__(self):
+        self.collection = MemoryCollection("users", unique_key=("email",))
+
+    async def find_by_id(self, user_id: ObjectId) -> dict | None:
+        return self.collection.get(user_id)
+
+    async def find_by_email(self, email: str) -> dict | None:
+        return self.collection.unique_lookup((email.lower(),))
+
+    async def insert(self, user_doc: dict) -> ObjectId:
+        return self.collection.insert(user_doc)
+
+    async def set_fields(self, user_id: ObjectId, fields: dict) -> None:
+        self.collection.update(user_id, fields)
+
+    async def increment_points(self, user_id: ObjectId, points: int) -> None:
+        doc = self.collection.docs.get(user_id)
+        if doc is not None:
+            doc["points"] = doc.get("points", 0) + points
+
+    async def award_course_bonus(self, user_id: ObjectId, course_id: ObjectId, points: int) -> bool:
+        doc = self.collection.docs.get(user_id)
+        if doc is None or course_id in doc.get("bonusCourseIds", []):
+            return False
+        doc["points"] = doc.get("points", 0) + points
+        doc["bonusCourseIds"] = doc.get("bonusCourseIds", []) + [course_id]
+        return True
+
+
+class MemoryCourseRepository(CourseRepository):
+    """Courses stored in process memory"""
+
+    def __init__(self):
+        self.collection = MemoryCollection("courses", index_keys=(("title", "instructor"),))
+        self.catalog_version = 0
+
+    async def find_all(self) -> list[dict]:
+        return self.collection.all()
+
+    async def find_by_id(self, course_id: ObjectId) -> dict | None:
+        return self.collection.get(course_id)
+
+    async def count(self) -> int:
+        return len(self.collection.docs)
+
+    async def insert_many(self, course_docs: list[dict]) -> list[ObjectId]:
+        return [self.collection.insert(doc) for doc in course_docs]
+
+    async def bulk_upsert(self, upserts: list[tuple[dict, dict]]) -> tuple[int, int, dict[int, str]]:
+        inserted, updated, errors = 0, 0, {}
+        for index, (query, fields) in enumerate(upserts):
+            try:
+                if "_id" in query:
+                    existing = self.collection.get(query["_id"])
+                else:
+                    matches = self.collection.index_lookup(("title", "instructor"), (query["title"], query["instructor"]))
+                    existing = matches[0] if matches else None
+                if existing is None:
+                    self.collection.insert({**query, **fields, "createdAt": fields["updatedAt"]})
+                    inserted += 1
+                else:
+                    # Replace rather than update in place: title and instructor are indexed
+                    self.collection.delete(existing["_id"])
+                    self.collection.insert({**existing, **fields})
+                    updated += 1
+            except Exception as e:
+                errors[index] = str(e)
+        return inserted, updated, errors
+
+    async def get_catalog_version(self) -> int:
+        return self.catalog_version
+
+    async def bump_catalog_version(self) -> int:
+        self.catalog_version += 1
+        return self.catalog_version
+
+
+class _MemoryUserCourseRepository:
+    """Shared implementation for collections unique on (userId, courseId)"""
+
+    def __init__(self, name: str, date_field: str):
+        self.date_field = date_field
+        self.collection = MemoryCollection(
+            name,
+            unique_key=("userId", "courseId"),
+            index_keys=(("userId",),)
+        )
+
+    async def find(self, user_id: ObjectId, course_id: ObjectId) -> dict | None:
+        return self.collection.unique_lookup((user_id, course_id))
+
+    async def find_by_user(self, user_id: ObjectId) -> list[dict]:
+        return self.collection.index_lookup(("userId",), (user_id,))
+
+    async def insert(self, doc: dict) -> ObjectId:
+        return self.collection.insert(doc)
+
+    async def count_by_course(self) -> dict[ObjectId, int]:
+        return dict(Counter(doc["courseId"] for doc in self.collection.docs.values()))
+
+    async def iter_export(self, course_id: ObjectId | None, start: datetime | None, end: datetime | None, batch_size: int):
+        for doc in list(self.collection.docs.values()):
+            if _in_export(doc, self.date_field, course_id, start, end):
+                yield dict(doc)
+
+    async def iter_user_course_pairs(self, batch_size: int):
+        pairs = [(doc["userId"], doc["courseId"]) for doc in self.collection.docs.values()]
+        for start in range(0, len(pairs), batch_size):
+            yield pairs[start:start + batch_size]
+
+
+class MemoryEnrollmentRepository(_MemoryUserCourseRepository, EnrollmentRepository):
+    """Enrollments stored in process memory"""
+
+    def __init__(self):
+        super().__init__("enrollments", "enrolledAt")
+
+    async def mark_module_completed(self, user_id: ObjectId, course_id: ObjectId, module_index: int) -> dict | None:
+        enrollment = self.collection.unique_lookup((user_id, course_id))
+        if enrollment is None or is_module_completed(enrollment, module_index):
+            return None
+        word, mask = module_bit(module_index)
+        # Copy the words: stored documents are only shallow-copied on read
+        words = dict(enrollment.get("moduleBits", {}))
+        words[word] = words.get(word, 0) | mask
+        fields = {"moduleBits": words, "completedModuleCount": enrollment.get("completedModuleCount", 0) + 1}
+        self.collection.update(enrollment["_id"], fields)
+        return {**enrollment, **fields}
+
+    async def merge_module_progress(self, modules: dict[tuple[ObjectId, ObjectId], list[int]]) -> int:
+        updated = 0
+        for key, module_indexes in modules.items():
+            enrollment = self.collection.unique_lookup(key)
+            if enrollment is None:
+                continue
+            fields = merge_module_bits(enrollment.get("moduleBits", {}), module_indexes)
+            if fields["moduleBits"] != enrollment.get("moduleBits") or fields["completedModuleCount"] != enrollment.get("completedModuleCount"):
+                self.collection.update(enrollment["_id"], fields)
+                updated += 1
+        return updated
+
+    async def initialize_module_progress(self) -> None:
+        for doc in list(self.collection.docs.values()):
+            if "completedModuleCount" not in doc:
+                self.collection.update(doc["_id"], {"moduleBits": {}, "completedModuleCount": 0})
+
+
+class MemoryCompletionRepository(_MemoryUserCourseRepository, CompletionRepository):
+    """Course completions stored in process memory"""
+
+    def __init__(self):
+        super().__init__("completions", "completedAt")
+
+
+class MemoryModuleCompletionRepository(ModuleCompletionRepository):
+    """Module completions stored in process memory"""
+
+    def __init__(self):
+        self.collection = MemoryCollection(
+            "module_completions",
+            unique_key=("userId", "courseId", "moduleIndex"),
+            index_keys=(("userId",), ("userId", "courseId"))
+        )
+
+    async def find(self, user_id: ObjectId, course_id: ObjectId, module_index: int) -> dict | None:
+        return self.collection.unique_lookup((user_id, course_id, module_index))
+
+    async def find_by_user(self, user_id: ObjectId) -> list[dict]:
+        return self.collection.index_lookup(("userId",), (user_id,))
+
+    async def find_by_user_course(self, user_id: ObjectId, course_id: ObjectId) -> list[dict]:
+        completions = self.collection.index_lookup(("userId", "courseId"), (user_id, course_id))
+        completions.sort(key=lambda completion: completion["moduleIndex"])
+        return completions
+
+    async def count_by_user_course(self, user_id: ObjectId, course_id: ObjectId) -> int:
+        return self.collection.index_count(("userId", "courseId"), (user_id, course_id))
+
+    async def insert(self, doc: dict) -> ObjectId:
+        return self.collection.insert(doc)
+
+    async def iter_export(self, course_id: ObjectId | None, start: datetime | None, end: datetime | None, batch_size: int):
+        for doc in list(self.collection.docs.values()):
+            if _in_export(doc, "completedAt", course_id, start, end):
+                yield dict(doc)
+
+    async def count_by_course_module(self) -> dict[tuple[ObjectId, int], int]:
+        return dict(Counter((doc["courseId"], doc["moduleIndex"]) for doc in self.collection.docs.values()))
+
+    async def iter_module_indexes_by_user_course(self):
+        modules: dict[tuple[ObjectId, ObjectId], list[int]] = {}
+        for doc in self.collection.docs.values():
+            modules.setdefault((doc["userId"], doc["courseId"]), []).append(doc["moduleIndex"])
+        for key, module_indexes in modules.items():
+            yield key, module_indexes
+
+
+class MemoryCourseFunnelRepository(CourseFunnelRepository):
+    """Course funnel counters stored in process memory"""
+
+    def __init__(self):
+        self.collection = MemoryCollection("course_funnels")
+
+    async def find(self, course_id: ObjectId) -> dict | None:
+        funnel = self.collection.get(course_id)
+        if funnel is not None:
+            funnel["modules"] = dict(funnel["modules"])
+        return funnel
+
+    async def increment(self, course_id: ObjectId, enrollments: int = 0, completions: int = 0, module_index: int | None = None) -> None:
+        funnel = self.collection.docs.get(course_id)
+        if funnel is None:
+            funnel = {"_id": course_id, "enrollments": 0, "completions": 0, "modules": {}}
+            self.collection.insert(funnel)
+            funnel = self.collection.docs[course_id]
+        funnel["enrollments"] += enrollments
+        funnel["completions"] += completions
+        if module_index is not None:
+            funnel["modules"][str(module_index)] = funnel["modules"].get(str(module_index), 0) + 1
+        funnel["updatedAt"] = datetime.utcnow()
+
+    async def replace_all(self, funnels: list[dict]) -> None:
+        self.collection = MemoryCollection("course_funnels")
+        for funnel in funnels:
+            self.collection.insert({**funnel, "modules": dict(funnel["modules"])})
+
+
+class MemoryActivityRollupRepository(ActivityRollupRepository):
+    """Activity buckets stored in process memory"""
+
+    def __init__(self):
+        self.collection = MemoryCollection("activity_rollups", index_keys=(("granularity", "courseId"),))
+        self.learners: dict[str, datetime] = {}
+
+    async def increment_buckets(self, buckets: list[dict]) -> None:
+        for bucket in buckets:
+            stored = self.collection.docs.get(bucket["_id"])
+            if stored is None:
+                self.collection.insert({
+                    "_id": bucket["_id"],
+                    "granularity": bucket["granularity"],
+                    "courseId": bucket["courseId"],
+                    "start": bucket["start"],
+                    "counts": {}
+                })
+                stored = self.collection.docs[bucket["_id"]]
+            for name, value in bucket["counts"].items():
+                stored["counts"][name] = stored["counts"].get(name, 0) + value
+
+    async def insert_learner_markers(self, markers: list[dict]) -> set[str]:
+        now = datetime.utcnow()
+        # Stand-in for the MongoDB TTL index
+        for marker_id in [marker_id for marker_id, expires_at in self.learners.items() if expires_at <= now]:
+            del self.learners[marker_id]
+        inserted = set()
+        for marker in markers:
+            if marker["_id"] not in self.learners:
+                self.learners[marker["_id"]] = marker["expiresAt"]
+                inserted.add(marker["_id"])
+        return inserted
+
+    async def find_buckets(self, granularity: str, course_id: ObjectId | None, start: datetime, end: datetime) -> list[dict]:
+        buckets = [
+            {**bucket, "counts": dict(bucket["counts"])}
+            for bucket in self.collection.index_lookup(("granularity", "courseId"), (granularity, course_id))
+            if start <= bucket["start"] < end
+        ]
+        buckets.sort(key=lambda bucket: bucket["start"])
+        return buckets
+
+
+class MemoryRecommendationRepository(RecommendationRepository):
+    """Recommendation table kept in process memory (a single worker builds and reads it)"""
+
+    def __init__(self):
+        self.meta: dict | None = None
+        self.lease_until: datetime | None = None
+        self.table: dict[str, list[tuple[str, float]]] = {}
+
+    async def claim_build(self, now: datetime, built_before: datetime, lease_until: datetime) -> bool:
+        if self.lease_until is not None and self.lease_until >= now:
+            return False
+        if self.meta is not None and self.meta["builtAt"] >= built_before:
+            return False
+        self.lease_until = lease_until
+        return True
+
+    async def save_table(self, similar: dict[str, list[tuple[str, float]]], popular: list[str], built_at: datetime) -> int:
+        version = (self.meta["version"] if self.meta else 0) + 1
+        self.table = {course_id: list(similar_courses) for course_id, similar_courses in similar.items()}
+        self.meta = {"version": version, "popular": list(popular), "builtAt": built_at}
+        self.lease_until = None
+        return version
+
+    async def find_current(self) -> dict | None:
+        return dict(self.meta) if self.meta else None
+
+    async def find_table(self, version: int) -> dict[str, list[tuple[str, float]]]:
+        if self.meta is None or self.meta["version"] != version:
+            return {}
+        return dict(self.table)
+
+
+class MemoryRevokedTokenRepository(RevokedTokenRepository):
+    """Revoked token IDs stored in process memory, pruned once expired"""
+
+    def __init__(self):
+        self.collection = MemoryCollection("revoked_tokens")
+
+    async def insert(self, jti: str, expires_at: datetime) -> bool:
+        if jti in self.collection.docs:
+            return False
+        self.collection.insert({"_id": jti, "expiresAt": expires_at, "revokedAt": datetime.utcnow()})
+        return True
+
+    async def exists(self, jti: str) -> bool:
+        doc = self.collection.docs.get(jti)
+        return doc is not None and doc["expiresAt"] > datetime.utcnow()
+
+    async def find_revoked_since(self, since: datetime | None) -> list[dict]:
+        now = datetime.utcnow()
+        # Stand-in for the MongoDB TTL index
+        for jti in [jti for jti, doc in self.collection.docs.items() if doc["expiresAt"] <= now]:
+            self.collection.delete(jti)
+        return [
+            {"_id": doc["_id"], "revokedAt": doc["revokedAt"]}
+            for doc in self.collection.docs.values()
+            if since is None or doc["revokedAt"] >= since
+        ]
+
+
+class MemoryJobOutboxRepository(JobOutboxRepository):
+    """Background jobs recorded in process memory (lost with the process, like every memory-backend write)"""
+
+    def __init__(self):
+        self.collection = MemoryCollection("job_outbox")
+
+    async def insert(self, job: dict) -> None:
+        self.collection.insert(dict(job))
+
+    async def claim_due(self, now: datetime, lease_until: datetime) -> dict | None:
+        due = [doc for doc in self.collection.docs.values() if doc["runAfter"] is not None and doc["runAfter"] <= now]
+        if not due:
+            return None
+        job = min(due, key=lambda doc: doc["runAfter"])
+        self.collection.update(job["_id"], {"runAfter": lease_until})
+        return self.collection.get(job["_id"])
+
+    async def reschedule(self, job_id: ObjectId, run_after: datetime | None, attempts: int, error: str) -> None:
+        self.collection.update(job_id, {"runAfter": run_after, "attempts": attempts, "error": error})
+
+    async def delete(self, job_id: ObjectId) -> None:
+        self.collection.delete(job_id)
+
+
+class MemoryIdempotencyKeyRepository(IdempotencyKeyRepository):
+    """Idempotent responses stored in process memory, dropped once expired"""
+
+    def __init__(self):
+        self.collection = MemoryCollection("idempotency_keys")
+
+    async def claim(self, key_id: str, path: str, locked_until: datetime, expires_at: datetime) -> dict | None:
+        now = datetime.utcnow()
+        doc = self.collection.get(key_id)
+        # Stand-in for the MongoDB TTL index
+        if doc is not None and doc["expiresAt"] <= now:
+            self.collection.delete(key_id)
+            doc = None
+        if doc is not None and not (doc["status"] == "pending" and doc["lockedUntil"] < now):
+            return doc
+        self.collection.delete(key_id)
+        self.collection.insert({
+            "_id": key_id, "path": path, "status": "pending", "response": None,
+            "lockedUntil": locked_until, "expiresAt": expires_at
+        })
+        return None
+
+    async def complete(self, key_id: str, response: dict, expires_at: datetime) -> None:
+        self.collection.update(key_id, {"status": "completed", "response": response, "expiresAt": expires_at})
+
+    async def release(self, key_id: str) -> None:
+        doc = self.collection.get(key_id)
+        if doc is not None and doc["status"] == "pending":
+            self.collection.delete(key_id)
@@ -0,0 +1,538 @@
+"""
+MongoDB (Motor) repository implementations
+
+Catalog reads use the "catalog" read preference and per-user progress reads
+the "progress" one (see Settings). Every operation on a user's progress runs
+in that user's causally-consistent session, so progress reads served by a
+secondary still include the user's own earlier writes.
+"""
+from bson import ObjectId
+from .base import (
+    UserRepository,
+    CourseRepository,
+    EnrollmentRepository,
+    CompletionRepository,
+    ModuleCompletionRepository,
+    CourseFunnelRepository,
+    ActivityRollupRepository,
+    RecommendationRepository,
+    RevokedTokenRepository,
+    JobOutboxRepository,
+    IdempotencyKeyRepository
+)
+from ..utils.db import (
+    Database,
+    get_users_collection,
+    get_courses_collection,
+    get_catalog_meta_collection,
+    get_enrollments_collection,
+    get_completions_collection,
+    get_module_completions_collection,
+    get_course_funnels_collection,
+    get_activity_rollups_collection,
+    get_activity_learners_collection,
+    get_course_similarities_collection,
+    get_recommendations_meta_collection,
+    get_revoked_tokens_collection,
+    get_job_outbox_collection,
+    get_idempotency_keys_collection
+)
+from ..utils.module_progress import module_bit, merge_module_bits
+from datetime import datetime
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ID of the catalog_meta document holding the catalog version
+CATALOG_META_ID = "catalog"
+
+# ID of the recommendations_meta document
+RECOMMENDATIONS_META_ID = "table"
+
+# Similarity documents written per insert_many
+SIMILARITY_WRITE_BATCH_SIZE = 1000
+
+# Compare-and-set rounds of a module progress merge before busy enrollments are left out
+MERGE_MODULE_PROGRESS_ATTEMPTS = 5
+
+
+def _export_query(date_field: str, course_id: ObjectId | None, start: datetime | None, end: datetime | None) -> dict:
+    """Build the filter of an export: one course (or all) and a date range"""
+    query = {}
+    if course_id is not None:
+        query["courseId"] = course_id
+    if start is not None or end is not None:
+        query[date_field] = {}
+        if start is not None:
+            query[date_field]["$gte"] = start
+        if end is not None:
+            query[date_field]["$lt"] = end
+    return query
+
+
+async def _iter_cursor(cursor):
+    """Yield a cursor's documents, closing it if the consumer stops early"""
+    try:
+        async for doc in cursor:
+            yield doc
+    finally:
+        await cursor.close()
+
+
+class MongoUserRepository(UserRepository):
+    """Users stored in MongoDB"""
+
+    async def find_by_id(self, user_id: ObjectId) -> dict | None:
+        return await get_users_collection().find_one({"_id": user_id})
+
+    async def find_by_email(self, email: str) -> dict | None:
+        return await get_users_collection().find_one(
+            {"email": {"$regex": f"^{re.escape(email)}$", "$options": "i"}}
+        )
+
+    async def insert(self, user_doc: dict) -> ObjectId:
+        result = await get_users_collection().insert_one(user_doc)
+        return result.inserted_id
+
+    async def set_fields(self, user_id: ObjectId, fields: dict) -> None:
+        await get_users_collection().update_one({"_id": user_id}, {"$set": fields})
+
+    async def increment_points(self, user_id: ObjectId, points: int) -> None:
+        await get_users_collection().update_one({"_id": user_id}, {"$inc": {"points": points}})
+
+    async def award_course_bonus(self, user_id: ObjectId, course_id: ObjectId, points: int) -> bool:
+        result = await get_users_collection().update_one(
+            {"_id": user_id, "bonusCourseIds": {"$ne": course_id}},
+            {"$inc": {"points": points}, "$addToSet": {"bonusCourseIds": course_id}}
+        )
+        return result.modified_count == 1
+
+
+class MongoCourseRepository(CourseRepository):
+    """Courses stored in MongoDB"""
+
+    async def find_all(self) -> list[dict]:
+        return await get_courses_collection("catalog").find({}).to_list(length=None)
+
+    async def find_by_id(self, course_id: ObjectId) -> dict | None:
+        return await get_courses_collection("catalog").find_one({"_id": course_id})
+
+    async def count(self) -> int:
+        return await get_courses_collection().count_documents({})
+
+    async def insert_many(self, course_docs: list[dict]) -> list[ObjectId]:
+        result = await get_courses_collection().insert_many(course_docs)
+        return result.inserted_ids
+
+    async def bulk_upsert(self, upserts: list[tuple[dict, dict]]) -> tuple[int, int, dict[int, str]]:
+        if not upserts:
+            return 0, 0, {}
+        operations = [
+            UpdateOne(query, {"$set": fields, "$setOnInsert": {"createdAt": fields["updatedAt"]}}, upsert=True)
+            for query, fields in upserts
+        ]
+        try:
+            result = await get_courses_collection().bulk_write(operations, ordered=False)
+            return result.upserted_count, result.matched_count, {}
+        except BulkWriteError as e:
+            errors = {error["index"]: error["errmsg"] for error in e.details["writeErrors"]}
+            return e.details["nUpserted"], e.details["nMatched"], errors
+
+    async def get_catalog_version(self) -> int:
+        # From the primary: a lagging secondary would hide a finished import
+        meta = await get_catalog_meta_collection().find_one({"_id": CATALOG_META_ID})
+        return meta["version"] if meta else 0
+
+    async def bump_catalog_version(self) -> int:
+        meta = await get_catalog_meta_collection().find_one_and_update(
+            {"_id": CATALOG_META_ID},
+            {"$inc": {"version": 1}, "$set": {"updatedAt": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return meta["version"]
+
+
+class _MongoUserCourseRepository:
+    """Shared implementation for collections keyed by user and course"""
+
+    # Field filtered by the export date range
+    date_field = "createdAt"
+
+    def _collection(self, workload: str = None):
+        raise NotImplementedError
+
+    async def find(self, user_id: ObjectId, course_id: ObjectId) -> dict | None:
+        async with Database.user_session(user_id) as session:
+            return await self._collection("progress").find_one(
+                {"userId": user_id, "courseId": course_id},
+                session=session
+            )
+
+    async def find_by_user(self, user_id: ObjectId) -> list[dict]:
+        async with Database.user_session(user_id) as session:
+            cursor = self._collection("progress").find({"userId": user_id}, session=session)
+            return await cursor.to_list(length=None)
+
+    async def insert(self, doc: dict) -> ObjectId:
+        async with Database.user_session(doc["userId"]) as session:
+            result = await self._collection().insert_one(doc, session=session)
+        return result.inserted_id
+
+    async def count_by_course(self) -> dict[ObjectId, int]:
+        cursor = self._collection("analytics").aggregate([
+            {"$group": {"_id": "$courseId", "count": {"$sum": 1}}}
+        ])
+        return {row["_id"]: row["count"] async for row in cursor}
+
+    def iter_export(self, course_id: ObjectId | None, start: datetime | None, end: datetime | None, batch_size: int):
+        return _iter_cursor(self._collection("analytics").find(
+            _export_query(self.date_field, course_id, start, end),
+            batch_size=batch_size
+        ))
+
+    async def iter_user_course_pairs(self, batch_size: int):
+        cursor = self._collection("analytics").find({}, {"_id": 0, "userId": 1, "courseId": 1}, batch_size=batch_size)
+        batch = []
+        async for doc in cursor:
+            batch.append((doc["userId"], doc["courseId"]))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+class MongoEnrollmentRepository(_MongoUserCourseRepository, EnrollmentRepository):
+    """Enrollments stored in MongoDB"""
+
+    date_field = "enrolledAt"
+
+    def _collection(self, workload: str = None):
+        return get_enrollments_collection(workload)
+
+    async def mark_module_completed(self, user_id: ObjectId, course_id: ObjectId, module_index: int) -> dict | None:
+        word, mask = module_bit(module_index)
+        field = f"moduleBits.{word}"
+        async with Database.user_session(user_id) as session:
+            return await self._collection().find_one_and_update(
+                {
+                    "userId": user_id,
+                    "courseId": course_id,
+                    # Only count the module if its bit is still clear (missing words are zero)
+                    "$or": [{field: {"$exists": False}}, {field: {"$bitsAllClear": mask}}]
+                },
+                {"$bit": {field: {"or": mask}}, "$inc": {"completedModuleCount": 1}},
+                return_document=ReturnDocument.AFTER,
+                session=session
+            )
+
+    async def merge_module_progress(self, modules: dict[tuple[ObjectId, ObjectId], list[int]]) -> int:
+        collection = self._collection()
+        updated = 0
+        pending = modules
+        for _ in range(MERGE_MODULE_PROGRESS_ATTEMPTS):
+            docs = await collection.find(
+                {"$or": [{"userId": user_id, "courseId": course_id} for user_id, course_id in pending]},
+                {"userId": 1, "courseId": 1, "moduleBits": 1, "completedModuleCount": 1}
+            ).to_list(length=None)
+            operations = []
+            retry = {}
+            for doc in docs:
+                key = (doc["userId"], doc["courseId"])
+                current = doc.get("moduleBits")
+                fields = merge_module_bits(current or {}, pending[key])
+                if current == fields["moduleBits"] and doc.get("completedModuleCount") == fields["completedModuleCount"]:
+                    continue
+                # Compare-and-set: a module completed since the read makes the update miss
+                unchanged = current if current is not None else {"$exists": False}
+                operations.append(UpdateOne({"_id": doc["_id"], "moduleBits": unchanged}, {"$set": fields}))
+                retry[key] = pending[key]
+            if not operations:
+                break
+            result = await collection.bulk_write(operations, ordered=False)
+            updated += result.modified_count
+            if result.modified_count == len(operations):
+                break
+            # Re-read and merge again; the ones written meanwhile are skipped as unchanged
+            pending = retry
+        else:
+            logger.warning("Gave up merging module progress of %s busy enrollment(s)", len(pending))
+        return updated
+
+    async def initialize_module_progress(self) -> None:
+        await self._collection().update_many(
+            {"completedModuleCount": {"$exists": False}},
+            {"$set": {"moduleBits": {}, "completedModuleCount": 0}}
+        )
+
+
+class MongoCompletionRepository(_MongoUserCourseRepository, CompletionRepository):
+    """Course completions stored in MongoDB"""
+
+    date_field = "completedAt"
+
+    def _collection(self, workload: str = None):
+        return get_completions_collection(workload)
+
+
+class MongoModuleCompletionRepository(ModuleCompletionRepository):
+    """Module completions stored in MongoDB"""
+
+    async def find(self, user_id: ObjectId, course_id: ObjectId, module_index: int) -> dict | None:
+        async with Database.user_session(user_id) as session:
+            return await get_module_completions_collection("progress").find_one({
+                "userId": user_id,
+                "courseId": course_id,
+                "moduleIndex": module_index
+            }, session=session)
+
+    async def find_by_user(self, user_id: ObjectId) -> list[dict]:
+        async with Database.user_session(user_id) as session:
+            cursor = get_module_completions_collection("progress").find({"userId": user_id}, session=session)
+            return await cursor.to_list(length=None)
+
+    async def find_by_user_course(self, user_id: ObjectId, course_id: ObjectId) -> list[dict]:
+        async with Database.user_session(user_id) as session:
+            cursor = get_module_completions_collection("progress").find({
+                "userId": user_id,
+                "courseId": course_id
+            }, session=session).sort("moduleIndex", 1)
+            return await cursor.to_list(length=None)
+
+    async def count_by_user_course(self, user_id: ObjectId, course_id: ObjectId) -> int:
+        async with Database.user_session(user_id) as session:
+            return await get_module_completions_collection("progress").count_documents({
+                "userId": user_id,
+                "courseId": course_id
+            }, session=session)
+
+    async def insert(self, doc: dict) -> ObjectId:
+        async with Database.user_session(doc["userId"]) as session:
+            result = await get_module_completions_collection().insert_one(doc, session=session)
+        return result.inserted_id
+
+    def iter_export(self, course_id: ObjectId | None, start: datetime | None, end: datetime | None, batch_size: int):
+        return _iter_cursor(get_module_completions_collection("analytics").find(
+            _export_query("completedAt", course_id, start, end),
+            batch_size=batch_size
+        ))
+
+    async def count_by_course_module(self) -> dict[tuple[ObjectId, int], int]:
+        cursor = get_module_completions_collection("analytics").aggregate([
+            {"$group": {"_id": {"courseId": "$courseId", "moduleIndex": "$moduleIndex"}, "count": {"$sum": 1}}}
+        ])
+        return {(row["_id"]["courseId"], row["_id"]["moduleIndex"]): row["count"] async for row in cursor}
+
+    async def iter_module_indexes_by_user_course(self):
+        cursor = get_module_completions_collection("analytics").aggregate(
+            [{"$group": {"_id": {"userId": "$userId", "courseId": "$courseId"}, "modules": {"$push": "$moduleIndex"}}}],
+            allowDiskUse=True
+        )
+        async for row in cursor:
+            yield (row["_id"]["userId"], row["_id"]["courseId"]), row["modules"]
+
+
+class MongoCourseFunnelRepository(CourseFunnelRepository):
+    """Course funnel counters stored in MongoDB, updated with $inc"""
+
+    async def find(self, course_id: ObjectId) -> dict | None:
+        return await get_course_funnels_collection("analytics").find_one({"_id": course_id})
+
+    async def increment(self, course_id: ObjectId, enrollments: int = 0, completions: int = 0, module_index: int | None = None) -> None:
+        increments = {"enrollments": enrollments, "completions": completions}
+        if module_index is not None:
+            increments[f"modules.{module_index}"] = 1
+        await get_course_funnels_collection().update_one(
+            {"_id": course_id},
+            {"$inc": increments, "$set": {"updatedAt": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def replace_all(self, funnels: list[dict]) -> None:
+        collection = get_course_funnels_collection()
+        if funnels:
+            await collection.bulk_write(
+                [ReplaceOne({"_id": funnel["_id"]}, funnel, upsert=True) for funnel in funnels],
+                ordered=False
+            )
+        await collection.delete_many({"_id": {"$nin": [funnel["_id"] for funnel in funnels]}})
+
+
+class MongoActivityRollupRepository(ActivityRollupRepository):
+    """Activity buckets stored in MongoDB, updated with unordered bulk $inc upserts"""
+
+    async def increment_buckets(self, buckets: list[dict]) -> None:
+        if not buckets:
+            return
+        await get_activity_rollups_collection().bulk_write([
+            UpdateOne(
+                {"_id": bucket["_id"]},
+                {
+                    "$inc": {f"counts.{name}": value for name, value in bucket["counts"].items()},
+                    "$setOnInsert": {"granularity": bucket["granularity"], "courseId": bucket["courseId"], "start": bucket["start"]}
+                },
+                upsert=True
+            )
+            for bucket in buckets
+        ], ordered=False)
+
+    async def insert_learner_markers(self, markers: list[dict]) -> set[str]:
+        if not markers:
+            return set()
+        try:
+            await get_activity_learners_collection().insert_many(markers, ordered=False)
+            return {marker["_id"] for marker in markers}
+        except BulkWriteError as e:
+            # Duplicates are learners already counted (by this or another worker)
+            if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                raise
+            duplicates = {error["index"] for error in e.details["writeErrors"]}
+            return {marker["_id"] for index, marker in enumerate(markers) if index not in duplicates}
+
+    async def find_buckets(self, granularity: str, course_id: ObjectId | None, start: datetime, end: datetime) -> list[dict]:
+        cursor = get_activity_rollups_collection("analytics").find({
+            "granularity": granularity,
+            "courseId": course_id,
+            "start": {"$gte": start, "$lt": end}
+        }).sort("start", 1)
+        return await cursor.to_list(length=None)
+
+
+class MongoRecommendationRepository(RecommendationRepository):
+    """Recommendation tables stored in MongoDB, one document per course and version"""
+
+    async def claim_build(self, now: datetime, built_before: datetime, lease_until: datetime) -> bool:
+        try:
+            # Upserted on the first build; otherwise a non-matching filter makes the upsert collide
+            await get_recommendations_meta_collection().update_one(
+                {
+                    "_id": RECOMMENDATIONS_META_ID,
+                    "$and": [
+                        {"$or": [{"leaseUntil": None}, {"leaseUntil": {"$lt": now}}]},
+                        {"$or": [{"builtAt": None}, {"builtAt": {"$lt": built_before}}]}
+                    ]
+                },
+                {"$set": {"leaseUntil": lease_until}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def save_table(self, similar: dict[str, list[tuple[str, float]]], popular: list[str], built_at: datetime) -> int:
+        meta_collection = get_recommendations_meta_collection()
+        meta = await meta_collection.find_one({"_id": RECOMMENDATIONS_META_ID}, {"version": 1})
+        version = (meta or {}).get("version", 0) + 1
+        collection = get_course_similarities_collection()
+        docs = [
+            {
+                "_id": f"{version}:{course_id}",
+                "version": version,
+                "courseId": course_id,
+                "similar": [{"courseId": other_id, "score": score} for other_id, score in similar_courses]
+            }
+            for course_id, similar_courses in similar.items()
+        ]
+        for start in range(0, len(docs), SIMILARITY_WRITE_BATCH_SIZE):
+            await collection.insert_many(docs[start:start + SIMILARITY_WRITE_BATCH_SIZE], ordered=False)
+        await meta_collection.update_one(
+            {"_id": RECOMMENDATIONS_META_ID},
+            {"$set": {"version": version, "popular": popular, "builtAt": built_at, "leaseUntil": None}},
+            upsert=True
+        )
+        # The previous version stays for workers still loading it
+        await collection.delete_many({"version": {"$lt": version - 1}})
+        return version
+
+    async def find_current(self) -> dict | None:
+        meta = await get_recommendations_meta_collection().find_one({"_id": RECOMMENDATIONS_META_ID})
+        return meta if meta and "version" in meta else None
+
+    async def find_table(self, version: int) -> dict[str, list[tuple[str, float]]]:
+        # From the primary, like the meta document: a secondary may not have the version yet
+        cursor = get_course_similarities_collection().find({"version": version}, {"courseId": 1, "similar": 1})
+        return {
+            doc["courseId"]: [(other["courseId"], other["score"]) for other in doc["similar"]]
+            async for doc in cursor
+        }
+
+
+class MongoRevokedTokenRepository(RevokedTokenRepository):
+    """Revoked token IDs stored in MongoDB, removed by a TTL index once expired"""
+
+    async def insert(self, jti: str, expires_at: datetime) -> bool:
+        try:
+            await get_revoked_tokens_collection().insert_one(
+                {"_id": jti, "expiresAt": expires_at, "revokedAt": datetime.utcnow()}
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def exists(self, jti: str) -> bool:
+        # Primary read: a revocation must be visible as soon as it is written
+        return await get_revoked_tokens_collection().find_one({"_id": jti}, {"_id": 1}) is not None
+
+    async def find_revoked_since(self, since: datetime | None) -> list[dict]:
+        query = {"expiresAt": {"$gt": datetime.utcnow()}}
+        if since is not None:
+            query["revokedAt"] = {"$gte": since}
+        return await get_revoked_tokens_collection().find(query, {"_id": 1, "revokedAt": 1}).to_list(length=None)
+
+
+class MongoJobOutboxRepository(JobOutboxRepository):
+    """Durable background jobs stored in MongoDB, claimed with leases"""
+
+    async def insert(self, job: dict) -> None:
+        await get_job_outbox_collection().insert_one(job)
+
+    async def claim_due(self, now: datetime, lease_until: datetime) -> dict | None:
+        return await get_job_outbox_collection().find_one_and_update(
+            {"runAfter": {"$lte": now}},
+            {"$set": {"runAfter": lease_until}},
+            sort=[("runAfter", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def reschedule(self, job_id: ObjectId, run_after: datetime | None, attempts: int, error: str) -> None:
+        await get_job_outbox_collection().update_one(
+            {"_id": job_id},
+            {"$set": {"runAfter": run_after, "attempts": attempts, "error": error}}
+        )
+
+    async def delete(self, job_id: ObjectId) -> None:
+        await get_job_outbox_collection().delete_one({"_id": job_id})
+
+
+class MongoIdempotencyKeyRepository(IdempotencyKeyRepository):
+    """Idempotent responses stored in MongoDB, removed by a TTL index once expired"""
+
+    async def claim(self, key_id: str, path: str, locked_until: datetime, expires_at: datetime) -> dict | None:
+        pending = {"path": path, "status": "pending", "response": None, "lockedUntil": locked_until, "expiresAt": expires_at}
+        collection = get_idempotency_keys_collection()
+        try:
+            await collection.insert_one({"_id": key_id, **pending})
+            return None
+        except DuplicateKeyError:
+            pass
+        # Primary reads: the key may have been written a moment ago
+        taken_over = await collection.find_one_and_update(
+            {"_id": key_id, "status": "pending", "lockedUntil": {"$lt": datetime.utcnow()}},
+            {"$set": pending}
+        )
+        if taken_over is not None:
+            return None
+        return await collection.find_one({"_id": key_id}) or {"_id": key_id, **pending}
+
+    async def complete(self, key_id: str, response: dict, expires_at: datetime) -> None:
+        await get_idempotency_keys_collection().update_one(
+            {"_id": key_id},
+            {"$set": {"status": "completed", "response": response, "expiresAt": expires_at}}
+        )
+
+    async def release(self, key_id: str) -> None:
+        await get_idempotency_keys_collection().delete_one({"_id": key_id, "status": "pending"})
@@ -0,0 +1,128 @@
+"""
+Administration routes for e-learning platform
+"""
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import datetime, timezone
+from ..models.analytics import ExportDatasetEnum, ExportFormatEnum
+from ..models.course import CourseImportResponse, CourseImportError
+from ..middleware.auth import get_admin_user_claims_dependency
+from ..utils.db_ops import db_ops_budget
+from ..utils.export import start_export, EXPORT_MEDIA_TYPES
+from ..utils.course_import import CourseImport, iter_lines, COURSE_IMPORT_BATCH_SIZE, MAX_IMPORT_ROWS_PER_REQUEST
+from ..config import settings
+from bson import ObjectId
+from bson.errors import InvalidId
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Create router for administration endpoints
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+@router.get("/exports/{dataset}")
+@db_ops_budget(1)  # Opening the cursor; later batches are read while streaming
+async def export_progress(
+    dataset: ExportDatasetEnum,
+    format: ExportFormatEnum = Query(ExportFormatEnum.NDJSON),
+    courseId: Optional[str] = Query(None, description="Only export this course"),
+    start: Optional[datetime] = Query(None, description="Rows dated at or after (UTC unless an offset is given)"),
+    end: Optional[datetime] = Query(None, description="Rows dated before (UTC unless an offset is given)"),
+    current_user: dict = Depends(get_admin_user_claims_dependency)
+):
+    """
+    Stream enrollments, completions or module completions as NDJSON or CSV (admin route)
+    
+    Rows are read from a batched cursor and sent as they are encoded, so
+    memory use does not depend on the size of the export. Rows are in
+    storage order; enrollments are dated by "enrolledAt", completions by
+    "completedAt".
+    
+    Args:
+        dataset: Collection to export
+        format: "ndjson" or "csv"
+        courseId: Only export this course
+        start: Range start
+        end: Range end
+        current_user: Current administrator
+        
+    Returns:
+        Streaming file download
+    """
+    try:
+        course_object_id = None
+        if courseId is not None:
+            try:
+                course_object_id = ObjectId(courseId)
+            except InvalidId:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid course ID format"
+                )
+        
+        # Progress dates are stored in naive UTC: convert offsets before dropping them
+        start, end = (
+            value.astimezone(timezone.utc).replace(tzinfo=None) if value is not None and value.tzinfo else value
+            for value in (start, end)
+        )
+        
+        chunks = await start_export(dataset.value, format.value, course_object_id, start, end, settings.export_batch_size)
+        
+        filename = f"{dataset.value}-{datetime.utcnow():%Y%m%dT%H%M%S}.{format.value}"
+        logger.info("User %s started export %s", current_user["email"], filename)
+        
+        return StreamingResponse(
+            chunks,
+            media_type=EXPORT_MEDIA_TYPES[format.value],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to export %s: %s", dataset.value, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to export data"
+        )
+
+
+@router.post("/courses/import", response_model=CourseImportResponse)
+@db_ops_budget(MAX_IMPORT_ROWS_PER_REQUEST // COURSE_IMPORT_BATCH_SIZE)  # One bulk upsert per batch
+async def import_courses(request: Request, current_user: dict = Depends(get_admin_user_claims_dependency)):
+    """
+    Create or update courses from an NDJSON body, one course per line (admin route)
+    
+    The body is read as it arrives and imported in batches; invalid lines
+    are reported and skipped without failing the import.
+    
+    Args:
+        request: Request with the NDJSON body
+        current_user: Current administrator
+        
+    Returns:
+        Import counts and per-line errors
+    """
+    try:
+        course_import = await CourseImport(max_rows=MAX_IMPORT_ROWS_PER_REQUEST).run(iter_lines(request.stream()))
+        
+        logger.info("User %s imported %s course(s)", current_user["email"], course_import.inserted + course_import.updated)
+        
+        return CourseImportResponse(
+            success=True,
+            received=course_import.received,
+            inserted=course_import.inserted,
+            updated=course_import.updated,
+            failed=course_import.failed,
+            errors=[CourseImportError(**error) for error in course_import.errors],
+            truncated=course_import.truncated
+        )
+        
+    except Exception as e:
+        logger.error("Failed to import courses: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to import courses"
+        )
@@ -0,0 +1,105 @@
+"""
+Analytics routes for e-learning platform
+"""
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from typing import Optional
+from datetime import datetime, timezone
+from ..models.analytics import GranularityEnum, ActivityBucket, ActivitySeriesResponse
+from ..middleware.auth import get_admin_user_claims_dependency
+from ..utils.db_ops import db_ops_budget
+from ..utils.activity import ActivityRollups, bucket_length
+from bson import ObjectId
+from bson.errors import InvalidId
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Create router for analytics endpoints
+router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+
+# Largest series returned at once (a year of days, a month of hours)
+MAX_ACTIVITY_BUCKETS = 1000
+
+# Range returned when no start is given, in buckets
+DEFAULT_ACTIVITY_BUCKETS = {
+    GranularityEnum.HOUR: 48,
+    GranularityEnum.DAY: 30,
+    GranularityEnum.WEEK: 26,
+}
+
+
+@router.get("/activity", response_model=ActivitySeriesResponse)
+@db_ops_budget(1)
+async def get_activity(
+    granularity: GranularityEnum = Query(GranularityEnum.DAY),
+    courseId: Optional[str] = Query(None, description="Course ID, platform-wide activity if omitted"),
+    start: Optional[datetime] = Query(None, description="UTC range start, rounded down to its bucket"),
+    end: Optional[datetime] = Query(None, description="UTC range end (exclusive), now if omitted"),
+    current_user: dict = Depends(get_admin_user_claims_dependency)
+):
+    """
+    Get learning activity per hour, day or week (admin route)
+    
+    Served from pre-aggregated bucket documents: one document read per
+    bucket however many events it holds.
+    
+    Args:
+        granularity: Bucket size
+        courseId: Course ID, or None for the whole platform
+        start: Range start
+        end: Range end
+        current_user: Current administrator
+        
+    Returns:
+        Enrollments, completions, points and active learners per bucket
+    """
+    try:
+        course_object_id = None
+        if courseId is not None:
+            try:
+                course_object_id = ObjectId(courseId)
+            except InvalidId:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid course ID format"
+                )
+        
+        # Buckets are stored in naive UTC: convert offsets before dropping them
+        start, end = (
+            value.astimezone(timezone.utc).replace(tzinfo=None) if value is not None and value.tzinfo else value
+            for value in (start, end)
+        )
+        end = end or datetime.utcnow()
+        step = bucket_length(granularity.value)
+        start = start or end - step * DEFAULT_ACTIVITY_BUCKETS[granularity]
+        
+        if start >= end:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="start must be before end"
+            )
+        if (end - start) / step > MAX_ACTIVITY_BUCKETS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Range too long: at most {MAX_ACTIVITY_BUCKETS} {granularity.value} buckets"
+            )
+        
+        series = await ActivityRollups.get_series(granularity.value, course_object_id, start, end)
+        
+        return ActivitySeriesResponse(
+            success=True,
+            granularity=granularity,
+            courseId=courseId,
+            start=series[0]["start"] if series else start,
+            end=end,
+            buckets=[ActivityBucket(**bucket) for bucket in series]
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to get activity for user %s: %s", current_user["email"], e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get activity"
+        )
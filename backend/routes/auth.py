@@ -1,25 +1,37 @@
 """
 Authentication routes for user signup and login
 """
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request
+from fastapi.security import HTTPAuthorizationCredentials
 from ..models.user import (
     UserSignupRequest, 
     UserLoginRequest, 
+    RefreshTokenRequest, 
+    LogoutRequest, 
     AuthResponse, 
     UserResponse,
     UserInDB
 )
 from ..utils.auth import (
     hash_password, 
-    verify_password, 
+    verify_and_update_password, 
     validate_email, 
     validate_password_strength,
-    create_access_token
+    build_token_claims,
+    create_access_token,
+    create_refresh_token,
+    verify_token,
+    REFRESH_TOKEN_TYPE
 )
-from ..utils.db import get_users_collection
-from ..middleware.auth import get_current_user_dependency
+from ..utils.revocation import TokenRevocationList
+from ..repositories import get_users_repository
+from ..middleware.auth import get_current_user_dependency, get_current_user_claims_dependency, authenticate_token, security
+from ..utils.db_ops import db_ops_budget
+from ..utils.rate_limit import login_rate_limiter
+from ..utils.jobs import BackgroundJobs, background_job
 from datetime import datetime
 from bson import ObjectId
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,6 +41,7 @@ router = APIRouter(prefix="/api/auth", tags=["authentication"])
 
 
 @router.post("/signup", response_model=AuthResponse)
+@db_ops_budget(2)
 async def signup(user_data: UserSignupRequest):
     """
     Register a new user
@@ -60,10 +73,8 @@ async def signup(user_data: UserSignupRequest):
         )
     
     # Check if email already exists (case-insensitive)
-    users_collection = get_users_collection()
-    existing_user = await users_collection.find_one(
-        {"email": {"$regex": f"^{user_data.email}$", "$options": "i"}}
-    )
+    users_repository = get_users_repository()
+    existing_user = await users_repository.find_by_email(user_data.email)
     
     if existing_user:
         raise HTTPException(
@@ -72,7 +83,7 @@ async def signup(user_data: UserSignupRequest):
         )
     
     # Hash password
-    password_hash = hash_password(user_data.password)
+    password_hash = await asyncio.to_thread(hash_password, user_data.password)
     
     # Create user document
     now = datetime.utcnow()
@@ -86,12 +97,11 @@ async def signup(user_data: UserSignupRequest):
     }
     
     # Insert user into database
-    result = await users_collection.insert_one(user_doc)
-    user_id = result.inserted_id
+    user_id = await users_repository.insert(user_doc)
     
-    # Generate JWT token
-    token_data = {"user_id": str(user_id), "email": user_data.email.lower()}
-    access_token = create_access_token(token_data)
+    # Generate JWT tokens
+    access_token = create_access_token(build_token_claims({**user_doc, "_id": user_id}))
+    refresh_token = create_refresh_token(str(user_id))
     
     # Create response
     user_response = UserResponse(
@@ -101,52 +111,82 @@ async def signup(user_data: UserSignupRequest):
         points=0
     )
     
-    logger.info(f"New user registered: {user_data.email}")
+    logger.info("New user registered: %s", user_data.email)
     
     return AuthResponse(
         success=True,
         message="Account created successfully",
         token=access_token,
+        refreshToken=refresh_token,
         user=user_response
     )
 
 
+@background_job("users.record_login")
+async def record_login(user_id: ObjectId, fields: dict):
+    """
+    Save the login timestamp and any rehashed password of a user (background job)
+    
+    Args:
+        user_id: User ID
+        fields: Fields to set
+    """
+    await get_users_repository().set_fields(user_id, fields)
+
+
 @router.post("/login", response_model=AuthResponse)
-async def login(user_data: UserLoginRequest):
+@db_ops_budget(3)
+async def login(user_data: UserLoginRequest, request: Request):
     """
     Authenticate user and return token
     
     Args:
         user_data: User login data
+        request: Incoming request (for the client address)
         
     Returns:
         Authentication response with token and user info
         
     Raises:
-        HTTPException: If credentials are invalid
+        HTTPException: If credentials are invalid or too many attempts were made
     """
+    # Rate limit per IP and per email before spending CPU on bcrypt
+    client_ip = request.client.host if request.client else None
+    retry_after = await login_rate_limiter.check(client_ip, user_data.email)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts. Please try again later.",
+            headers={"Retry-After": str(retry_after)}
+        )
+    
     # Find user by email (case-insensitive)
-    users_collection = get_users_collection()
-    user = await users_collection.find_one(
-        {"email": {"$regex": f"^{user_data.email}$", "$options": "i"}}
-    )
+    users_repository = get_users_repository()
+    user = await users_repository.find_by_email(user_data.email)
     
     # Check if user exists and password is correct
-    if not user or not verify_password(user_data.password, user["password_hash"]):
+    password_matches, new_password_hash = False, None
+    if user:
+        password_matches, new_password_hash = await verify_and_update_password(
+            user_data.password, user["password_hash"]
+        )
+    if not password_matches:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
     
-    # Update user's last login timestamp
-    await users_collection.update_one(
-        {"_id": user["_id"]},
-        {"$set": {"updatedAt": datetime.utcnow()}}
-    )
+    # Update user's last login timestamp, migrating outdated password hashes,
+    # after the response (a lost update is redone at the next login)
+    login_updates = {"updatedAt": datetime.utcnow()}
+    if new_password_hash:
+        login_updates["password_hash"] = new_password_hash
+        logger.info("Rehashed password for %s with current hashing parameters", user["email"])
+    await BackgroundJobs.enqueue("users.record_login", user_id=user["_id"], fields=login_updates)
     
-    # Generate JWT token
-    token_data = {"user_id": str(user["_id"]), "email": user["email"]}
-    access_token = create_access_token(token_data)
+    # Generate JWT tokens
+    access_token = create_access_token(build_token_claims(user))
+    refresh_token = create_refresh_token(str(user["_id"]))
     
     # Create response
     user_response = UserResponse(
@@ -156,23 +196,115 @@ async def login(user_data: UserLoginRequest):
         points=user.get("points", 0)
     )
     
-    logger.info(f"User logged in: {user['email']}")
+    logger.info("User logged in: %s", user["email"])
     
     return AuthResponse(
         success=True,
         message="Login successful",
         token=access_token,
+        refreshToken=refresh_token,
         user=user_response
     )
 
 
+@router.post("/refresh", response_model=AuthResponse)
+@db_ops_budget(2)
+async def refresh(refresh_data: RefreshTokenRequest):
+    """
+    Exchange a refresh token for a new access token
+    
+    Reads the user so the new access token carries current points and
+    profile claims. The refresh token is rotated: the one presented is
+    revoked, so a stolen refresh token stops working once either party uses it.
+    Revoking is the check that counts: of concurrent refreshes with the same
+    token, only the one whose revocation is recorded first gets new tokens.
+    
+    Args:
+        refresh_data: Refresh token request data
+        
+    Returns:
+        Authentication response with new tokens and user info
+        
+    Raises:
+        HTTPException: If the refresh token is invalid or the user no longer exists
+    """
+    payload = verify_token(refresh_data.refreshToken, REFRESH_TOKEN_TYPE)
+    user_id = payload.get("user_id") if payload else None
+    user = None
+    if user_id and ObjectId.is_valid(user_id) and not await TokenRevocationList.is_revoked(payload.get("jti")):
+        user = await get_users_repository().find_by_id(ObjectId(user_id))
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    if payload.get("jti") and not await TokenRevocationList.revoke(payload["jti"], datetime.utcfromtimestamp(payload["exp"])):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user_response = UserResponse(
+        id=str(user["_id"]),
+        email=user["email"],
+        fullName=user["fullName"],
+        points=user.get("points", 0)
+    )
+    
+    return AuthResponse(
+        success=True,
+        message="Token refreshed",
+        token=create_access_token(build_token_claims(user)),
+        refreshToken=create_refresh_token(str(user["_id"])),
+        user=user_response
+    )
+
+
+@router.post("/logout")
+@db_ops_budget(2)
+async def logout(logout_data: LogoutRequest = None, credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """
+    Revoke the current access token and, if given, the refresh token
+    
+    Args:
+        logout_data: Optional refresh token to revoke as well
+        credentials: HTTP authorization credentials
+        
+    Returns:
+        Success message
+        
+    Raises:
+        HTTPException: If the access token is invalid or already revoked
+    """
+    user_info = await authenticate_token(credentials.credentials)
+    if user_info["jti"]:
+        await TokenRevocationList.revoke(user_info["jti"], user_info["expiresAt"])
+    
+    if logout_data and logout_data.refreshToken:
+        payload = verify_token(logout_data.refreshToken, REFRESH_TOKEN_TYPE)
+        # Only revoke the caller's own refresh tokens
+        if payload and payload.get("jti") and payload.get("user_id") == user_info["user_id"]:
+            await TokenRevocationList.revoke(payload["jti"], datetime.utcfromtimestamp(payload["exp"]))
+    
+    logger.info("User logged out: %s", user_info["email"])
+    
+    return {"success": True, "message": "Logged out successfully"}
+
+
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: dict = Depends(get_current_user_dependency)):
+@db_ops_budget(0)
+async def get_current_user_info(current_user: dict = Depends(get_current_user_claims_dependency)):
     """
-    Get current user information
+    Get current user information from the access token claims
+    
+    Points are as of when the access token was issued; call /refresh for
+    current values.
     
     Args:
-        current_user: Current authenticated user
+        current_user: Current authenticated user (token claims)
         
     Returns:
         User information
@@ -186,24 +318,19 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user_de
 
 
 @router.post("/test-points/{points}")
+@db_ops_budget(3)
 async def test_add_points(points: int, current_user: dict = Depends(get_current_user_dependency)):
     """
     Test endpoint to add points to current user (for testing)
     """
-    from ..utils.db import get_users_collection
-    from bson import ObjectId
-    
-    users_collection = get_users_collection()
+    users_repository = get_users_repository()
     user_id = ObjectId(current_user["_id"])
     
     # Update user points
-    await users_collection.update_one(
-        {"_id": user_id},
-        {"$inc": {"points": points}}
-    )
+    await users_repository.increment_points(user_id, points)
     
     # Get updated user
-    updated_user = await users_collection.find_one({"_id": user_id})
+    updated_user = await users_repository.find_by_id(user_id)
     
     return {
         "success": True,
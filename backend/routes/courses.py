@@ -1,16 +1,41 @@
 """
 Courses routes for e-learning platform
 """
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 from datetime import datetime
-from ..models.course import Course, CourseResponse, CoursesListResponse, CourseDetailResponse, CompletionCreateResponse
+from ..models.course import Course, CourseResponse, CoursesListResponse, CourseDetailResponse, CompletionCreateResponse, CatalogResponse, CourseOverlay, CourseSearchResponse, CourseSearchResult, CourseSuggestResponse, CourseSuggestion, LevelEnum, RecommendedCourse, RecommendedCoursesResponse, CourseFunnelResponse, FunnelStep
 from ..models.enrollment import EnrollmentCreateResponse
 from ..models.completion import ModuleCompletionCreateResponse, ModuleCompletionResponse, CourseProgressResponse
-from ..middleware.auth import get_current_user_dependency
-from ..utils.db import get_courses_collection, get_completions_collection, get_enrollments_collection, get_module_completions_collection, get_users_collection
+from ..middleware.auth import get_current_user_dependency, get_current_user_claims_dependency, get_admin_user_claims_dependency
+from ..utils.db_ops import db_ops_budget
+from ..utils.catalog import CatalogCache, serialize_overlay, to_catalog_course
+from ..utils.compression import choose_encoding
+from ..utils.recommendations import Recommendations
+from ..utils.funnel import record_funnel_progress, funnel_steps
+from ..utils.activity import ActivityRollups
+from ..utils.events import ProgressEventHub, ProgressSubscription, format_sse
+from ..utils.module_progress import module_progress_fields, is_module_completed, next_module_index
+from ..utils.jobs import BackgroundJobs, background_job
+from ..utils.idempotency import idempotent
+from ..utils.logs import log_sample_rate
+from ..utils.db import DATABASE_UNAVAILABLE_ERRORS
+from ..utils.metrics import Metrics
+from ..utils.single_flight import SingleFlight
+from ..config import settings
+from ..repositories import (
+    get_courses_repository,
+    get_completions_repository,
+    get_enrollments_repository,
+    get_module_completions_repository,
+    get_course_funnels_repository,
+    get_users_repository
+)
 from bson import ObjectId
 from bson.errors import InvalidId
+from pymongo.errors import DuplicateKeyError
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,6 +45,8 @@ router = APIRouter(prefix="/api/courses", tags=["courses"])
 
 
 @router.post("/{course_id}/enroll", response_model=EnrollmentCreateResponse)
+@db_ops_budget(6)
+@idempotent
 async def enroll_in_course(course_id: str, current_user: dict = Depends(get_current_user_dependency)):
     """
     Enroll user in a course (protected route)
@@ -41,12 +68,11 @@ async def enroll_in_course(course_id: str, current_user: dict = Depends(get_curr
                 detail="Invalid course ID format"
             )
         
-        # Get collections
-        courses_collection = get_courses_collection()
-        enrollments_collection = get_enrollments_collection()
+        # Get repositories
+        enrollments_repository = get_enrollments_repository()
         
         # Check if course exists
-        course = await courses_collection.find_one({"_id": object_id})
+        course = await find_course(object_id)
         if not course:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -55,10 +81,7 @@ async def enroll_in_course(course_id: str, current_user: dict = Depends(get_curr
         
         # Check if user is already enrolled
         user_id = ObjectId(current_user["_id"])
-        existing_enrollment = await enrollments_collection.find_one({
-            "userId": user_id,
-            "courseId": object_id
-        })
+        existing_enrollment = await enrollments_repository.find(user_id, object_id)
         
         if existing_enrollment:
             raise HTTPException(
@@ -72,25 +95,31 @@ async def enroll_in_course(course_id: str, current_user: dict = Depends(get_curr
             "userId": user_id,
             "courseId": object_id,
             "enrolledAt": enrollment_time,
-            "createdAt": enrollment_time
+            "createdAt": enrollment_time,
+            **module_progress_fields(())
         }
         
         # Insert enrollment
-        result = await enrollments_collection.insert_one(enrollment_doc)
+        inserted_id = await enrollments_repository.insert(enrollment_doc)
         
-        if not result.inserted_id:
+        if not inserted_id:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to enroll in course"
             )
         
+        # Rank the course higher in typeahead suggestions
+        CatalogCache.record_enrollment(course_id)
+        await record_funnel_progress(object_id, enrollments=1)
+        ActivityRollups.record(user_id, object_id, enrollment_time, enrollments=1)
+        
         # Create response data
         enrollment_data = {
             "courseId": course_id,
             "enrolledAt": enrollment_time.isoformat()
         }
         
-        logger.info(f"User {current_user['email']} enrolled in course {course_id}")
+        logger.info("User %s enrolled in course %s", current_user["email"], course_id)
         
         return EnrollmentCreateResponse(
             success=True,
@@ -101,7 +130,7 @@ async def enroll_in_course(course_id: str, current_user: dict = Depends(get_curr
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to enroll user in course {course_id}: {e}")
+        logger.error("Failed to enroll user in course %s: %s", course_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to enroll in course"
@@ -112,12 +141,12 @@ async def seed_courses():
     """
     Seed the database with initial course data
     """
-    courses_collection = get_courses_collection()
+    courses_repository = get_courses_repository()
     
     # Check if courses already exist
-    existing_count = await courses_collection.count_documents({})
+    existing_count = await courses_repository.count()
     if existing_count > 0:
-        logger.info(f"Database already contains {existing_count} courses. Skipping seeding.")
+        logger.info("Database already contains %d courses. Skipping seeding.", existing_count)
         return
     
     # Define the 3 courses to seed
@@ -206,14 +235,82 @@ async def seed_courses():
     ]
     
     try:
-        result = await courses_collection.insert_many(seed_data)
-        logger.info(f"Successfully seeded {len(result.inserted_ids)} courses")
+        inserted_ids = await courses_repository.insert_many(seed_data)
+        await CatalogCache.publish()
+        logger.info("Successfully seeded %d courses", len(inserted_ids))
     except Exception as e:
-        logger.error(f"Failed to seed courses: {e}")
+        logger.error("Failed to seed courses: %s", e)
+
+
+def to_recommended_courses(ranked: list[tuple[str, float]]) -> list[RecommendedCourse]:
+    """
+    Convert ranked course IDs to recommendation models, skipping courses no longer in the catalog
+    
+    Args:
+        ranked: [(course ID, score), ...]
+        
+    Returns:
+        RecommendedCourse models in the same order
+    """
+    recommended = []
+    for course_id, score in ranked:
+        course = CatalogCache.courses_by_id.get(course_id)
+        if course is not None:
+            recommended.append(RecommendedCourse(
+                id=course_id,
+                title=course["title"],
+                instructor=course["instructor"],
+                level=course["level"],
+                thumbnail=course.get("thumbnail"),
+                score=score
+            ))
+    return recommended
+
+
+# Concurrent lookups of the same course share one query
+course_lookups = SingleFlight("courses.find_by_id")
+
+
+async def find_course(course_id: ObjectId) -> dict | None:
+    """
+    Find a course by ID, joining an identical lookup already in flight
+    
+    Args:
+        course_id: Course ID
+    
+    Returns:
+        Course document (shared, do not mutate), or None if not found
+    """
+    return await course_lookups.do(course_id, lambda: get_courses_repository().find_by_id(course_id))
+
+
+def catalog_unavailable() -> HTTPException:
+    """Build the 503 returned when neither the database nor a cached catalog can serve a read"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Course catalog temporarily unavailable",
+        headers={"Retry-After": str(round(settings.db_circuit_reset_seconds))}
+    )
+
+
+async def load_catalog() -> list[dict]:
+    """
+    Get the cached course catalog, seeding the database on first use
+    
+    Returns:
+        Course documents
+    """
+    courses = await CatalogCache.get_courses()
+    if not courses:
+        await seed_courses()
+        courses = await CatalogCache.get_courses()
+    return courses
 
 
 @router.get("/", response_model=CoursesListResponse)
-async def get_courses(current_user: dict = Depends(get_current_user_dependency)):
+@db_ops_budget(3)
+@log_sample_rate(settings.log_sample_rate)
+async def get_courses(current_user: dict = Depends(get_current_user_claims_dependency)):
     """
     Get all available courses (protected route)
     
@@ -224,95 +321,325 @@ async def get_courses(current_user: dict = Depends(get_current_user_dependency))
         List of all courses with completion status
     """
     try:
-        # Ensure courses are seeded
-        await seed_courses()
-        
-        # Get courses, completions, enrollments, and module completions collections
-        courses_collection = get_courses_collection()
-        completions_collection = get_completions_collection()
-        enrollments_collection = get_enrollments_collection()
-        module_completions_collection = get_module_completions_collection()
+        # Ensure courses are seeded and get the pre-serialized course list
+        await load_catalog()
+        template = await CatalogCache.get_course_list_template()
         
-        # Fetch all courses from database
-        courses_cursor = courses_collection.find({})
-        courses = await courses_cursor.to_list(length=None)
+        # Get completions and enrollments repositories
+        completions_repository = get_completions_repository()
+        enrollments_repository = get_enrollments_repository()
         
         # Get user's completed courses with completion dates
         user_id = ObjectId(current_user["_id"])
-        completed_courses_cursor = completions_collection.find({"userId": user_id})
-        completed_courses = await completed_courses_cursor.to_list(length=None)
+        try:
+            completed_courses = await completions_repository.find_by_user(user_id)
+            # Get user's enrolled courses, each with its completed-module count
+            enrolled_courses = await enrollments_repository.find_by_user(user_id)
+        except DATABASE_UNAVAILABLE_ERRORS:
+            # Degraded mode: the catalog without the learner's state
+            Metrics.increment("catalog.stale_served")
+            return Response(content=template.render({}, stale=True), media_type="application/json")
         completed_course_map = {
             str(completion["courseId"]): completion["completedAt"] 
             for completion in completed_courses
         }
         
-        # Get user's enrolled courses
-        enrolled_courses_cursor = enrollments_collection.find({"userId": user_id})
-        enrolled_courses = await enrolled_courses_cursor.to_list(length=None)
-        enrolled_course_ids = {str(enrollment["courseId"]) for enrollment in enrolled_courses}
-        
-        # Get user's module completions for progress calculation
-        module_completions_cursor = module_completions_collection.find({"userId": user_id})
-        module_completions = await module_completions_cursor.to_list(length=None)
-        
-        # Group module completions by course ID
-        course_module_completions = {}
-        for completion in module_completions:
-            course_id = str(completion["courseId"])
-            if course_id not in course_module_completions:
-                course_module_completions[course_id] = []
-            course_module_completions[course_id].append(completion)
-        
-        # Convert to response format with completion and enrollment status
-        course_responses = []
-        for course in courses:
-            course_id = str(course["_id"])
+        course_module_completions = {
+            str(enrollment["courseId"]): enrollment.get("completedModuleCount", 0)
+            for enrollment in enrolled_courses
+        }
+        enrolled_course_ids = course_module_completions.keys()
+        
+        # Build overlays only for courses the user has state in; every other
+        # course keeps its pre-serialized default (not enrolled, not completed)
+        overlays = {}
+        for course_id in enrolled_course_ids | completed_course_map.keys():
+            if course_id not in template.module_counts:
+                continue
             completed_at = completed_course_map.get(course_id)
-            is_completed = completed_at is not None
             is_enrolled = course_id in enrolled_course_ids
             
             # Calculate progress for enrolled courses
             progress = None
             if is_enrolled:
-                total_modules = len(course["syllabus"])
-                completed_modules = len(course_module_completions.get(course_id, []))
+                total_modules = template.module_counts[course_id]
+                completed_modules = course_module_completions.get(course_id, 0)
                 progress = round((completed_modules / total_modules) * 100) if total_modules > 0 else 0
             
-            course_response = CourseResponse(
-                id=course_id,
-                title=course["title"],
-                description=course["description"],
-                instructor=course["instructor"],
-                duration=course["duration"],
-                lessonsCount=course["lessonsCount"],
-                level=course["level"],
-                syllabus=course["syllabus"],
-                objectives=course["objectives"],
-                thumbnail=course["thumbnail"],
-                isCompleted=is_completed,
+            overlays[course_id] = serialize_overlay(CourseOverlay(
+                isCompleted=completed_at is not None,
                 completedAt=completed_at,
                 isEnrolled=is_enrolled,
                 progress=progress
-            )
-            course_responses.append(course_response)
+            ))
+        
+        logger.info("Retrieved %d courses for user %s", template.count, current_user["email"])
+        
+        if CatalogCache.stale:
+            Metrics.increment("catalog.stale_served")
+        return Response(content=template.render(overlays, stale=CatalogCache.stale), media_type="application/json")
+        
+    except DATABASE_UNAVAILABLE_ERRORS as e:
+        # Nothing cached yet (the database was down since startup)
+        logger.error("Failed to retrieve courses, database unreachable: %s", e)
+        raise catalog_unavailable()
+    except Exception as e:
+        logger.error("Failed to retrieve courses: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve courses"
+        )
+
+
+@router.get("/catalog", response_model=CatalogResponse)
+@db_ops_budget(1)
+async def get_catalog(request: Request, current_user: dict = Depends(get_current_user_claims_dependency)):
+    """
+    Get the user-independent course catalog (protected route)
+    
+    The payload is identical for every learner, so it is serialized and
+    compressed once per catalog version and served from memory. The catalog
+    version is used as ETag for conditional requests.
+    
+    Args:
+        request: Incoming request (for Accept-Encoding / If-None-Match)
+        current_user: Current authenticated user
+        
+    Returns:
+        Catalog payload, pre-compressed when the client accepts it
+    """
+    try:
+        await load_catalog()
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+        version, payload = await CatalogCache.get_payload(encoding)
+        
+        headers = {
+            "ETag": f'"{version}"',
+            "Vary": "Accept-Encoding",
+            "Cache-Control": "private, no-cache"
+        }
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        
+        return Response(content=payload, media_type="application/json", headers=headers)
         
-        logger.info(f"Retrieved {len(course_responses)} courses for user {current_user['email']}")
+    except Exception as e:
+        logger.error("Failed to retrieve catalog: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve catalog"
+        )
+
+
+@router.get("/search", response_model=CourseSearchResponse)
+@db_ops_budget(1)
+async def search_courses(
+    q: str = Query(..., min_length=1, max_length=200),
+    level: Optional[LevelEnum] = None,
+    page: int = Query(1, ge=1),
+    pageSize: int = Query(20, ge=1, le=100),
+    current_user: dict = Depends(get_current_user_claims_dependency)
+):
+    """
+    Full-text search over titles, descriptions, instructors, syllabi and objectives (protected route)
+    
+    Served from the in-memory inverted index of the catalog cache and
+    ranked with BM25; no database query unless the catalog needs reloading.
+    
+    Args:
+        q: Search query
+        level: Only return courses of this level
+        page: Page number (1-based)
+        pageSize: Results per page
+        current_user: Current authenticated user
+        
+    Returns:
+        Ranked page of matching courses and the total number of matches
+    """
+    try:
+        await load_catalog()
+        index = await CatalogCache.get_search_index()
+        total, ranked = index.search(
+            q,
+            level=level.value if level else None,
+            offset=(page - 1) * pageSize,
+            limit=pageSize
+        )
         
-        return CoursesListResponse(
+        results = []
+        for course_id, score in ranked:
+            course = CatalogCache.courses_by_id.get(course_id)
+            if course is not None:
+                results.append(CourseSearchResult(**to_catalog_course(course).model_dump(), score=round(score, 4)))
+        
+        return CourseSearchResponse(
             success=True,
-            courses=course_responses
+            query=q,
+            total=total,
+            page=page,
+            pageSize=pageSize,
+            results=results
         )
         
     except Exception as e:
-        logger.error(f"Failed to retrieve courses: {e}")
+        logger.error("Failed to search courses for '%s': %s", q, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve courses"
+            detail="Failed to search courses"
         )
 
 
+@router.get("/suggest", response_model=CourseSuggestResponse)
+@db_ops_budget(2)
+async def suggest_courses(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    current_user: dict = Depends(get_current_user_claims_dependency)
+):
+    """
+    Typeahead suggestions for course titles and instructors (protected route)
+    
+    Matches any word start of a title or instructor name and ranks the
+    matches by enrollment count. Served from the in-memory suggestion index;
+    the database is only read when the index or the catalog is (re)loaded.
+    
+    Args:
+        prefix: Text typed so far
+        limit: Maximum number of suggestions
+        current_user: Current authenticated user
+        
+    Returns:
+        Suggestions by decreasing popularity
+    """
+    try:
+        await load_catalog()
+        index = await CatalogCache.get_suggest_index()
+        suggestions = []
+        for course_id, matched_field in index.suggest(prefix, limit):
+            course = CatalogCache.courses_by_id.get(course_id)
+            if course is not None:
+                suggestions.append(CourseSuggestion(
+                    id=course_id,
+                    title=course["title"],
+                    instructor=course["instructor"],
+                    level=course["level"],
+                    matchedField=matched_field,
+                    enrollments=index.popularity.get(course_id, 0)
+                ))
+        
+        return CourseSuggestResponse(success=True, prefix=prefix, suggestions=suggestions)
+        
+    except Exception as e:
+        logger.error("Failed to suggest courses for '%s': %s", prefix, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to suggest courses"
+        )
+
+
+@router.get("/recommended", response_model=RecommendedCoursesResponse)
+@db_ops_budget(3)
+async def get_recommended_courses(
+    limit: int = Query(10, ge=1, le=50),
+    current_user: dict = Depends(get_current_user_claims_dependency)
+):
+    """
+    Recommend courses from what learners with similar enrollments took (protected route)
+    
+    Merges the precomputed similar-course lists of every course the user
+    enrolled in or completed, topped up with popular courses.
+    
+    Args:
+        limit: Maximum number of courses
+        current_user: Current authenticated user
+        
+    Returns:
+        Recommended courses by decreasing score
+    """
+    try:
+        await load_catalog()
+        user_id = ObjectId(current_user["_id"])
+        enrollments = await get_enrollments_repository().find_by_user(user_id)
+        completions = await get_completions_repository().find_by_user(user_id)
+        taken = {str(doc["courseId"]) for doc in enrollments + completions}
+        
+        ranked, personalized = Recommendations.recommend_for(taken, limit)
+        
+        return RecommendedCoursesResponse(
+            success=True,
+            personalized=personalized,
+            courses=to_recommended_courses(ranked)
+        )
+        
+    except Exception as e:
+        logger.error("Failed to recommend courses for user %s: %s", current_user["email"], e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to recommend courses"
+        )
+
+
+async def stream_progress_events(subscription: ProgressSubscription):
+    """
+    Send a learner's progress events until the client disconnects
+
+    Args:
+        subscription: Stream subscription, closed when the response ends
+
+    Yields:
+        Server-sent events, with a comment line when idle so proxies keep the connection open
+    """
+    try:
+        # Reconnect delay for EventSource clients
+        yield b"retry: 3000\n\n"
+        while True:
+            try:
+                event = await subscription.next(settings.progress_stream_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if event is None:
+                break
+            yield format_sse(event)
+    finally:
+        ProgressEventHub.unsubscribe(subscription)
+
+
+@router.get("/events")
+@db_ops_budget(1)
+async def get_progress_events(current_user: dict = Depends(get_current_user_claims_dependency)):
+    """
+    Stream the user's progress events as server-sent events (protected route)
+    
+    Events are "module_completed", "points_changed" and "course_completed",
+    from every tab and device of the user. A "resync" event means events were
+    dropped because the client read too slowly: reload the progress.
+    
+    Args:
+        current_user: Current authenticated user
+        
+    Returns:
+        text/event-stream response that stays open
+    """
+    subscription = ProgressEventHub.subscribe(str(current_user["_id"]))
+    if subscription is None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many open event streams"
+        )
+    return StreamingResponse(
+        stream_progress_events(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/{course_id}", response_model=CourseDetailResponse)
-async def get_course(course_id: str, current_user: dict = Depends(get_current_user_dependency)):
+@db_ops_budget(3)
+@log_sample_rate(settings.log_sample_rate)
+async def get_course(course_id: str, current_user: dict = Depends(get_current_user_claims_dependency)):
     """
     Get a specific course by ID (protected route)
     
@@ -333,32 +660,36 @@ async def get_course(course_id: str, current_user: dict = Depends(get_current_us
                 detail="Invalid course ID format"
             )
         
-        # Get courses, completions, and enrollments collections
-        courses_collection = get_courses_collection()
-        completions_collection = get_completions_collection()
-        enrollments_collection = get_enrollments_collection()
+        # Get completions and enrollments repositories
+        completions_repository = get_completions_repository()
+        enrollments_repository = get_enrollments_repository()
         
-        # Find course by ID
-        course = await courses_collection.find_one({"_id": object_id})
-        
-        if not course:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Course not found"
-            )
-        
-        # Check if user completed this course and get completion date
-        user_id = ObjectId(current_user["_id"])
-        completion = await completions_collection.find_one({
-            "userId": user_id,
-            "courseId": object_id
-        })
-        
-        # Check if user is enrolled in this course
-        enrollment = await enrollments_collection.find_one({
-            "userId": user_id,
-            "courseId": object_id
-        })
+        stale = False
+        try:
+            # Find course by ID
+            course = await find_course(object_id)
+            
+            if not course:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Course not found"
+                )
+            
+            # Check if user completed this course and get completion date
+            user_id = ObjectId(current_user["_id"])
+            completion = await completions_repository.find(user_id, object_id)
+            
+            # Check if user is enrolled in this course
+            enrollment = await enrollments_repository.find(user_id, object_id)
+        except DATABASE_UNAVAILABLE_ERRORS as e:
+            # Degraded mode: the last known course without the learner's state
+            course = CatalogCache.get_cached_course(course_id)
+            if course is None:
+                logger.error("Failed to retrieve course %s, database unreachable: %s", course_id, e)
+                raise catalog_unavailable()
+            Metrics.increment("catalog.stale_served")
+            completion = enrollment = None
+            stale = True
         
         is_completed = completion is not None
         completed_at = completion["completedAt"] if completion else None
@@ -381,17 +712,20 @@ async def get_course(course_id: str, current_user: dict = Depends(get_current_us
             isEnrolled=is_enrolled
         )
         
-        logger.info(f"Retrieved course {course_id} for user {current_user['email']}")
+        logger.info("Retrieved course %s for user %s", course_id, current_user["email"])
         
         return CourseDetailResponse(
             success=True,
-            course=course_response
+            stale=stale,
+            course=course_response,
+            # Resolved against the cached catalog, no extra database round trip
+            alsoTaken=to_recommended_courses(Recommendations.similar_to(course_id))
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to retrieve course {course_id}: {e}")
+        logger.error("Failed to retrieve course %s: %s", course_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve course"
@@ -399,6 +733,8 @@ async def get_course(course_id: str, current_user: dict = Depends(get_current_us
 
 
 @router.post("/{course_id}/complete", response_model=CompletionCreateResponse)
+@db_ops_budget(7)
+@idempotent
 async def mark_course_complete(course_id: str, current_user: dict = Depends(get_current_user_dependency)):
     """
     Mark a course as completed (protected route)
@@ -420,12 +756,11 @@ async def mark_course_complete(course_id: str, current_user: dict = Depends(get_
                 detail="Invalid course ID format"
             )
         
-        # Get courses and completions collections
-        courses_collection = get_courses_collection()
-        completions_collection = get_completions_collection()
+        # Get completions repository
+        completions_repository = get_completions_repository()
         
         # Check if course exists
-        course = await courses_collection.find_one({"_id": object_id})
+        course = await find_course(object_id)
         if not course:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -434,10 +769,7 @@ async def mark_course_complete(course_id: str, current_user: dict = Depends(get_
         
         # Check if user already completed this course
         user_id = ObjectId(current_user["_id"])
-        existing_completion = await completions_collection.find_one({
-            "userId": user_id,
-            "courseId": object_id
-        })
+        existing_completion = await completions_repository.find(user_id, object_id)
         
         if existing_completion:
             raise HTTPException(
@@ -454,22 +786,35 @@ async def mark_course_complete(course_id: str, current_user: dict = Depends(get_
             "createdAt": completion_time
         }
         
-        # Insert completion into database
-        result = await completions_collection.insert_one(completion_document)
+        # Insert completion into database (the unique index catches a completion
+        # recorded meanwhile, e.g. by the job of the course's last module)
+        try:
+            inserted_id = await completions_repository.insert(completion_document)
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Course already completed"
+            )
         
-        if not result.inserted_id:
+        if not inserted_id:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to mark course as completed"
             )
         
+        await record_funnel_progress(object_id, completions=1)
+        ActivityRollups.record(user_id, object_id, completion_time, courseCompletions=1)
+        await ProgressEventHub.publish(user_id, [
+            ("course_completed", {"courseId": course_id, "completedAt": completion_time.isoformat()})
+        ])
+        
         # Create response data
         completion_data = {
             "courseId": course_id,
             "completedAt": completion_time.isoformat()
         }
         
-        logger.info(f"User {current_user['email']} completed course {course_id}")
+        logger.info("User %s completed course %s", current_user["email"], course_id)
         
         return CompletionCreateResponse(
             success=True,
@@ -480,14 +825,72 @@ async def mark_course_complete(course_id: str, current_user: dict = Depends(get_
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to mark course {course_id} as complete: {e}")
+        logger.error("Failed to mark course %s as complete: %s", course_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to mark course as completed"
         )
 
 
+@background_job("courses.record_completion")
+async def record_course_completion(user_id: ObjectId, course_id: ObjectId, completed_at: datetime, bonus_points: int):
+    """
+    Record a course completed through its modules and award its bonus (background job)
+    
+    Both writes are idempotent on their own: the completion record is
+    unique per learner and course, and the bonus is awarded at most once per
+    course, so a retry after a partial failure finishes the award. The
+    funnel and activity rollups count the completion only when this run
+    inserted the record, and the bonus points only when this run awarded them.
+    
+    Args:
+        user_id: Learner ID
+        course_id: Course ID
+        completed_at: Completion time of the last module
+        bonus_points: Course completion bonus
+    """
+    try:
+        await get_completions_repository().insert({
+            "userId": user_id,
+            "courseId": course_id,
+            "completedAt": completed_at,
+            "createdAt": completed_at
+        })
+    except DuplicateKeyError:
+        # Already recorded, by an earlier run or by marking the course complete
+        pass
+    else:
+        await record_funnel_progress(course_id, completions=1)
+        ActivityRollups.record(user_id, course_id, completed_at, courseCompletions=1)
+    if await get_users_repository().award_course_bonus(user_id, course_id, bonus_points):
+        ActivityRollups.record(user_id, course_id, completed_at, points=bonus_points)
+
+
+async def enqueue_course_completion(user_id: ObjectId, course_id: ObjectId, completed_at: datetime, bonus_points: int):
+    """
+    Record a course completed through its modules after the response
+    
+    Durable: the job is recorded in the outbox before the response is sent.
+    
+    Args:
+        user_id: Learner ID
+        course_id: Course ID
+        completed_at: Completion time of the last module
+        bonus_points: Course completion bonus
+    """
+    await BackgroundJobs.enqueue(
+        "courses.record_completion",
+        durable=True,
+        user_id=user_id,
+        course_id=course_id,
+        completed_at=completed_at,
+        bonus_points=bonus_points
+    )
+
+
 @router.post("/{course_id}/modules/{module_index}/complete")
+@db_ops_budget(11)
+@idempotent
 async def complete_module(
     course_id: str, 
     module_index: int,
@@ -514,13 +917,12 @@ async def complete_module(
                 detail="Invalid course ID format"
             )
         
-        # Get collections
-        courses_collection = get_courses_collection()
-        enrollments_collection = get_enrollments_collection()
-        module_completions_collection = get_module_completions_collection()
+        # Get repositories
+        enrollments_repository = get_enrollments_repository()
+        module_completions_repository = get_module_completions_repository()
         
         # Check if course exists and get syllabus
-        course = await courses_collection.find_one({"_id": course_object_id})
+        course = await find_course(course_object_id)
         if not course:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -536,10 +938,7 @@ async def complete_module(
         
         # Check if user is enrolled in the course
         user_id = ObjectId(current_user["_id"])
-        enrollment = await enrollments_collection.find_one({
-            "userId": user_id,
-            "courseId": course_object_id
-        })
+        enrollment = await enrollments_repository.find(user_id, course_object_id)
         
         if not enrollment:
             raise HTTPException(
@@ -548,13 +947,7 @@ async def complete_module(
             )
         
         # Check if module already completed
-        existing_completion = await module_completions_collection.find_one({
-            "userId": user_id,
-            "courseId": course_object_id,
-            "moduleIndex": module_index
-        })
-        
-        if existing_completion:
+        if is_module_completed(enrollment, module_index):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Module already completed"
@@ -573,62 +966,86 @@ async def complete_module(
             "createdAt": completion_time
         }
         
-        # Insert completion
-        result = await module_completions_collection.insert_one(completion_document)
+        POINTS_PER_MODULE = 10
+        total_modules = len(course["syllabus"])
+        
+        # Insert completion (the unique index catches concurrent requests
+        # and bitsets missing a completion recorded earlier)
+        try:
+            inserted_id = await module_completions_repository.insert(completion_document)
+        except DuplicateKeyError:
+            # Repair the bitset; if that sets the course's last bit, the
+            # course completion was never recorded either
+            repaired_enrollment = await enrollments_repository.mark_module_completed(user_id, course_object_id, module_index)
+            if repaired_enrollment is not None and repaired_enrollment["completedModuleCount"] == total_modules:
+                await enqueue_course_completion(
+                    user_id, course_object_id, completion_time, int((total_modules * POINTS_PER_MODULE) * 0.5)
+                )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Module already completed"
+            )
         
-        if not result.inserted_id:
+        if not inserted_id:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to mark module as completed"
             )
         
         # Award points for completing module (10 points per module)
-        POINTS_PER_MODULE = 10
-        users_collection = get_users_collection()
-        await users_collection.update_one(
-            {"_id": user_id},
-            {"$inc": {"points": POINTS_PER_MODULE}}
-        )
+        users_repository = get_users_repository()
+        await users_repository.increment_points(user_id, POINTS_PER_MODULE)
         
         # Get updated user points
-        updated_user = await users_collection.find_one({"_id": user_id})
+        updated_user = await users_repository.find_by_id(user_id)
         total_points = updated_user.get("points", 0)
         
-        # Check if all modules in the course are completed
-        total_modules = len(course["syllabus"])
-        completed_modules_count = await module_completions_collection.count_documents({
-            "userId": user_id,
-            "courseId": course_object_id
-        })
+        # Set the module's bit; the atomic count tells exactly one request
+        # that the last module was completed
+        updated_enrollment = await enrollments_repository.mark_module_completed(user_id, course_object_id, module_index)
+        if updated_enrollment is not None:
+            completed_modules_count = updated_enrollment["completedModuleCount"]
+        else:
+            completed_modules_count = await module_completions_repository.count_by_user_course(user_id, course_object_id)
         
         course_completed = completed_modules_count == total_modules
         
         # If course is completed, award bonus points and mark course as completed
+        # after the response (durable: recorded in the job outbox first)
         course_completion_bonus = 0
         if course_completed:
             # Award bonus points for completing entire course (50% of total module points)
             course_completion_bonus = int((total_modules * POINTS_PER_MODULE) * 0.5)
-            await users_collection.update_one(
-                {"_id": user_id},
-                {"$inc": {"points": course_completion_bonus}}
-            )
-            
-            # Update total points
             total_points += course_completion_bonus
-            
-            # Create course completion record
-            completions_collection = get_completions_collection()
-            course_completion_doc = {
-                "userId": user_id,
-                "courseId": course_object_id,
-                "completedAt": completion_time,
-                "createdAt": completion_time
-            }
-            await completions_collection.insert_one(course_completion_doc)
+            await enqueue_course_completion(user_id, course_object_id, completion_time, course_completion_bonus)
+        
+        # The course completion and its bonus are counted by the job, once recorded
+        await record_funnel_progress(course_object_id, module_index=module_index)
+        ActivityRollups.record(
+            user_id,
+            course_object_id,
+            completion_time,
+            moduleCompletions=1,
+            points=POINTS_PER_MODULE
+        )
+        
+        # Update the user's other tabs and devices in one publish
+        events = [
+            ("module_completed", {
+                "courseId": course_id,
+                "moduleIndex": module_index,
+                "moduleTitle": module_title,
+                "completedAt": completion_time.isoformat()
+            }),
+            ("points_changed", {"pointsAwarded": POINTS_PER_MODULE + course_completion_bonus, "totalPoints": total_points})
+        ]
+        if course_completed:
+            events.append(("course_completed", {"courseId": course_id, "completedAt": completion_time.isoformat()}))
+        await ProgressEventHub.publish(user_id, events)
         
         # Create response
         completion_response = ModuleCompletionResponse(
-            id=str(result.inserted_id),
+            id=str(inserted_id),
             userId=str(user_id),
             courseId=course_id,
             moduleIndex=module_index,
@@ -640,7 +1057,7 @@ async def complete_module(
         if course_completed:
             success_message += f" - Course completed! Bonus: {course_completion_bonus} points"
         
-        logger.info(f"User {current_user['email']} completed module {module_index} of course {course_id}")
+        logger.info("User %s completed module %d of course %s", current_user["email"], module_index, course_id)
         
         return ModuleCompletionCreateResponse(
             success=True,
@@ -654,7 +1071,7 @@ async def complete_module(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to complete module {module_index} in course {course_id}: {e}")
+        logger.error("Failed to complete module %s in course %s: %s", module_index, course_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to mark module as completed"
@@ -662,9 +1079,10 @@ async def complete_module(
 
 
 @router.get("/{course_id}/progress")
+@db_ops_budget(3)
 async def get_course_progress(
     course_id: str,
-    current_user: dict = Depends(get_current_user_dependency)
+    current_user: dict = Depends(get_current_user_claims_dependency)
 ):
     """
     Get user's progress for a specific course
@@ -686,26 +1104,22 @@ async def get_course_progress(
                 detail="Invalid course ID format"
             )
         
-        # Get collections
-        courses_collection = get_courses_collection()
-        module_completions_collection = get_module_completions_collection()
+        # Get repositories
+        enrollments_repository = get_enrollments_repository()
+        module_completions_repository = get_module_completions_repository()
         
         # Check if course exists
-        course = await courses_collection.find_one({"_id": course_object_id})
+        course = await find_course(course_object_id)
         if not course:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Course not found"
             )
         
-        # Get user's module completions for this course
+        # Get the enrollment (progress bitset) and the detailed module completions
         user_id = ObjectId(current_user["_id"])
-        completions_cursor = module_completions_collection.find({
-            "userId": user_id,
-            "courseId": course_object_id
-        }).sort("moduleIndex", 1)
-        
-        completions_data = await completions_cursor.to_list(length=None)
+        enrollment = await enrollments_repository.find(user_id, course_object_id) or module_progress_fields(())
+        completions_data = await module_completions_repository.find_by_user_course(user_id, course_object_id)
         
         # Convert to response format
         completions = [
@@ -720,9 +1134,9 @@ async def get_course_progress(
             for completion in completions_data
         ]
         
-        # Calculate progress
+        # Calculate progress from the bitset
         total_modules = len(course.get("syllabus", []))
-        completed_modules = len(completions)
+        completed_modules = enrollment.get("completedModuleCount", 0)
         progress_percentage = (completed_modules / total_modules * 100) if total_modules > 0 else 0
         is_fully_completed = completed_modules == total_modules and total_modules > 0
         
@@ -740,14 +1154,76 @@ async def get_course_progress(
             progressPercentage=round(progress_percentage, 2),
             completions=completions,
             isFullyCompleted=is_fully_completed,
-            pointsEarned=total_points_earned
+            pointsEarned=total_points_earned,
+            nextModuleIndex=next_module_index(enrollment, total_modules)
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to get progress for course {course_id}: {e}")
+        logger.error("Failed to get progress for course %s: %s", course_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get course progress"
+        )
+
+
+@router.get("/{course_id}/funnel", response_model=CourseFunnelResponse)
+@db_ops_budget(2)
+async def get_course_funnel(
+    course_id: str,
+    current_user: dict = Depends(get_admin_user_claims_dependency)
+):
+    """
+    Get where learners drop off within a course's modules (admin route)
+    
+    Served from per-course counters, so the cost does not depend on the
+    number of learners.
+    
+    Args:
+        course_id: Course ID
+        current_user: Current administrator
+        
+    Returns:
+        Enrollments, course completions and learners per module
+    """
+    try:
+        # Validate ObjectId
+        try:
+            course_object_id = ObjectId(course_id)
+        except InvalidId:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid course ID format"
+            )
+        
+        await load_catalog()
+        course = CatalogCache.courses_by_id.get(course_id)
+        if not course:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Course not found"
+            )
+        
+        funnel = await get_course_funnels_repository().find(course_object_id)
+        enrollments = funnel["enrollments"] if funnel else 0
+        completions = funnel["completions"] if funnel else 0
+        
+        return CourseFunnelResponse(
+            success=True,
+            courseId=course_id,
+            title=course["title"],
+            enrollments=enrollments,
+            completions=completions,
+            completionRate=round(completions / enrollments * 100, 2) if enrollments else 0.0,
+            modules=[FunnelStep(**step) for step in funnel_steps(course.get("syllabus", []), funnel)]
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to get funnel for course %s: %s", course_id, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get course funnel"
         )
\ No newline at end of file
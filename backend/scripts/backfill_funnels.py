@@ -0,0 +1,42 @@
+"""
+Module completion funnel backfill
+
+Rebuilds the per-course funnel counters (course_funnels collection) from
+enrollments, completions and module_completions. Run it once to build the
+counters of existing progress (startup does not), and to repair them, e.g.
+after increments failed while the database was unreachable. Increments made
+while it runs may be lost, so run it during quiet hours.
+
+Usage:
+    python -m backend.scripts.backfill_funnels
+"""
+import asyncio
+import logging
+from ..repositories import Repositories
+from ..utils.db import Database
+from ..utils.funnel import backfill_funnels
+
+
+async def backfill():
+    """Connect to MongoDB and rebuild every course's funnel counters"""
+    Repositories.configure("mongo")
+    await Database.connect_db()
+    if Database.client is None:
+        raise SystemExit("Could not connect to MongoDB")
+    try:
+        await backfill_funnels()
+    finally:
+        await Database.close_db()
+
+
+def main():
+    """Command-line entry point"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(backfill())
+
+
+if __name__ == "__main__":
+    main()
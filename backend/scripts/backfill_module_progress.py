@@ -0,0 +1,42 @@
+"""
+Completed-module bitset backfill
+
+Merges module_completions into the completed-module bitset of every
+enrollment and recounts it. Bitsets are created automatically on first
+startup (by one worker); run this to repair them, e.g. after bitset updates
+failed while the database was unreachable. Safe to run while the
+application is serving: bits are only added, never overwritten.
+
+Usage:
+    python -m backend.scripts.backfill_module_progress
+"""
+import asyncio
+import logging
+from ..repositories import Repositories
+from ..utils.db import Database
+from ..utils.module_progress import backfill_module_progress
+
+
+async def backfill():
+    """Connect to MongoDB and rebuild every enrollment's completed-module bitset"""
+    Repositories.configure("mongo")
+    await Database.connect_db()
+    if Database.client is None:
+        raise SystemExit("Could not connect to MongoDB")
+    try:
+        await backfill_module_progress()
+    finally:
+        await Database.close_db()
+
+
+def main():
+    """Command-line entry point"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(backfill())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Course recommendations build
+
+Builds the co-enrollment similarity table and stores it for the API workers,
+which load it within ``RECOMMENDATIONS_POLL_SECONDS``. Schedule it (e.g. with
+cron) when workers do not build the table themselves
+(``RECOMMENDATIONS_BUILD_IN_WORKERS=false``), so the matrix is computed on a
+machine sized for it instead of next to request handling.
+
+Usage:
+    python -m backend.scripts.build_recommendations
+"""
+import asyncio
+import logging
+from ..repositories import Repositories
+from ..utils.db import Database
+from ..utils.recommendations import Recommendations, RECOMMENDATIONS_AVAILABLE
+
+
+async def build():
+    """Connect to MongoDB, then build and store the recommendations table"""
+    if not RECOMMENDATIONS_AVAILABLE:
+        raise SystemExit("NumPy/SciPy not installed (recommendations extra)")
+    Repositories.configure("mongo")
+    await Database.connect_db()
+    if Database.client is None:
+        raise SystemExit("Could not connect to MongoDB")
+    try:
+        await Recommendations.build()
+    finally:
+        await Database.close_db()
+
+
+def main():
+    """Command-line entry point"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(build())
+
+
+if __name__ == "__main__":
+    main()
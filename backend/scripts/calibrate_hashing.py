@@ -0,0 +1,128 @@
+"""
+Password hashing cost calibration
+
+Measures hashing time on the current hardware and picks the highest cost
+that stays within a target latency per hash. Run it on the deployment
+hardware (same CPU type and limits as the API workers) and copy the printed
+settings into the environment.
+
+Usage:
+    python -m backend.scripts.calibrate_hashing --target-ms 250
+    python -m backend.scripts.calibrate_hashing --scheme argon2 --argon2-memory 65536
+
+Existing hashes are migrated to the new cost transparently on each user's
+next successful login.
+"""
+import argparse
+import statistics
+import time
+from ..utils.auth import build_password_context, MIN_BCRYPT_ROUNDS
+
+SAMPLE_PASSWORD = b"Calibration-Password-123"
+
+MAX_BCRYPT_ROUNDS = 16
+MAX_ARGON2_TIME_COST = 20
+
+
+def measure(context, samples: int) -> float:
+    """
+    Measure the median time to hash a password
+
+    Args:
+        context: CryptContext to measure
+        samples: Number of hashes to time
+
+    Returns:
+        Median duration in milliseconds
+    """
+    # Warm up backend loading and caches
+    context.hash(SAMPLE_PASSWORD)
+    durations = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash(SAMPLE_PASSWORD)
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations)
+
+
+def calibrate_bcrypt(target_ms: float, samples: int) -> dict:
+    """
+    Find the highest bcrypt cost within the target latency
+
+    Args:
+        target_ms: Maximum acceptable milliseconds per hash
+        samples: Hashes timed per candidate cost
+
+    Returns:
+        Settings to apply
+    """
+    chosen = MIN_BCRYPT_ROUNDS
+    for rounds in range(MIN_BCRYPT_ROUNDS, MAX_BCRYPT_ROUNDS + 1):
+        elapsed = measure(build_password_context("bcrypt", bcrypt_rounds=rounds), samples)
+        print(f"bcrypt rounds={rounds}: {elapsed:.1f} ms")
+        if elapsed > target_ms:
+            break
+        chosen = rounds
+    return {"PASSWORD_HASH_SCHEME": "bcrypt", "BCRYPT_ROUNDS": chosen}
+
+
+def calibrate_argon2(target_ms: float, samples: int, memory_cost: int, parallelism: int) -> dict:
+    """
+    Find the highest argon2 time cost within the target latency at a fixed memory cost
+
+    Args:
+        target_ms: Maximum acceptable milliseconds per hash
+        samples: Hashes timed per candidate cost
+        memory_cost: Memory per hash in KiB
+        parallelism: Number of lanes
+
+    Returns:
+        Settings to apply
+    """
+    chosen = 1
+    for time_cost in range(1, MAX_ARGON2_TIME_COST + 1):
+        context = build_password_context(
+            "argon2",
+            argon2_memory_cost=memory_cost,
+            argon2_time_cost=time_cost,
+            argon2_parallelism=parallelism
+        )
+        elapsed = measure(context, samples)
+        print(f"argon2 memory={memory_cost} KiB time_cost={time_cost}: {elapsed:.1f} ms")
+        if elapsed > target_ms:
+            break
+        chosen = time_cost
+    return {
+        "PASSWORD_HASH_SCHEME": "argon2",
+        "ARGON2_MEMORY_COST": memory_cost,
+        "ARGON2_TIME_COST": chosen,
+        "ARGON2_PARALLELISM": parallelism,
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(description="Calibrate password hashing cost for this hardware")
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default="bcrypt", help="Hashing scheme to calibrate")
+    parser.add_argument("--target-ms", type=float, default=250, help="Target milliseconds per hash")
+    parser.add_argument("--samples", type=int, default=5, help="Hashes timed per candidate cost")
+    parser.add_argument("--argon2-memory", type=int, default=65536, help="argon2 memory cost in KiB")
+    parser.add_argument("--argon2-parallelism", type=int, default=1, help="argon2 lanes")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    args = parse_args(argv)
+    if args.scheme == "bcrypt":
+        result = calibrate_bcrypt(args.target_ms, args.samples)
+    else:
+        result = calibrate_argon2(args.target_ms, args.samples, args.argon2_memory, args.argon2_parallelism)
+
+    print("\nAdd to .env:")
+    for name, value in result.items():
+        print(f"{name}={value}")
+
+
+if __name__ == "__main__":
+    main()
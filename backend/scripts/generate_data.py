@@ -0,0 +1,377 @@
+"""
+Synthetic large-dataset generator for scale testing
+
+Fills users, courses, enrollments, completions and module_completions with
+realistic, skewed data so index choices and query plans can be exercised at
+production size on a local MongoDB.
+
+Usage:
+    python -m backend.scripts.generate_data --users 1000000 --courses 10000 \\
+        --module-completions 50000000 --drop --defer-indexes
+
+Distributions:
+    - Course popularity follows a Zipf law (a few blockbuster courses, a long tail)
+    - Enrollments per learner follow a Pareto law (a few heavy learners)
+    - Progress within an enrollment follows a U-shaped Beta law (many learners
+      drop off early, a solid group finishes)
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
+from ..config import settings
+from ..models.course import LevelEnum
+from ..repositories.mongo import MongoCourseRepository
+from ..utils.auth import hash_password
+from ..utils.db import Database
+from ..utils.module_progress import module_progress_fields
+
+logger = logging.getLogger(__name__)
+
+# Keep in sync with the points rules in routes/courses.py
+POINTS_PER_MODULE = 10
+COURSE_COMPLETION_BONUS_RATIO = 0.5
+
+# Shared password for every generated learner ("Password123")
+GENERATED_PASSWORD = "Password123"
+
+FIRST_NAMES = [
+    "Amina", "Brian", "Chen", "Daniela", "Emeka", "Fatima", "George", "Hana",
+    "Ivan", "Joy", "Kwame", "Lucia", "Mohamed", "Nia", "Oscar", "Priya",
+    "Quentin", "Rosa", "Samuel", "Tumaini", "Uma", "Victor", "Wanjiru", "Yusuf",
+]
+LAST_NAMES = [
+    "Achieng", "Brown", "Chen", "Dlamini", "Evans", "Fernandez", "Garcia",
+    "Hassan", "Ito", "Johnson", "Kamau", "Lopez", "Mwangi", "Nguyen", "Okafor",
+    "Patel", "Rodriguez", "Smith", "Tanaka", "Wang",
+]
+TOPICS = [
+    "Python", "React", "Data Structures", "Machine Learning", "Cloud Computing",
+    "Cybersecurity", "Databases", "DevOps", "Mobile Development", "Statistics",
+    "UX Design", "Networking", "Rust", "Go", "Distributed Systems", "Linear Algebra",
+]
+TITLE_PATTERNS = [
+    "Introduction to {topic}",
+    "Practical {topic}",
+    "{topic} in Depth",
+    "Modern {topic}",
+    "{topic} for Professionals",
+    "Foundations of {topic}",
+    "Advanced {topic}",
+]
+MODULE_PATTERNS = [
+    "{topic} Fundamentals",
+    "Working with {topic} Tools",
+    "Core Concepts and Terminology",
+    "Hands-on Project Setup",
+    "Testing and Debugging",
+    "Performance Optimization",
+    "Security Considerations",
+    "Design Patterns",
+    "Case Studies",
+    "Deployment and Operations",
+    "Review and Next Steps",
+]
+SENTENCES = [
+    "This course walks you through {topic} from first principles to production use.",
+    "You will build real-world projects and learn industry-standard workflows.",
+    "Each module combines short lectures with hands-on exercises.",
+    "No prior experience is required, but curiosity is strongly recommended.",
+    "By the end you will be able to reason about trade-offs with confidence.",
+    "We cover common pitfalls and how experienced engineers avoid them.",
+    "Assignments are graded automatically so you get instant feedback.",
+]
+
+
+def zipf_cum_weights(n: int, exponent: float) -> list[float]:
+    """
+    Build cumulative Zipf weights for use with random.choices
+
+    Args:
+        n: Number of items
+        exponent: Zipf exponent (higher means more skew)
+
+    Returns:
+        Cumulative weights, one per item
+    """
+    return list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+def make_course(rng: random.Random, created_at: datetime) -> dict:
+    """
+    Generate a single course document with a realistic syllabus length
+
+    Args:
+        rng: Random generator
+        created_at: Creation timestamp
+
+    Returns:
+        Course document
+    """
+    topic = rng.choice(TOPICS)
+    # Median around 10 modules, long tail up to 40
+    modules = max(3, min(40, int(rng.lognormvariate(2.3, 0.4))))
+    syllabus = [
+        f"{rng.choice(MODULE_PATTERNS).format(topic=topic)} ({index + 1})"
+        for index in range(modules)
+    ]
+    objectives = [
+        f"Apply {topic} techniques to {goal}"
+        for goal in rng.sample(["real projects", "team workflows", "interviews", "production systems", "research"], k=rng.randint(3, 5))
+    ]
+    description = " ".join(
+        sentence.format(topic=topic) for sentence in rng.sample(SENTENCES, k=rng.randint(3, len(SENTENCES)))
+    )
+    return {
+        "title": rng.choice(TITLE_PATTERNS).format(topic=topic),
+        "description": description,
+        "instructor": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "duration": f"{max(1, modules // 2)} weeks",
+        "lessonsCount": modules * rng.randint(2, 6),
+        "level": rng.choice(list(LevelEnum)).value,
+        "syllabus": syllabus,
+        "objectives": objectives,
+        "thumbnail": None,
+        "createdAt": created_at,
+        "updatedAt": created_at,
+    }
+
+
+class BatchWriter:
+    """
+    Buffers documents per collection and flushes them with parallel,
+    unordered insert_many calls
+    """
+
+    def __init__(self, db, batch_size: int, concurrency: int):
+        self.db = db
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.buffers: dict[str, list] = {}
+        self.pending: set[asyncio.Task] = set()
+        self.inserted: dict[str, int] = {}
+        self.errors = 0
+
+    async def add(self, collection_name: str, doc: dict):
+        """Queue a document and flush its collection buffer when full"""
+        buffer = self.buffers.setdefault(collection_name, [])
+        buffer.append(doc)
+        if len(buffer) >= self.batch_size:
+            self.buffers[collection_name] = []
+            await self._submit(collection_name, buffer)
+
+    async def _submit(self, collection_name: str, docs: list):
+        """Start an insert_many, waiting if too many are already in flight"""
+        while len(self.pending) >= self.concurrency:
+            done, self.pending = await asyncio.wait(self.pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        self.pending.add(asyncio.create_task(self._insert(collection_name, docs)))
+
+    async def _insert(self, collection_name: str, docs: list):
+        try:
+            result = await self.db[collection_name].insert_many(docs, ordered=False, bypass_document_validation=True)
+            inserted = len(result.inserted_ids)
+        except BulkWriteError as e:
+            inserted = e.details.get("nInserted", 0)
+            self.errors += len(e.details.get("writeErrors", []))
+        self.inserted[collection_name] = self.inserted.get(collection_name, 0) + inserted
+
+    async def flush(self):
+        """Flush every remaining buffer and wait for all in-flight inserts"""
+        for collection_name, docs in list(self.buffers.items()):
+            if docs:
+                self.buffers[collection_name] = []
+                await self._submit(collection_name, docs)
+        if self.pending:
+            for task in await asyncio.gather(*self.pending, return_exceptions=True):
+                if isinstance(task, Exception):
+                    raise task
+            self.pending = set()
+
+
+async def generate(args: argparse.Namespace):
+    """
+    Generate the dataset described by the command-line arguments
+
+    Args:
+        args: Parsed command-line arguments
+    """
+    rng = random.Random(args.seed)
+    client_kwargs = {"serverSelectionTimeoutMS": 10000}
+    if args.tls:
+        client_kwargs.update(tls=True, tlsAllowInvalidCertificates=True)
+    client = AsyncIOMotorClient(args.uri, **client_kwargs)
+    db = client[args.database]
+    await client.admin.command("ping")
+
+    if args.drop:
+        for name in ("users", "courses", "enrollments", "completions", "module_completions"):
+            await db.drop_collection(name)
+        logger.info("Dropped existing collections")
+
+    # Reuse the application's index definitions so query plans match production
+    Database.client = client
+    Database.database_name = args.database
+    if not args.defer_indexes:
+        await Database._create_indexes()
+
+    writer = BatchWriter(db, args.batch_size, args.concurrency)
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    window = timedelta(days=args.days)
+
+    # Courses are kept in memory: they are needed to pick enrollments
+    courses = []
+    for _ in range(args.courses):
+        course = make_course(rng, now - window * rng.random())
+        course["_id"] = ObjectId()
+        courses.append(course)
+        await writer.add("courses", course)
+    # Shuffle before assigning popularity so the hottest courses are not all the oldest
+    popularity_order = courses[:]
+    rng.shuffle(popularity_order)
+    course_cum_weights = zipf_cum_weights(len(popularity_order), args.course_skew)
+    logger.info("Generated %s courses", len(courses))
+
+    # Derive the mean share of each syllabus a learner completes from the target volume
+    expected_enrollments = max(1, args.users * args.enrollments_per_user)
+    average_modules = sum(len(course["syllabus"]) for course in courses) / max(1, len(courses))
+    completion_share = args.module_completions / (expected_enrollments * average_modules)
+    if completion_share >= 1:
+        logger.warning("Requested module completions exceed what the enrollments can hold; every enrollment will be completed")
+    completion_share = min(completion_share, 0.999)
+    beta_alpha = 0.8
+    beta_beta = beta_alpha * (1 - completion_share) / completion_share if completion_share > 0 else None
+
+    # Pareto(1.5) has mean 3, rescale to the requested mean
+    pareto_alpha = 1.5
+    pareto_scale = args.enrollments_per_user / (pareto_alpha / (pareto_alpha - 1))
+    max_enrollments = min(len(courses), args.max_enrollments_per_user)
+
+    password_hash = hash_password(GENERATED_PASSWORD)
+
+    for user_number in range(args.users):
+        user_id = ObjectId()
+        user_created = now - window * rng.random()
+        points = 0
+
+        wanted = min(max_enrollments, int(round(rng.paretovariate(pareto_alpha) * pareto_scale)))
+        chosen: dict[ObjectId, dict] = {}
+        attempts = 0
+        while len(chosen) < wanted and attempts < 10:
+            for course in rng.choices(popularity_order, cum_weights=course_cum_weights, k=wanted - len(chosen)):
+                chosen.setdefault(course["_id"], course)
+            attempts += 1
+
+        for course in chosen.values():
+            enrolled_at = user_created + (now - user_created) * rng.random()
+            total_modules = len(course["syllabus"])
+            if beta_beta is None:
+                completed_modules = 0
+            else:
+                completed_modules = min(total_modules, int(rng.betavariate(beta_alpha, beta_beta) * (total_modules + 1)))
+
+            await writer.add("enrollments", {
+                "userId": user_id,
+                "courseId": course["_id"],
+                "enrolledAt": enrolled_at,
+                "createdAt": enrolled_at,
+                **module_progress_fields(range(completed_modules)),
+            })
+
+            completed_at = enrolled_at
+            remaining = now - enrolled_at
+            for module_index in range(completed_modules):
+                completed_at = completed_at + (remaining / (total_modules + 1)) * rng.random()
+                await writer.add("module_completions", {
+                    "userId": user_id,
+                    "courseId": course["_id"],
+                    "moduleIndex": module_index,
+                    "moduleTitle": course["syllabus"][module_index],
+                    "completedAt": completed_at,
+                    "createdAt": completed_at,
+                })
+            points += completed_modules * POINTS_PER_MODULE
+
+            if completed_modules == total_modules:
+                points += int(total_modules * POINTS_PER_MODULE * COURSE_COMPLETION_BONUS_RATIO)
+                await writer.add("completions", {
+                    "userId": user_id,
+                    "courseId": course["_id"],
+                    "completedAt": completed_at,
+                    "createdAt": completed_at,
+                })
+
+        await writer.add("users", {
+            "_id": user_id,
+            "email": f"learner{user_number}@example.com",
+            "password_hash": password_hash,
+            "fullName": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "points": points,
+            "createdAt": user_created,
+            "updatedAt": user_created,
+        })
+
+        if (user_number + 1) % args.progress_every == 0:
+            elapsed = time.perf_counter() - started
+            logger.info("Generated %d/%d users (%.0f users/s)", user_number + 1, args.users, (user_number + 1) / elapsed)
+
+    await writer.flush()
+
+    if args.defer_indexes:
+        logger.info("Building indexes on loaded data...")
+        await Database._create_indexes()
+
+    # Running workers reload the catalog once the generated courses are all in
+    await MongoCourseRepository().bump_catalog_version()
+
+    elapsed = time.perf_counter() - started
+    total = sum(writer.inserted.values())
+    for name, count in sorted(writer.inserted.items()):
+        logger.info("%s: %d documents", name, count)
+    logger.info("Inserted %d documents in %.1fs (%.0f docs/s), %d write errors", total, elapsed, total / max(elapsed, 1e-9), writer.errors)
+
+    client.close()
+    Database.client = None
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic e-learning dataset for scale testing")
+    parser.add_argument("--uri", default=settings.mongodb_uri, help="MongoDB connection string (defaults to MONGODB_URI)")
+    parser.add_argument("--database", default=settings.database_name, help="Database name (defaults to DATABASE_NAME)")
+    parser.add_argument("--tls", action="store_true", help="Connect with TLS (implied by mongodb+srv URIs)")
+    parser.add_argument("--users", type=int, default=10000, help="Number of learners to create")
+    parser.add_argument("--courses", type=int, default=200, help="Number of courses to create")
+    parser.add_argument("--enrollments-per-user", type=float, default=4.0, help="Mean enrollments per learner")
+    parser.add_argument("--max-enrollments-per-user", type=int, default=200, help="Cap for heavy learners")
+    parser.add_argument("--module-completions", type=int, default=300000, help="Approximate total module completions")
+    parser.add_argument("--course-skew", type=float, default=1.1, help="Zipf exponent for course popularity")
+    parser.add_argument("--days", type=int, default=365, help="Spread timestamps over this many past days")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Documents per insert_many")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum insert_many calls in flight")
+    parser.add_argument("--progress-every", type=int, default=50000, help="Log progress every N learners")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible shapes")
+    parser.add_argument("--drop", action="store_true", help="Drop the target collections first")
+    parser.add_argument("--defer-indexes", action="store_true", help="Build indexes after loading (faster bulk load)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(generate(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
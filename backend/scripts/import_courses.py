@@ -0,0 +1,82 @@
+"""
+Bulk course import
+
+Creates or updates courses from an NDJSON file, one course per line shaped
+like the Course model (without createdAt / updatedAt). Lines with an "id"
+update that course; others are matched on title and instructor. Invalid
+lines are reported and skipped.
+
+Usage:
+    python -m backend.scripts.import_courses courses.ndjson
+    python -m backend.scripts.import_courses - --batch-size 5000 < courses.ndjson
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from ..repositories import Repositories
+from ..utils.db import Database
+from ..utils.course_import import CourseImport, COURSE_IMPORT_BATCH_SIZE
+
+
+async def read_lines(path: str):
+    """Yield the lines of a file ("-" for standard input)"""
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line in stream:
+            yield line.rstrip("\r\n")
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+async def import_file(args: argparse.Namespace) -> CourseImport:
+    """
+    Connect to MongoDB and import the courses of a file
+
+    Args:
+        args: Parsed command-line arguments
+
+    Returns:
+        Completed import
+    """
+    Repositories.configure("mongo")
+    await Database.connect_db()
+    if Database.client is None:
+        raise SystemExit("Could not connect to MongoDB")
+    try:
+        return await CourseImport(batch_size=args.batch_size).run(read_lines(args.path))
+    finally:
+        await Database.close_db()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(description="Import courses from an NDJSON file")
+    parser.add_argument("path", help="NDJSON file, or - for standard input")
+    parser.add_argument("--batch-size", type=int, default=COURSE_IMPORT_BATCH_SIZE, help="Lines validated and upserted together")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    course_import = asyncio.run(import_file(parse_args(argv)))
+    for error in course_import.errors:
+        print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+    print(json.dumps({
+        "received": course_import.received,
+        "inserted": course_import.inserted,
+        "updated": course_import.updated,
+        "failed": course_import.failed,
+    }))
+    if course_import.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Production server launcher
+
+Runs the API with one uvicorn worker process per available CPU core, the
+uvloop event loop and the httptools HTTP parser, without auto-reload.
+
+Usage:
+    python -m backend.scripts.serve [--workers N] [--port 8000]
+
+Startup sequence:
+    1. The supervisor imports the application once so configuration and
+       import errors fail fast, before any worker is spawned.
+    2. Each worker connects to the database and warms the catalog caches in
+       the application lifespan; uvicorn only starts accepting connections
+       on a worker once its lifespan startup has completed.
+
+On SIGTERM/SIGINT uvicorn stops accepting new connections, lets in-flight
+requests finish for up to ``--graceful-timeout`` seconds, then runs the
+lifespan shutdown (closing the database connection).
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import uvicorn
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+APP_IMPORT_STRING = "backend.app:app"
+
+
+def available_cores() -> int:
+    """
+    Count the CPU cores this process may run on
+
+    Honours CPU affinity (taskset, container cpusets) where the platform
+    supports it.
+
+    Returns:
+        Number of usable cores, at least 1
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def pick_event_loop() -> str:
+    """Use uvloop when installed (uvicorn[standard] on Linux/macOS)"""
+    if importlib.util.find_spec("uvloop") is not None:
+        return "uvloop"
+    logger.warning("uvloop is not installed, falling back to the asyncio event loop")
+    return "asyncio"
+
+
+def pick_http_implementation() -> str:
+    """Use the httptools parser when installed"""
+    if importlib.util.find_spec("httptools") is not None:
+        return "httptools"
+    logger.warning("httptools is not installed, falling back to the h11 HTTP parser")
+    return "h11"
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(description="Run the API with a production multi-worker server")
+    parser.add_argument("--host", default=settings.server_host, help="Bind address")
+    parser.add_argument("--port", type=int, default=settings.server_port, help="Bind port")
+    parser.add_argument(
+        "--workers", type=int, default=settings.server_workers,
+        help="Worker processes (0 = one per available CPU core)"
+    )
+    parser.add_argument(
+        "--graceful-timeout", type=int, default=settings.server_graceful_timeout_seconds,
+        help="Seconds to let in-flight requests finish on shutdown"
+    )
+    parser.add_argument("--backlog", type=int, default=settings.server_backlog, help="Listen socket backlog")
+    parser.add_argument("--keep-alive", type=int, default=5, help="HTTP keep-alive timeout in seconds")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    args = parse_args(argv)
+    workers = args.workers or available_cores()
+
+    # Preload: fail fast on configuration or import errors before spawning workers
+    from ..app import app  # noqa: F401
+
+    logger.info("Starting %s worker(s) on %s:%s", workers, args.host, args.port)
+    uvicorn.run(
+        APP_IMPORT_STRING,
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=pick_event_loop(),
+        http=pick_http_implementation(),
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        reload=False,
+        access_log=False,
+        proxy_headers=True
+    )
+
+
+if __name__ == "__main__":
+    main()
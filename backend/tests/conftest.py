@@ -0,0 +1,48 @@
+"""
+Shared test setup
+
+Settings need a database URI, name and JWT secret before the application
+is imported; tests that do not talk to MongoDB run on the memory backend.
+"""
+import os
+
+for _name, _value in {"MONGODB_URI": "mongodb://localhost", "DATABASE_NAME": "test", "JWT_SECRET_KEY": "test"}.items():
+    os.environ.setdefault(_name, _value)
+
+import pytest
+from fastapi.testclient import TestClient
+from backend.app import app
+from backend.config import settings
+from backend.repositories import Repositories
+
+PASSWORD = "Passw0rd1"
+
+
+@pytest.fixture
+def memory_backend():
+    """Fresh memory-backend repositories for one test"""
+    backend = Repositories.backend
+    Repositories.configure("memory")
+    yield Repositories
+    Repositories.configure(backend)
+
+
+@pytest.fixture
+def memory_client(monkeypatch):
+    """Application client on fresh memory-backend repositories (seeded with the sample courses)"""
+    backend = Repositories.backend
+    monkeypatch.setattr(settings, "repository_backend", "memory")
+    with TestClient(app) as client:
+        yield client
+    Repositories.configure(backend)
+
+
+@pytest.fixture
+def sign_up(memory_client):
+    """Create a learner and log them in: ``sign_up(email)`` returns their authorization headers"""
+    def sign_up(email: str) -> dict:
+        response = memory_client.post("/api/auth/signup", json={"email": email, "password": PASSWORD, "confirmPassword": PASSWORD, "fullName": "Test Learner"})
+        assert response.status_code == 200, response.text
+        response = memory_client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+        return {"Authorization": f"Bearer {response.json()['token']}"}
+    return sign_up
@@ -0,0 +1,17 @@
+"""Activity analytics route: time window handling"""
+from backend.config import settings
+
+ADMIN_EMAIL = "analyst@example.com"
+
+
+def test_offsets_are_converted_to_utc(memory_client, sign_up, monkeypatch):
+    monkeypatch.setattr(settings, "admin_emails", ADMIN_EMAIL)
+    headers = sign_up(ADMIN_EMAIL)
+    response = memory_client.get(
+        "/api/analytics/activity",
+        params={"granularity": "hour", "start": "2026-01-01T02:00:00+02:00", "end": "2026-01-01T05:00:00+02:00"},
+        headers=headers
+    )
+    assert response.status_code == 200, response.text
+    starts = [bucket["start"] for bucket in response.json()["buckets"]]
+    assert starts[0].startswith("2026-01-01T00:00:00") and starts[-1].startswith("2026-01-01T02:00:00"), starts
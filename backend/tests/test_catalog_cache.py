@@ -0,0 +1,30 @@
+"""Catalog cache: payloads built off the event loop, once per version"""
+import asyncio
+import gzip
+import json
+import threading
+from backend.utils.catalog import CatalogCache
+from backend.utils import catalog
+
+
+def test_payloads_are_built_once_in_a_thread(memory_client, monkeypatch):
+    loop_thread = memory_client.portal.call(threading.get_ident)
+    builds = []
+    serialize = catalog.serialize_catalog
+
+    def serialize_catalog(version, courses):
+        builds.append(threading.get_ident())
+        return serialize(version, courses)
+
+    monkeypatch.setattr(catalog, "serialize_catalog", serialize_catalog)
+    monkeypatch.setattr(CatalogCache, "payloads", {})
+
+    async def concurrent_requests():
+        return await asyncio.gather(*(CatalogCache.get_payload(encoding) for encoding in ("gzip", "identity", "gzip")))
+
+    results = memory_client.portal.call(concurrent_requests)
+    assert len(builds) == 1 and builds[0] != loop_thread
+    (version, compressed), (_, identity), (_, again) = results
+    assert again is compressed
+    assert gzip.decompress(compressed) == identity
+    assert json.loads(identity)["version"] == version
@@ -0,0 +1,61 @@
+"""Course completion through modules: bitset repair and completion counting"""
+from bson import ObjectId
+from datetime import datetime
+from backend.repositories import (
+    get_completions_repository,
+    get_course_funnels_repository,
+    get_module_completions_repository,
+    get_users_repository
+)
+from backend.utils.jobs import BackgroundJobs
+
+
+def _wait_for_jobs(client):
+    client.portal.call(BackgroundJobs.queue.join)
+
+
+def _start_course(client, headers) -> tuple[ObjectId, dict]:
+    course = client.get("/api/courses/catalog", headers=headers).json()["courses"][0]
+    assert client.post(f"/api/courses/{course['id']}/enroll", headers=headers).status_code == 200
+    user_id = ObjectId(client.get("/api/auth/me", headers=headers).json()["id"])
+    return user_id, course
+
+
+def test_repairing_the_last_bit_completes_the_course(memory_client, sign_up):
+    headers = sign_up("repair@example.com")
+    user_id, course = _start_course(memory_client, headers)
+    course_id = ObjectId(course["id"])
+    last = len(course["syllabus"]) - 1
+    for index in range(last):
+        assert memory_client.post(f"/api/courses/{course['id']}/modules/{index}/complete", headers=headers).status_code == 200
+    recorded_at = datetime.utcnow()
+    # Completion recorded without its bit, e.g. before module bitsets existed
+    memory_client.portal.call(get_module_completions_repository().insert, {
+        "userId": user_id, "courseId": course_id, "moduleIndex": last, "moduleTitle": course["syllabus"][last],
+        "completedAt": recorded_at, "createdAt": recorded_at
+    })
+
+    response = memory_client.post(f"/api/courses/{course['id']}/modules/{last}/complete", headers=headers)
+    assert response.status_code == 400
+    _wait_for_jobs(memory_client)
+
+    assert memory_client.portal.call(get_completions_repository().find, user_id, course_id) is not None
+    progress = memory_client.get(f"/api/courses/{course['id']}/progress", headers=headers).json()
+    assert progress["isFullyCompleted"]
+    user = memory_client.portal.call(get_users_repository().find_by_id, user_id)
+    assert user["points"] == last * 10 + len(course["syllabus"]) * 5
+
+
+def test_course_completion_is_counted_once(memory_client, sign_up):
+    headers = sign_up("once@example.com")
+    user_id, course = _start_course(memory_client, headers)
+    funnels = get_course_funnels_repository()
+    before = memory_client.portal.call(funnels.find, ObjectId(course["id"]))
+
+    assert memory_client.post(f"/api/courses/{course['id']}/complete", headers=headers).status_code == 200
+    for index in range(len(course["syllabus"])):
+        memory_client.post(f"/api/courses/{course['id']}/modules/{index}/complete", headers=headers)
+    _wait_for_jobs(memory_client)
+
+    after = memory_client.portal.call(funnels.find, ObjectId(course["id"]))
+    assert after["completions"] - (before or {}).get("completions", 0) == 1
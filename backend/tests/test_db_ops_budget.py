@@ -0,0 +1,200 @@
+"""
+Round-trip budgets of the API routes
+
+Every /api route is called against MongoDB and the X-DB-Ops count of its
+response is checked against the budget it declares with ``db_ops_budget``.
+
+Set MONGODB_TEST_URI to run against a real server (the test database is
+dropped afterwards). Otherwise mongomock stands in: each collection call is
+charged to the request as one round trip through the same ``DBOpsListener``
+pymongo notifies, and routes using operators mongomock lacks are skipped.
+"""
+from types import SimpleNamespace
+import functools
+import json
+import os
+import threading
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from backend.app import app
+from backend.config import settings
+from backend.utils.db import Database
+from backend.utils.db_ops import (
+    DB_OPS_HEADER,
+    DBOpsListener,
+    assert_db_ops_within_budget,
+    iter_routes,
+    routes_missing_db_ops_budget
+)
+
+MONGODB_TEST_URI = os.environ.get("MONGODB_TEST_URI")
+
+ADMIN_EMAIL = "budget-admin@example.com"
+PASSWORD = "Passw0rd1"
+
+# Collection methods that each cost one round trip (find/aggregate: the first batch)
+ROUND_TRIP_METHODS = (
+    "find", "find_one", "find_one_and_update", "find_one_and_replace", "find_one_and_delete",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one", "delete_one",
+    "delete_many", "bulk_write", "count_documents", "estimated_document_count", "distinct", "aggregate",
+)
+
+# Routes whose MongoDB operators mongomock does not implement
+REAL_MONGO_ONLY = {
+    "POST /api/courses/{course_id}/modules/{module_index}/complete",  # $bit / $bitsAllClear
+}
+
+# Routes that cannot be checked with a complete request
+NOT_CALLED = {
+    "GET /api/courses/events",  # Server-sent events: the response never ends
+}
+
+
+def _signup(state: dict) -> dict:
+    email = f"budget-{uuid.uuid4().hex[:8]}@example.com"
+    return {"json": {"email": email, "password": PASSWORD, "confirmPassword": PASSWORD, "fullName": "Budget User"}}
+
+
+def _import_body(state: dict) -> dict:
+    base = {
+        "description": "Imported for the budget test",
+        "instructor": "Test Instructor",
+        "duration": "1 week",
+        "lessonsCount": 2,
+        "level": "Beginner",
+        "syllabus": ["First module", "Second module"],
+        "objectives": ["Stay within budget"],
+    }
+    lines = [json.dumps({**base, "title": f"Budget Course {i}"}) for i in range(3)]
+    return {"content": "\n".join(lines).encode(), "headers": {"Content-Type": "application/x-ndjson"}}
+
+
+# (route, request arguments), in call order: later calls rely on earlier ones
+ROUTE_CALLS = [
+    ("POST /api/auth/signup", _signup),
+    ("POST /api/auth/login", lambda state: {"json": {"email": ADMIN_EMAIL, "password": PASSWORD}}),
+    ("POST /api/auth/refresh", lambda state: {"json": {"refreshToken": state["refresh_token"]}}),
+    ("GET /api/auth/me", lambda state: {}),
+    ("POST /api/auth/test-points/{points}", lambda state: {}),
+    ("GET /api/courses/", lambda state: {}),
+    ("GET /api/courses/catalog", lambda state: {}),
+    ("GET /api/courses/search", lambda state: {"params": {"q": "programming"}}),
+    ("GET /api/courses/suggest", lambda state: {"params": {"prefix": "pro"}}),
+    ("GET /api/courses/recommended", lambda state: {}),
+    ("GET /api/courses/{course_id}", lambda state: {}),
+    ("POST /api/courses/{course_id}/enroll", lambda state: {}),
+    ("POST /api/courses/{course_id}/modules/{module_index}/complete", lambda state: {}),
+    ("GET /api/courses/{course_id}/progress", lambda state: {}),
+    ("POST /api/courses/{course_id}/complete", lambda state: {}),
+    ("GET /api/courses/{course_id}/funnel", lambda state: {}),
+    ("GET /api/analytics/activity", lambda state: {}),
+    ("GET /api/admin/exports/{dataset}", lambda state: {}),
+    ("POST /api/admin/courses/import", _import_body),
+    ("POST /api/auth/logout", lambda state: {"json": {"refreshToken": state["refresh_token"]}}),
+]
+
+
+def _count_round_trips(monkeypatch):
+    """Charge mongomock collection calls to the current request like pymongo commands"""
+    import mongomock.collection
+
+    listener = DBOpsListener()
+    local = threading.local()
+
+    def counted(name, method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            depth = getattr(local, "depth", 0)
+            if depth == 0:
+                # Methods mongomock implements on top of others count once
+                listener.started(SimpleNamespace(command_name=name))
+            local.depth = depth + 1
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                local.depth = depth
+        return wrapper
+
+    for name in ROUND_TRIP_METHODS:
+        method = getattr(mongomock.collection.Collection, name)
+        monkeypatch.setattr(mongomock.collection.Collection, name, counted(name, method))
+
+
+@pytest.fixture(scope="module")
+def client():
+    """Application client on the MongoDB backend, logged in as an administrator"""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(settings, "repository_backend", "mongo")
+        monkeypatch.setattr(settings, "admin_emails", ADMIN_EMAIL)
+        if MONGODB_TEST_URI:
+            monkeypatch.setattr(settings, "mongodb_uri", MONGODB_TEST_URI)
+            monkeypatch.setattr(settings, "database_name", f"db_ops_budget_{uuid.uuid4().hex[:8]}")
+            monkeypatch.setattr(Database, "database_name", settings.database_name)
+        else:
+            mongomock_motor = pytest.importorskip("mongomock_motor")
+            _count_round_trips(monkeypatch)
+            monkeypatch.setattr(settings, "causal_consistency", False)
+
+            async def connect_db(reconnect: bool = False):
+                Database.client = mongomock_motor.AsyncMongoMockClient()
+                await Database._create_indexes()
+                await Database._run_migrations()
+
+            monkeypatch.setattr(Database, "connect_db", connect_db)
+
+        with TestClient(app) as test_client:
+            signup = _signup({})["json"]
+            response = test_client.post("/api/auth/signup", json={**signup, "email": ADMIN_EMAIL})
+            assert response.status_code == 200, response.text
+            yield test_client
+            if MONGODB_TEST_URI:
+                test_client.portal.call(Database.client.drop_database, settings.database_name)
+
+
+@pytest.fixture(scope="module")
+def state(client):
+    """Tokens and IDs shared by the route calls"""
+    response = client.post("/api/auth/login", json={"email": ADMIN_EMAIL, "password": PASSWORD})
+    body = response.json()
+    course = client.get("/api/courses/catalog", headers={"Authorization": f"Bearer {body['token']}"}).json()["courses"][0]
+    return {
+        "headers": {"Authorization": f"Bearer {body['token']}"},
+        "refresh_token": body["refreshToken"],
+        "path_params": {"course_id": course["id"], "module_index": 0, "points": 5, "dataset": "enrollments"},
+    }
+
+
+def test_every_api_route_declares_a_budget():
+    assert routes_missing_db_ops_budget(app) == []
+
+
+def test_every_api_route_is_checked():
+    routes = {
+        f"{method} {path}"
+        for path, route in iter_routes(app.routes)
+        if path.startswith("/api")
+        for method in getattr(route, "methods", None) or []
+    }
+    assert routes == {route for route, _ in ROUTE_CALLS} | NOT_CALLED
+
+
+@pytest.mark.parametrize("route, request_args", ROUTE_CALLS, ids=[route for route, _ in ROUTE_CALLS])
+def test_route_stays_within_budget(client, state, route, request_args):
+    if route in REAL_MONGO_ONLY and not MONGODB_TEST_URI:
+        pytest.skip("Needs a real MongoDB server (MONGODB_TEST_URI)")
+    method, path = route.split(" ", 1)
+    kwargs = request_args(state)
+    headers = {**state["headers"], **kwargs.pop("headers", {})}
+
+    response = client.request(method, path.format(**state["path_params"]), headers=headers, **kwargs)
+
+    assert response.status_code < 400, response.text
+    assert_db_ops_within_budget(response)
+
+
+def test_round_trips_are_counted(client, state):
+    course_id = state["path_params"]["course_id"]
+    response = client.get(f"/api/courses/{course_id}/progress", headers=state["headers"])
+    assert int(response.headers[DB_OPS_HEADER]) > 0
@@ -0,0 +1,20 @@
+"""Admin exports: date range filters"""
+from datetime import datetime, timedelta, timezone
+import json
+from backend.config import settings
+
+ADMIN_EMAIL = "exporter@example.com"
+
+
+def test_offset_range_is_converted_to_utc(memory_client, sign_up, monkeypatch):
+    monkeypatch.setattr(settings, "admin_emails", ADMIN_EMAIL)
+    headers = sign_up(ADMIN_EMAIL)
+    course = memory_client.get("/api/courses/catalog", headers=headers).json()["courses"][0]
+    assert memory_client.post(f"/api/courses/{course['id']}/enroll", headers=headers).status_code == 200
+
+    # Half an hour from now, written at UTC-02:00
+    end = (datetime.now(timezone.utc) + timedelta(minutes=30)).astimezone(timezone(timedelta(hours=-2)))
+    response = memory_client.get("/api/admin/exports/enrollments", params={"end": end.isoformat()}, headers=headers)
+    assert response.status_code == 200, response.text
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["courseId"] for row in rows] == [course["id"]]
@@ -0,0 +1,114 @@
+"""Idempotency keys: replays, concurrent use of a key and reuse after a crash"""
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import asyncio
+import pytest
+from backend.repositories import get_idempotency_keys_repository
+from backend.utils.idempotency import (
+    IDEMPOTENT_REPLAY_HEADER,
+    IdempotentResponses,
+    claim_or_replay,
+    finish_request
+)
+
+
+@pytest.fixture(autouse=True)
+def responses(monkeypatch):
+    """Empty per-process response cache"""
+    monkeypatch.setattr(IdempotentResponses, "cache", OrderedDict())
+    monkeypatch.setattr(IdempotentResponses, "in_flight", {})
+    return IdempotentResponses
+
+
+@pytest.fixture
+def learner(memory_client, sign_up):
+    """(headers, user ID, ID of a course) of a new learner"""
+    headers = sign_up("retry@example.com")
+    user_id = memory_client.get("/api/auth/me", headers=headers).json()["id"]
+    course_id = memory_client.get("/api/courses/catalog", headers=headers).json()["courses"][0]["id"]
+    return headers, user_id, course_id
+
+
+def _claim_elsewhere(client, key_id: str, path: str, locked_for: timedelta):
+    """Claim a key as a request running on another worker would"""
+    now = datetime.utcnow()
+    return client.portal.call(get_idempotency_keys_repository().claim, key_id, path, now + locked_for, now + timedelta(hours=1))
+
+
+def test_retry_gets_the_stored_response(memory_client, learner, responses):
+    headers, _, course_id = learner
+    headers = {**headers, "Idempotency-Key": "enroll-1"}
+    first = memory_client.post(f"/api/courses/{course_id}/enroll", headers=headers)
+    assert first.status_code == 200 and IDEMPOTENT_REPLAY_HEADER not in first.headers
+
+    for cached in (True, False):
+        if not cached:
+            # Another worker: read from the key store
+            responses.cache.clear()
+        retry = memory_client.post(f"/api/courses/{course_id}/enroll", headers=headers)
+        assert retry.status_code == 200
+        assert retry.json() == first.json()
+        assert retry.headers[IDEMPOTENT_REPLAY_HEADER] == "true"
+
+    # Without the key the route runs again
+    assert memory_client.post(f"/api/courses/{course_id}/enroll", headers=learner[0]).status_code == 400
+
+
+def test_key_is_bound_to_its_request(memory_client, learner):
+    headers, _, course_id = learner
+    headers = {**headers, "Idempotency-Key": "shared"}
+    assert memory_client.post(f"/api/courses/{course_id}/enroll", headers=headers).status_code == 200
+    response = memory_client.post(f"/api/courses/{course_id}/modules/0/complete", headers=headers)
+    assert response.status_code == 422
+
+
+def test_key_in_use_on_another_worker_is_refused(memory_client, learner):
+    headers, user_id, course_id = learner
+    path = f"/api/courses/{course_id}/enroll"
+    assert _claim_elsewhere(memory_client, f"{user_id}:busy", path, timedelta(seconds=30)) is None
+
+    response = memory_client.post(path, headers={**headers, "Idempotency-Key": "busy"})
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_key_of_a_crashed_request_is_reused_after_its_lock(memory_client, learner):
+    headers, user_id, course_id = learner
+    path = f"/api/courses/{course_id}/enroll"
+    # Claimed by a request that never finished, its lock (IDEMPOTENCY_LOCK_SECONDS) now expired
+    assert _claim_elsewhere(memory_client, f"{user_id}:crashed", path, timedelta(seconds=-1)) is None
+
+    response = memory_client.post(path, headers={**headers, "Idempotency-Key": "crashed"})
+    assert response.status_code == 200 and IDEMPOTENT_REPLAY_HEADER not in response.headers
+    retry = memory_client.post(path, headers={**headers, "Idempotency-Key": "crashed"})
+    assert retry.headers[IDEMPOTENT_REPLAY_HEADER] == "true"
+
+
+def test_concurrent_use_on_one_worker_waits_for_the_first_request(memory_backend):
+    async def scenario():
+        first = {"key_id": "user:key", "path": "/api/example", "claimed": False}
+        second = {"key_id": "user:key", "path": "/api/example", "claimed": False}
+        assert await claim_or_replay(first) is None and first["claimed"]
+
+        waiting = asyncio.create_task(claim_or_replay(second))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+
+        await finish_request(first, 201, [(b"content-type", b"application/json")], b'{"created":true}')
+        replay = await waiting
+        assert not second["claimed"]
+        assert replay.status_code == 201 and replay.body == b'{"created":true}'
+        assert replay.headers[IDEMPOTENT_REPLAY_HEADER] == "true"
+
+    asyncio.run(scenario())
+
+
+def test_failed_request_releases_its_key(memory_backend):
+    async def scenario():
+        request_key = {"key_id": "user:key", "path": "/api/example", "claimed": False}
+        assert await claim_or_replay(request_key) is None
+        await finish_request(request_key, 500, [], b"")
+        retry = {"key_id": "user:key", "path": "/api/example", "claimed": False}
+        assert await claim_or_replay(retry) is None and retry["claimed"]
+
+    asyncio.run(scenario())
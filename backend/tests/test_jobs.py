@@ -0,0 +1,136 @@
+"""Background jobs: retries, the durable outbox and backpressure"""
+from datetime import datetime, timedelta
+import asyncio
+import pytest
+from backend.config import settings
+from backend.repositories import get_job_outbox_repository
+from backend.utils.jobs import BackgroundJobs
+from backend.utils.metrics import Metrics
+
+
+class FlakyJob:
+    """Job handler failing its first ``failures`` calls"""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = []
+
+    async def __call__(self, **payload):
+        self.calls.append(payload)
+        if len(self.calls) <= self.failures:
+            raise RuntimeError(f"failure {len(self.calls)}")
+
+
+@pytest.fixture
+def jobs(memory_backend, monkeypatch):
+    """Job registry without workers (jobs run inline) and without retry delays"""
+    monkeypatch.setattr(BackgroundJobs, "handlers", {})
+    monkeypatch.setattr(BackgroundJobs, "queue", None)
+    monkeypatch.setattr(settings, "background_job_retry_seconds", 0)
+    monkeypatch.setattr(settings, "background_job_max_attempts", 3)
+    monkeypatch.setattr(settings, "background_job_max_outbox_attempts", 2)
+    return BackgroundJobs
+
+
+def _outbox() -> dict:
+    return get_job_outbox_repository().collection.docs
+
+
+def _expire_leases():
+    """Move every scheduled outbox job into the past, as if its lease or retry delay had elapsed"""
+    for doc in _outbox().values():
+        if doc["runAfter"] is not None:
+            doc["runAfter"] = datetime.utcnow() - timedelta(seconds=1)
+
+
+def test_failed_attempts_are_retried(jobs):
+    handler = FlakyJob(failures=2)
+    jobs.register("test.flaky", handler)
+    asyncio.run(jobs.enqueue("test.flaky", durable=True, value=1))
+    assert handler.calls == [{"value": 1}] * 3
+    assert _outbox() == {}
+
+
+def test_unknown_jobs_are_rejected(jobs):
+    with pytest.raises(KeyError):
+        asyncio.run(jobs.enqueue("test.missing"))
+
+
+def test_exhausted_job_is_dropped_unless_durable(jobs):
+    handler = FlakyJob(failures=100)
+    jobs.register("test.failing", handler)
+    asyncio.run(jobs.enqueue("test.failing"))
+    assert len(handler.calls) == 3 and _outbox() == {}
+
+    asyncio.run(jobs.enqueue("test.failing", durable=True))
+    assert len(handler.calls) == 6
+    (doc,) = _outbox().values()
+    assert doc["attempts"] == 1 and doc["error"] == "failure 6"
+    assert doc["runAfter"] > datetime.utcnow() + timedelta(seconds=settings.background_job_lease_seconds)
+
+
+def test_expired_lease_runs_the_job_again(jobs, monkeypatch):
+    handler = FlakyJob()
+    jobs.register("test.lost", handler)
+    with monkeypatch.context() as crash:
+        # Recorded, then lost with its worker before running
+        crash.setattr(BackgroundJobs, "_submit", lambda job: asyncio.sleep(0))
+        asyncio.run(jobs.enqueue("test.lost", durable=True, value=2))
+
+    async def scenario():
+        assert await jobs.sweep() == 0  # Still leased
+        _expire_leases()
+        assert await jobs.sweep() == 1
+
+    asyncio.run(scenario())
+    assert handler.calls == [{"value": 2}]
+    assert _outbox() == {}
+
+
+def test_job_failing_every_run_is_left_dead(jobs):
+    handler = FlakyJob(failures=100)
+    jobs.register("test.dead", handler)
+
+    async def scenario():
+        await jobs.enqueue("test.dead", durable=True)
+        _expire_leases()
+        assert await jobs.sweep() == 1
+        _expire_leases()
+        assert await jobs.sweep() == 0
+
+    asyncio.run(scenario())
+    assert len(handler.calls) == 2 * settings.background_job_max_attempts
+    (doc,) = _outbox().values()
+    assert doc["runAfter"] is None and doc["attempts"] == settings.background_job_max_outbox_attempts
+
+
+def test_claim_due_takes_the_oldest_due_job_and_leases_it(memory_backend):
+    repository = get_job_outbox_repository()
+    now = datetime.utcnow()
+
+    async def scenario():
+        for name, run_after in [("later", now + timedelta(minutes=1)), ("newer", now - timedelta(minutes=1)), ("older", now - timedelta(minutes=2)), ("dead", None)]:
+            await repository.insert({"_id": name, "name": name, "payload": {}, "attempts": 0, "runAfter": run_after})
+        lease_until = now + timedelta(minutes=5)
+        claimed = [await repository.claim_due(now, lease_until) for _ in range(3)]
+        assert [doc["_id"] for doc in claimed[:2]] == ["older", "newer"]
+        assert claimed[0]["runAfter"] == lease_until
+        assert claimed[2] is None
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_runs_the_job_inline(jobs, monkeypatch):
+    handler = FlakyJob()
+    jobs.register("test.inline", handler)
+
+    async def scenario():
+        monkeypatch.setattr(BackgroundJobs, "queue", asyncio.Queue(maxsize=1))
+        jobs.queue.put_nowait({"name": "queued"})
+        overflow = Metrics.get("jobs.overflow")
+        await jobs.enqueue("test.inline", value=3)
+        assert handler.calls == [{"value": 3}]
+        assert Metrics.get("jobs.overflow") == overflow + 1
+        assert jobs.queue.qsize() == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,22 @@
+"""/metrics: administrators only"""
+from backend.config import settings
+
+ADMIN_EMAIL = "operator@example.com"
+
+
+def test_metrics_requires_a_token(memory_client):
+    assert memory_client.get("/metrics").status_code in (401, 403)
+
+
+def test_metrics_rejects_learners(memory_client, sign_up, monkeypatch):
+    monkeypatch.setattr(settings, "admin_emails", ADMIN_EMAIL)
+    headers = sign_up("learner@example.com")
+    assert memory_client.get("/metrics", headers=headers).status_code == 403
+
+
+def test_metrics_for_administrators(memory_client, sign_up, monkeypatch):
+    monkeypatch.setattr(settings, "admin_emails", ADMIN_EMAIL)
+    headers = sign_up(ADMIN_EMAIL)
+    response = memory_client.get("/metrics", headers=headers)
+    assert response.status_code == 200, response.text
+    assert "counters" in response.json()
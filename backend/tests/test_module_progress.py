@@ -0,0 +1,75 @@
+"""Completed-module bitsets: table tests across word boundaries"""
+import pytest
+from backend.utils.module_progress import (
+    MODULE_BITS_PER_WORD,
+    completed_module_indexes,
+    is_module_completed,
+    merge_module_bits,
+    module_bit,
+    module_progress_fields,
+    next_module_index
+)
+
+W = MODULE_BITS_PER_WORD
+
+
+@pytest.mark.parametrize("module_index, expected", [
+    (0, ("0", 1)),
+    (5, ("0", 1 << 5)),
+    (W - 1, ("0", 1 << (W - 1))),
+    (W, ("1", 1)),
+    (2 * W + 3, ("2", 1 << 3)),
+])
+def test_module_bit(module_index, expected):
+    assert module_bit(module_index) == expected
+
+
+# (completed modules, total modules, next module to take)
+BITSETS = [
+    ([], 0, None),
+    ([], 1, 0),
+    ([], W + 5, 0),
+    ([0], 1, None),
+    ([0, 1, 3], 5, 2),
+    ([1, 2], 3, 0),
+    (list(range(W)), W, None),
+    (list(range(W)), W + 1, W),
+    (list(range(W)), 2 * W, W),
+    (list(range(W + 1)), W + 2, W + 1),
+    ([index for index in range(2 * W + 4) if index != W + 7], 2 * W + 4, W + 7),
+    (list(range(2 * W + 4)), 2 * W + 4, None),
+    # Bits past the end of the syllabus (modules since removed) do not count
+    (list(range(W - 2)) + [W + 3], W - 2, None),
+]
+
+
+@pytest.mark.parametrize("completed, total, expected", BITSETS)
+def test_next_module_index(completed, total, expected):
+    assert next_module_index(module_progress_fields(completed), total) == expected
+
+
+@pytest.mark.parametrize("completed, total, expected", BITSETS)
+def test_completed_module_indexes(completed, total, expected):
+    enrollment = module_progress_fields(completed)
+    assert completed_module_indexes(enrollment, total) == sorted(index for index in completed if index < total)
+    assert all(is_module_completed(enrollment, index) for index in completed)
+    assert not any(is_module_completed(enrollment, index) for index in range(total) if index not in completed)
+
+
+def test_enrollment_without_bitset_has_nothing_completed():
+    assert next_module_index({}, 3) == 0
+    assert completed_module_indexes({}, 3) == []
+    assert not is_module_completed({}, W + 1)
+
+
+def test_progress_fields_count_each_module_once():
+    fields = module_progress_fields([0, 0, W, W + 1, 3 * W])
+    assert fields == {"moduleBits": {"0": 1, "1": 0b11, "3": 1}, "completedModuleCount": 4}
+
+
+def test_merge_adds_bits_without_modifying_the_input():
+    words = {"0": 0b101}
+    merged = merge_module_bits(words, [1, 2, W + 2])
+    assert merged == {"moduleBits": {"0": 0b111, "1": 0b100}, "completedModuleCount": 4}
+    assert words == {"0": 0b101}
+    assert merge_module_bits(merged["moduleBits"], [0, W + 2]) == merged
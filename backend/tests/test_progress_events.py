@@ -0,0 +1,134 @@
+"""MongoDB progress event broker: startup without a database and resuming a tail"""
+from bson import ObjectId
+import asyncio
+from backend.utils.db import DatabaseUnavailableError
+from backend.utils.events import MongoEventBroker
+
+
+class FakeCappedCollection:
+    """Capped collection in insertion order whose tailable cursors can be broken"""
+
+    def __init__(self, docs: list[dict]):
+        self.docs = docs
+        self.failures = 0
+
+    async def find_one(self, query, projection=None, sort=None):
+        return self.docs[-1] if self.docs else None
+
+    def find(self, query, cursor_type=None):
+        return FakeTailableCursor(self)
+
+
+class FakeTailableCursor:
+    def __init__(self, collection: FakeCappedCollection):
+        self.collection = collection
+        self.position = 0
+        self.alive = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.collection.failures:
+            self.collection.failures -= 1
+            self.alive = False
+            raise ConnectionError("connection reset")
+        if self.position < len(self.collection.docs):
+            self.position += 1
+            return self.collection.docs[self.position - 1]
+        await asyncio.sleep(0.01)
+        raise StopAsyncIteration
+
+
+def _event(oid: ObjectId) -> dict:
+    return {"_id": oid, "userId": "learner", "event": {"id": str(oid)}}
+
+
+def _broker(collection: FakeCappedCollection, create_collection=None) -> MongoEventBroker:
+    broker = MongoEventBroker(min_retry_seconds=0.01, max_retry_seconds=0.01)
+    broker._collection = lambda: collection
+
+    async def created():
+        if create_collection is not None:
+            await create_collection()
+
+    broker._create_collection = created
+    return broker
+
+
+async def _wait_for(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("timed out")
+
+
+def test_start_does_not_wait_for_the_database():
+    async def scenario():
+        attempts = []
+
+        async def unavailable():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise DatabaseUnavailableError("down")
+
+        collection = FakeCappedCollection([])
+        broker = _broker(collection, unavailable)
+        delivered = []
+        await broker.start(lambda user_id, event: delivered.append(event["id"]), lambda: None)
+        await _wait_for(lambda: len(attempts) >= 3)
+        collection.docs.append(_event(ObjectId()))
+        await _wait_for(lambda: delivered)
+        await broker.stop()
+
+    asyncio.run(scenario())
+
+
+def test_reconnect_delivers_events_with_smaller_ids():
+    async def scenario():
+        old = _event(ObjectId())
+        collection = FakeCappedCollection([old])
+        broker = _broker(collection)
+        delivered = []
+        await broker.start(lambda user_id, event: delivered.append(event["id"]), lambda: None)
+        await asyncio.sleep(0.05)
+
+        newer = _event(ObjectId())
+        collection.docs.append(newer)
+        await _wait_for(lambda: delivered == [newer["event"]["id"]])
+
+        # Published by another worker whose ObjectId sorts before the last one seen
+        earlier_id = ObjectId.from_datetime(old["_id"].generation_time)
+        collection.failures = 1
+        collection.docs.append(_event(earlier_id))
+        await _wait_for(lambda: len(delivered) == 2)
+        assert delivered == [newer["event"]["id"], str(earlier_id)]
+        await broker.stop()
+
+    asyncio.run(scenario())
+
+
+def test_overwritten_position_asks_streams_to_resync():
+    async def scenario():
+        collection = FakeCappedCollection([_event(ObjectId())])
+        broker = _broker(collection)
+        delivered, resyncs = [], []
+        await broker.start(lambda user_id, event: delivered.append(event["id"]), lambda: resyncs.append(1))
+        await asyncio.sleep(0.05)
+        first = _event(ObjectId())
+        collection.docs.append(first)
+        await _wait_for(lambda: delivered)
+
+        # The capped collection wrapped around while disconnected
+        collection.failures = 1
+        collection.docs[:] = [_event(ObjectId()) for _ in range(3)]
+        await _wait_for(lambda: resyncs)
+        assert delivered == [first["event"]["id"]]
+
+        later = _event(ObjectId())
+        collection.docs.append(later)
+        await _wait_for(lambda: len(delivered) == 2)
+        await broker.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,88 @@
+"""Course recommendations: co-enrollment similarity table and ranking"""
+import math
+import pytest
+from backend.utils.recommendations import (
+    RECOMMENDATIONS_AVAILABLE,
+    LearnerCoursePairs,
+    Recommendations,
+    build_similarity_table,
+    rank_by_popularity
+)
+
+requires_numpy = pytest.mark.skipif(not RECOMMENDATIONS_AVAILABLE, reason="Needs NumPy and SciPy (recommendations extra)")
+
+
+def _pairs(*batches: list[tuple]) -> LearnerCoursePairs:
+    pairs = LearnerCoursePairs()
+    for batch in batches:
+        pairs.add(batch)
+    return pairs
+
+
+def _took(course: str, learners: range) -> list[tuple]:
+    return [(f"learner-{learner}", course) for learner in learners]
+
+
+@requires_numpy
+def test_similarity_is_cosine_over_shared_learners():
+    # a: learners 0-3, b: learners 0-1, c: learners 2-4
+    pairs = _pairs(_took("a", range(4)) + _took("b", range(2)), _took("c", range(2, 5)))
+    table, popular = build_similarity_table(pairs, top_k=5, min_co_enrollments=2)
+
+    assert dict(table["b"]) == {"a": round(2 / math.sqrt(2 * 4), 4)}
+    assert dict(table["a"]) == {"c": round(2 / math.sqrt(4 * 3), 4), "b": round(2 / math.sqrt(2 * 4), 4)}
+    assert [course for course, _ in table["a"]] == ["b", "c"]  # Decreasing score
+    assert "a" not in dict(table["a"])  # A course is not similar to itself
+    assert popular == ["a", "c", "b"]
+
+
+@requires_numpy
+def test_pairs_below_the_co_enrollment_threshold_are_dropped():
+    pairs = _pairs(_took("a", range(3)) + _took("b", range(2)) + _took("c", [2]))
+    table, _ = build_similarity_table(pairs, top_k=5, min_co_enrollments=2)
+    assert table == {"a": [("b", round(2 / math.sqrt(6), 4))], "b": [("a", round(2 / math.sqrt(6), 4))]}
+    table, _ = build_similarity_table(pairs, top_k=5, min_co_enrollments=1)
+    assert set(dict(table["a"])) == {"b", "c"} and dict(table["c"]) == {"a": round(1 / math.sqrt(3), 4)}
+    table, _ = build_similarity_table(pairs, top_k=5, min_co_enrollments=3)
+    assert table == {}
+
+
+@requires_numpy
+def test_only_top_k_similar_courses_are_kept():
+    # Course "hub" shares 2 + n learners with course n
+    pairs = LearnerCoursePairs()
+    for other in range(6):
+        learners = range(100 * other, 100 * other + 2 + other)
+        pairs.add(_took("hub", learners) + _took(f"course-{other}", learners))
+    table, _ = build_similarity_table(pairs, top_k=3, min_co_enrollments=2)
+    assert [course for course, _ in table["hub"]] == ["course-5", "course-4", "course-3"]
+    assert all(len(similar) <= 3 for similar in table.values())
+
+
+@requires_numpy
+def test_enrolled_and_completed_counts_once():
+    enrolled = _took("a", range(2)) + _took("b", range(2))
+    table, _ = build_similarity_table(_pairs(enrolled, enrolled), top_k=5, min_co_enrollments=2)
+    assert table["a"] == [("b", 1.0)]
+
+
+@requires_numpy
+def test_no_pairs_no_table():
+    assert build_similarity_table(LearnerCoursePairs(), top_k=5) == ({}, [])
+
+
+def test_popularity_fallback_counts_distinct_learners():
+    pairs = {("l1", "a"), ("l2", "a"), ("l1", "b"), ("l3", "c"), ("l4", "c"), ("l5", "c")}
+    assert rank_by_popularity(pairs) == ["c", "a", "b"]
+
+
+def test_recommendations_merge_the_courses_taken(monkeypatch):
+    monkeypatch.setattr(Recommendations, "similar", {
+        "a": [("c", 0.5), ("d", 0.2)],
+        "b": [("d", 0.4), ("a", 0.9)],
+    })
+    monkeypatch.setattr(Recommendations, "popular", ["a", "e", "c", "f"])
+    ranked, personalized = Recommendations.recommend_for({"a", "b"}, limit=4)
+    assert personalized
+    assert ranked == [("d", pytest.approx(0.6)), ("c", 0.5), ("e", 0.0), ("f", 0.0)]
+    assert Recommendations.recommend_for({"z"}, limit=2) == ([("a", 0.0), ("e", 0.0)], False)
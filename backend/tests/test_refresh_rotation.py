@@ -0,0 +1,48 @@
+"""Refresh token rotation: a refresh token buys one new token pair"""
+import asyncio
+import pytest
+from fastapi import HTTPException
+from backend.models.user import RefreshTokenRequest
+from backend.repositories import get_users_repository
+from backend.routes.auth import refresh
+from backend.utils.auth import create_refresh_token
+from backend.utils.revocation import TokenRevocationList
+
+
+@pytest.fixture
+def refresh_token(memory_backend, monkeypatch):
+    """Refresh token of a stored user"""
+    monkeypatch.setattr(TokenRevocationList, "bloom", None)
+    monkeypatch.setattr(TokenRevocationList, "synced_until", None)
+    user_id = asyncio.run(get_users_repository().insert(
+        {"email": "learner@example.com", "fullName": "Learner", "password": "x", "points": 0}
+    ))
+    return create_refresh_token(str(user_id))
+
+
+async def _refresh(token: str):
+    try:
+        return await refresh(RefreshTokenRequest(refreshToken=token))
+    except HTTPException as e:
+        return e
+
+
+def test_refresh_token_cannot_be_reused(refresh_token):
+    async def scenario():
+        first = await _refresh(refresh_token)
+        assert first.success
+        second = await _refresh(refresh_token)
+        assert isinstance(second, HTTPException) and second.status_code == 401
+        assert (await _refresh(first.refreshToken)).success
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_refreshes_rotate_once(refresh_token):
+    async def scenario():
+        results = await asyncio.gather(*(_refresh(refresh_token) for _ in range(5)))
+        rejected = [r for r in results if isinstance(r, HTTPException)]
+        assert len(rejected) == 4
+        assert all(r.status_code == 401 for r in rejected)
+
+    asyncio.run(scenario())
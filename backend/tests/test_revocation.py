@@ -0,0 +1,72 @@
+"""Token revocation list: Bloom filter and sync against the repository"""
+from datetime import datetime, timedelta
+import asyncio
+import pytest
+from backend.repositories import get_revoked_tokens_repository
+from backend.utils.revocation import BloomFilter, TokenRevocationList
+
+
+@pytest.fixture
+def revocations(memory_backend, monkeypatch):
+    """Revocation list with no filter loaded, as after a failed startup sync"""
+    monkeypatch.setattr(TokenRevocationList, "bloom", None)
+    monkeypatch.setattr(TokenRevocationList, "synced_until", None)
+    return TokenRevocationList
+
+
+def _expiry() -> datetime:
+    return datetime.utcnow() + timedelta(hours=1)
+
+
+async def _revoke_on_another_worker(jti: str):
+    await get_revoked_tokens_repository().insert(jti, _expiry())
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(100, 0.01)
+    items = [f"token-{i}" for i in range(100)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    assert bloom.count == 100
+
+
+def test_revoke_before_first_sync_keeps_checking_the_database(revocations):
+    async def scenario():
+        await _revoke_on_another_worker("other")
+        # Logout on this worker while the startup sync has not succeeded
+        await revocations.revoke("mine", _expiry())
+        assert await revocations.is_revoked("other")
+        assert await revocations.is_revoked("mine")
+
+        await revocations.sync()
+        assert revocations.synced_until is not None
+        assert await revocations.is_revoked("other")
+        assert await revocations.is_revoked("mine")
+        assert not await revocations.is_revoked("never-revoked")
+
+    asyncio.run(scenario())
+
+
+def test_sync_without_a_previous_sync_rebuilds_the_filter(revocations):
+    async def scenario():
+        await _revoke_on_another_worker("other")
+        revocations.bloom = revocations._new_filter()
+        await revocations.sync()
+        assert await revocations.is_revoked("other")
+
+    asyncio.run(scenario())
+
+
+def test_incremental_sync_adds_revocations_from_other_workers(revocations):
+    async def scenario():
+        await revocations.sync(full=True)
+        await revocations.revoke("local", _expiry())
+        assert "local" in revocations.bloom
+
+        await _revoke_on_another_worker("remote")
+        assert "remote" not in revocations.bloom
+        await revocations.sync()
+        assert "remote" in revocations.bloom
+
+    asyncio.run(scenario())
@@ -0,0 +1,110 @@
+"""Full-text course search: tokenization, BM25 ranking and incremental updates"""
+from datetime import datetime
+import asyncio
+import pytest
+from backend.repositories import get_courses_repository
+from backend.utils.catalog import CatalogCache
+from backend.utils.search import CourseSearchIndex, tokenize
+
+
+def _course(course_id: str, title: str, description: str = "", level: str = "Beginner", updated_at: datetime = datetime(2026, 1, 1)) -> dict:
+    return {
+        "_id": course_id,
+        "title": title,
+        "description": description,
+        "instructor": "Grace Hopper",
+        "syllabus": [],
+        "objectives": [],
+        "level": level,
+        "updatedAt": updated_at,
+    }
+
+
+def _state(index: CourseSearchIndex):
+    return dict(index.postings), index.doc_terms, index.doc_lengths, index.levels, round(index.total_length, 6)
+
+
+def test_tokenize_normalizes_and_drops_stopwords():
+    assert tokenize("Introduction to Café-Culture, and the Naïve Bayes!") == ["introduction", "cafe", "culture", "naive", "bayes"]
+    assert tokenize("the and of") == []
+
+
+def test_title_matches_outrank_description_matches():
+    index = CourseSearchIndex([
+        _course("described", "Cooking Basics", "Learn python while cooking"),
+        _course("titled", "Python Basics", "Learn to cook"),
+    ])
+    total, ranked = index.search("python")
+    assert total == 2
+    assert [course_id for course_id, _ in ranked] == ["titled", "described"]
+
+
+def test_rare_terms_weigh_more():
+    index = CourseSearchIndex([
+        _course("common", "Web Design", "web web"),
+        _course("rare", "Web Security", "cryptography"),
+        _course("other", "Web Apps"),
+    ])
+    _, ranked = index.search("web cryptography")
+    assert ranked[0][0] == "rare"
+
+
+def test_level_filter_and_stable_pagination():
+    index = CourseSearchIndex([_course(f"course-{n}", "Data Analysis", level="Advanced" if n % 2 else "Beginner") for n in range(6)])
+    total, ranked = index.search("data", level="Advanced")
+    assert total == 3 and {course_id for course_id, _ in ranked} == {"course-1", "course-3", "course-5"}
+    _, everything = index.search("data")
+    pages = [index.search("data", offset=offset, limit=2)[1] for offset in (0, 2, 4)]
+    assert [item for page in pages for item in page] == everything
+
+
+def test_no_terms_no_results():
+    index = CourseSearchIndex([_course("course", "Statistics")])
+    assert index.search("the") == (0, [])
+    assert CourseSearchIndex().search("statistics") == (0, [])
+
+
+def test_sync_matches_a_fresh_index():
+    courses = [_course(f"course-{n}", f"Topic {n} Fundamentals", "shared words") for n in range(10)]
+    index = CourseSearchIndex(courses)
+    later = datetime(2026, 2, 1)
+    snapshot = courses[2:8] + [_course("course-0", "Renamed Course", updated_at=later), _course("course-new", "Brand New")]
+
+    assert index.sync(snapshot, "v2") == 5  # 1 updated, 1 added, 3 removed
+    assert index.version == "v2"
+    assert _state(index) == _state(CourseSearchIndex(snapshot))
+    assert index.search("fundamentals")[0] == 6
+    assert index.search("renamed")[1][0][0] == "course-0"
+    assert index.search("topic 9")[1][0][0] != "course-9"
+
+
+@pytest.fixture
+def catalog_cache(memory_backend, monkeypatch):
+    """Empty catalog cache over the memory backend"""
+    for name, value in {"courses": None, "published_version": None, "loaded_at": 0.0, "search_index": None, "_lock": None}.items():
+        monkeypatch.setattr(CatalogCache, name, value)
+    return CatalogCache
+
+
+def test_catalog_changes_reach_the_index(catalog_cache):
+    async def scenario():
+        courses = get_courses_repository()
+        documents = [_course(None, "Machine Learning"), _course(None, "Deep Learning")]
+        course_ids = await courses.insert_many([
+            {**{field: value for field, value in document.items() if field != "_id"}, "createdAt": datetime(2026, 1, 1)}
+            for document in documents
+        ])
+        await catalog_cache.publish()
+        _, ranked = (await catalog_cache.get_search_index()).search("learning")
+        assert {course_id for course_id, _ in ranked} == {str(course_id) for course_id in course_ids}
+
+        inserted, updated, errors = await courses.bulk_upsert([
+            ({"_id": course_ids[1]}, {"title": "Reinforcement Learning", "updatedAt": datetime(2026, 3, 1)})
+        ])
+        assert (inserted, updated, errors) == (0, 1, {})
+        await catalog_cache.publish()
+        index = await catalog_cache.get_search_index()
+        assert index.search("reinforcement")[1][0][0] == str(course_ids[1])
+        assert index.search("deep") == (0, [])
+
+    asyncio.run(scenario())
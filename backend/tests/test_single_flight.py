@@ -0,0 +1,93 @@
+"""Single-flight coalescing of concurrent reads"""
+import asyncio
+import pytest
+from backend.utils.metrics import Metrics
+from backend.utils.single_flight import SingleFlight
+
+
+class SlowCall:
+    """Call that waits until released and counts its executions"""
+
+    def __init__(self, result=None, error: Exception | None = None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_concurrent_calls_for_a_key_share_one_execution():
+    async def scenario():
+        group = SingleFlight("test.coalesce")
+        coalesced = Metrics.get("singleflight.test.coalesce.coalesced")
+        call = SlowCall(result={"_id": 1})
+        other = SlowCall(result={"_id": 2})
+        waiters = [asyncio.create_task(group.do("one", call)) for _ in range(5)]
+        waiters.append(asyncio.create_task(group.do("two", other)))
+        await asyncio.sleep(0)
+        assert group.in_flight() == 2
+
+        call.release.set()
+        other.release.set()
+        results = await asyncio.gather(*waiters)
+        assert call.calls == 1 and other.calls == 1
+        assert all(result is results[0] for result in results[:5]) and results[5] == {"_id": 2}
+        assert Metrics.get("singleflight.test.coalesce.coalesced") == coalesced + 4
+        assert group.in_flight() == 0
+
+    asyncio.run(scenario())
+
+
+def test_finished_calls_are_not_cached():
+    async def scenario():
+        group = SingleFlight("test.uncached")
+        call = SlowCall(result=1)
+        call.release.set()
+        assert await group.do("key", call) == 1
+        assert await group.do("key", call) == 1
+        assert call.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_exceptions_reach_every_caller():
+    async def scenario():
+        group = SingleFlight("test.errors")
+        call = SlowCall(error=LookupError("missing"))
+        waiters = [asyncio.create_task(group.do("key", call)) for _ in range(3)]
+        await asyncio.sleep(0)
+        call.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert call.calls == 1
+        assert all(isinstance(result, LookupError) for result in results)
+        assert results[0] is results[1]
+
+        # The failure is not remembered
+        retry = SlowCall(result="found")
+        retry.release.set()
+        assert await group.do("key", retry) == "found"
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def scenario():
+        group = SingleFlight("test.cancel")
+        call = SlowCall(result="done")
+        first = asyncio.create_task(group.do("key", call))
+        second = asyncio.create_task(group.do("key", call))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        call.release.set()
+        assert await second == "done"
+        assert call.calls == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,42 @@
+"""Typeahead suggestion index: prefix matching, ranking and catalog syncs"""
+from datetime import datetime, timedelta
+import pytest
+from backend.utils.suggest import CourseSuggestIndex, MAX_INCREMENTAL_SYNC_CHANGES, word_start_keys
+
+
+def _course(number: int, title: str, instructor: str = "Ada Lovelace", updated_at: datetime = datetime(2026, 1, 1)) -> dict:
+    return {"_id": f"course-{number}", "title": title, "instructor": instructor, "updatedAt": updated_at}
+
+
+def _state(index: CourseSuggestIndex):
+    return index.entries, index.course_keys, index.top
+
+
+def test_word_start_keys_are_normalized():
+    assert word_start_keys("Modern Web-Development!") == ["modern web development", "web development", "development"]
+
+
+def test_suggestions_are_ranked_by_popularity():
+    courses = [_course(1, "Python Basics"), _course(2, "Python Web Apps"), _course(3, "Data Science", "Guido Python")]
+    index = CourseSuggestIndex(courses, {"course-1": 3, "course-2": 7})
+    assert index.suggest("pyth") == [("course-2", "title"), ("course-1", "title"), ("course-3", "instructor")]
+    assert index.suggest("web ap") == [("course-2", "title")]
+    index.increment_popularity("course-3", 10)
+    assert index.suggest("py", limit=1) == [("course-3", "instructor")]
+
+
+@pytest.mark.parametrize("changes", [3, MAX_INCREMENTAL_SYNC_CHANGES + 10], ids=["incremental", "rebuild"])
+def test_sync_matches_a_fresh_index(changes):
+    courses = [_course(number, f"Course {number} Topic") for number in range(100)]
+    popularity = {f"course-{number}": number % 7 for number in range(100)}
+    index = CourseSuggestIndex(courses, popularity)
+
+    later = datetime(2026, 2, 1)
+    updated = courses[changes:] + [_course(number, f"Renamed {number}", updated_at=later) for number in range(changes // 2)]
+    updated += [_course(1000 + number, f"New {number}") for number in range(changes - changes // 2)]
+    assert index.sync(updated, "v2") == changes + changes - changes // 2
+    assert index.version == "v2"
+
+    assert _state(index) == _state(CourseSuggestIndex(updated, popularity))
+    assert index.suggest("renamed 0") == [("course-0", "title")]
+    assert index.suggest(f"course {changes - 1} topic") == []
@@ -0,0 +1,206 @@
+"""
+Time-bucketed learning activity rollups
+
+Learning events (enrollments, module and course completions, points) are
+counted into hourly, daily and weekly buckets, per course and platform-wide.
+A chart then reads one small document per bucket: a year of daily activity
+is 365 documents however many events it holds.
+
+Routes only add to in-process counters; a background task flushes them
+every ``ACTIVITY_ROLLUP_FLUSH_SECONDS`` as one unordered bulk ``$inc``, so
+recording activity costs no database round trip on the request path. Events
+buffered when a worker crashes are lost, which dashboards tolerate.
+
+Distinct active learners cannot be summed across workers or flushes, so
+each (bucket, learner) pair is first inserted as a marker document with a
+unique ID; only learners whose marker is new add to ``activeLearners``.
+Markers expire one day after their bucket ends.
+"""
+from bson import ObjectId
+from datetime import datetime, timedelta
+from ..config import settings
+from ..repositories import get_activity_rollups_repository
+from .metrics import Metrics
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("hour", "day", "week")
+
+# Counters kept in every bucket
+ACTIVITY_COUNTS = ("enrollments", "moduleCompletions", "courseCompletions", "points", "activeLearners")
+
+# Platform-wide scope in bucket IDs
+PLATFORM_SCOPE = "all"
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    """
+    Get the start of the bucket containing a timestamp
+
+    Args:
+        timestamp: Naive UTC timestamp
+        granularity: "hour", "day" or "week" (weeks start on Monday)
+
+    Returns:
+        Bucket start
+    """
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    day = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return day
+    return day - timedelta(days=day.weekday())
+
+
+def bucket_length(granularity: str) -> timedelta:
+    """Get the duration of a bucket"""
+    return {"hour": timedelta(hours=1), "day": timedelta(days=1), "week": timedelta(weeks=1)}[granularity]
+
+
+def bucket_id(granularity: str, course_id: ObjectId | None, start: datetime) -> str:
+    """Get the document ID of a bucket ("day:<course ID or all>:2024-05-01T00")"""
+    scope = str(course_id) if course_id is not None else PLATFORM_SCOPE
+    return f"{granularity}:{scope}:{start:%Y-%m-%dT%H}"
+
+
+class ActivityRollups:
+    """Per-process buffer of activity counts, flushed to bucket documents in the background"""
+
+    # Bucket ID -> {"granularity", "courseId", "start", "counts"}
+    pending: dict[str, dict] = {}
+    # Bucket ID -> learner IDs seen since the last flush
+    pending_learners: dict[str, set[str]] = {}
+    _task: asyncio.Task | None = None
+    _flush_lock: asyncio.Lock | None = None
+
+    @classmethod
+    def record(cls, user_id: ObjectId, course_id: ObjectId, timestamp: datetime | None = None, **counts: int):
+        """
+        Count a learning event in every bucket it belongs to
+
+        Args:
+            user_id: Learner ID (counted once per bucket as an active learner)
+            course_id: Course ID
+            timestamp: Event time (now if None)
+            **counts: Amounts to add, e.g. moduleCompletions=1, points=10
+        """
+        timestamp = timestamp or datetime.utcnow()
+        for granularity in GRANULARITIES:
+            start = bucket_start(timestamp, granularity)
+            for scope in (course_id, None):
+                key = bucket_id(granularity, scope, start)
+                bucket = cls.pending.get(key)
+                if bucket is None:
+                    bucket = {"granularity": granularity, "courseId": scope, "start": start, "counts": {}}
+                    cls.pending[key] = bucket
+                for name, value in counts.items():
+                    if value:
+                        bucket["counts"][name] = bucket["counts"].get(name, 0) + value
+                cls.pending_learners.setdefault(key, set()).add(str(user_id))
+        Metrics.increment("activity.events")
+
+    @classmethod
+    async def flush(cls):
+        """Write the buffered counts to the bucket documents"""
+        if cls._flush_lock is None:
+            cls._flush_lock = asyncio.Lock()
+        async with cls._flush_lock:
+            if not cls.pending:
+                return
+            pending, pending_learners = cls.pending, cls.pending_learners
+            cls.pending, cls.pending_learners = {}, {}
+
+            repository = get_activity_rollups_repository()
+            try:
+                markers = [
+                    {
+                        "_id": f"{key}:{user_id}",
+                        "expiresAt": pending[key]["start"] + bucket_length(pending[key]["granularity"]) + timedelta(days=1)
+                    }
+                    for key, user_ids in pending_learners.items()
+                    for user_id in user_ids
+                ]
+                new_markers = await repository.insert_learner_markers(markers)
+                for marker_id in new_markers:
+                    key = marker_id.rsplit(":", 1)[0]
+                    counts = pending[key]["counts"]
+                    counts["activeLearners"] = counts.get("activeLearners", 0) + 1
+                pending_learners = {}
+
+                await repository.increment_buckets([
+                    {"_id": key, **bucket} for key, bucket in pending.items() if bucket["counts"]
+                ])
+            except Exception:
+                # Retry with the next flush; learners already marked are not re-counted
+                cls._restore(pending, pending_learners)
+                Metrics.increment("activity.flush_failed")
+                raise
+            Metrics.increment("activity.buckets_flushed", len(pending))
+
+    @classmethod
+    def _restore(cls, pending: dict[str, dict], pending_learners: dict[str, set[str]]):
+        for key, bucket in pending.items():
+            current = cls.pending.setdefault(key, {**bucket, "counts": {}})
+            for name, value in bucket["counts"].items():
+                current["counts"][name] = current["counts"].get(name, 0) + value
+        for key, user_ids in pending_learners.items():
+            cls.pending_learners.setdefault(key, set()).update(user_ids)
+
+    @classmethod
+    async def get_series(cls, granularity: str, course_id: ObjectId | None, start: datetime, end: datetime) -> list[dict]:
+        """
+        Get the activity of a scope over a time range, one entry per bucket
+
+        Args:
+            granularity: "hour", "day" or "week"
+            course_id: Course ID, or None for the whole platform
+            start: Range start (rounded down to its bucket)
+            end: Range end (exclusive)
+
+        Returns:
+            {"start": datetime, **counts} per bucket in order, zero-filled
+            for buckets without activity
+        """
+        first = bucket_start(start, granularity)
+        buckets = await get_activity_rollups_repository().find_buckets(granularity, course_id, first, end)
+        counts_by_start = {bucket["start"]: bucket["counts"] for bucket in buckets}
+
+        series = []
+        step = bucket_length(granularity)
+        current = first
+        while current < end:
+            counts = counts_by_start.get(current, {})
+            series.append({"start": current, **{name: counts.get(name, 0) for name in ACTIVITY_COUNTS}})
+            current += step
+        return series
+
+    @classmethod
+    async def _flush_loop(cls, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await cls.flush()
+            except Exception as e:
+                logger.warning("Failed to flush activity rollups: %s", e)
+
+    @classmethod
+    def start(cls):
+        """Flush buffered activity in the background (application startup)"""
+        cls._task = asyncio.create_task(cls._flush_loop(settings.activity_rollup_flush_seconds))
+
+    @classmethod
+    async def stop(cls):
+        """Stop the background flush and write what is still buffered (application shutdown)"""
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+        try:
+            await cls.flush()
+        except Exception as e:
+            logger.warning("Failed to flush activity rollups on shutdown: %s", e)
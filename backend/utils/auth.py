@@ -5,32 +5,84 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from ..config import settings
+import asyncio
 import re
+import uuid
 
-# Password hashing context with minimum 10 salt rounds
-pwd_context = CryptContext(
-    schemes=["bcrypt"], 
-    deprecated="auto",
-    bcrypt__rounds=12  # Use 12 rounds for good security (>= 10 requirement)
-)
+# bcrypt cost never goes below 10 rounds, whatever the calibration says
+MIN_BCRYPT_ROUNDS = 10
 
+PASSWORD_HASH_SCHEMES = ("bcrypt", "argon2")
 
-def hash_password(password: str) -> str:
+
+def build_password_context(
+    scheme: str = "bcrypt",
+    bcrypt_rounds: int = 12,
+    argon2_memory_cost: int = 65536,
+    argon2_time_cost: int = 3,
+    argon2_parallelism: int = 1
+) -> CryptContext:
     """
-    Hash a password using bcrypt
+    Build the password hashing context
+    
+    Hashes made with another scheme, or with a lower bcrypt cost / different
+    argon2 parameters than configured, are reported by ``needs_update`` and
+    rehashed on the next successful login.
     
     Args:
-        password: Plain text password
+        scheme: Scheme for new hashes ("bcrypt" or "argon2"; argon2 needs argon2-cffi)
+        bcrypt_rounds: bcrypt cost factor (log2 of iterations)
+        argon2_memory_cost: argon2 memory in KiB
+        argon2_time_cost: argon2 iterations
+        argon2_parallelism: argon2 lanes
         
     Returns:
-        Hashed password
+        Configured CryptContext
     """
-    # Ensure password is bytes and truncate to 72 bytes if necessary (bcrypt limit)
+    if scheme not in PASSWORD_HASH_SCHEMES:
+        raise ValueError(f"Unknown password hash scheme '{scheme}', expected one of {PASSWORD_HASH_SCHEMES}")
+    bcrypt_rounds = max(MIN_BCRYPT_ROUNDS, bcrypt_rounds)
+    return CryptContext(
+        schemes=[scheme] + [other for other in PASSWORD_HASH_SCHEMES if other != scheme],
+        default=scheme,
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__rounds=argon2_time_cost,
+        argon2__parallelism=argon2_parallelism
+    )
+
+
+# Password hashing context (cost calibrated per deployment, see backend.scripts.calibrate_hashing)
+pwd_context = build_password_context(
+    scheme=settings.password_hash_scheme,
+    bcrypt_rounds=settings.bcrypt_rounds,
+    argon2_memory_cost=settings.argon2_memory_cost,
+    argon2_time_cost=settings.argon2_time_cost,
+    argon2_parallelism=settings.argon2_parallelism
+)
+
+
+def _password_bytes(password: str) -> bytes:
+    """Encode a password, truncated to 72 bytes (bcrypt limit)"""
     password_bytes = password.encode('utf-8')
     if len(password_bytes) > 72:
         password_bytes = password_bytes[:72]
+    return password_bytes
+
+
+def hash_password(password: str) -> str:
+    """
+    Hash a password with the configured scheme
     
-    return pwd_context.hash(password_bytes)
+    Args:
+        password: Plain text password
+        
+    Returns:
+        Hashed password
+    """
+    return pwd_context.hash(_password_bytes(password))
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -44,12 +96,28 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         True if password matches, False otherwise
     """
-    # Ensure password is bytes and truncate to 72 bytes if necessary (bcrypt limit)
-    password_bytes = plain_password.encode('utf-8')
-    if len(password_bytes) > 72:
-        password_bytes = password_bytes[:72]
+    return pwd_context.verify(_password_bytes(plain_password), hashed_password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Verify a password and rehash it if its hash is outdated, off the event loop
     
-    return pwd_context.verify(password_bytes, hashed_password)
+    Both the verification and the optional rehash are CPU-bound, so they run
+    in a worker thread instead of blocking other requests.
+    
+    Args:
+        plain_password: Plain text password
+        hashed_password: Hashed password from database
+        
+    Returns:
+        Tuple of (password matches, new hash to store or None)
+    """
+    return await asyncio.to_thread(
+        pwd_context.verify_and_update,
+        _password_bytes(plain_password),
+        hashed_password
+    )
 
 
 def validate_email(email: str) -> bool:
@@ -85,19 +153,44 @@ def validate_password_strength(password: str) -> tuple[bool, str]:
     return True, ""
 
 
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+
+
+def build_token_claims(user: dict) -> dict:
+    """
+    Build the profile claims carried by an access token
+    
+    Routes using the claims-only dependency read the user from these claims
+    instead of the database, so they are at most one access token lifetime old.
+    
+    Args:
+        user: User document
+        
+    Returns:
+        Claims dict
+    """
+    return {
+        "user_id": str(user["_id"]),
+        "email": user["email"],
+        "fullName": user["fullName"],
+        "points": user.get("points", 0)
+    }
+
+
 def create_access_token(data: dict) -> str:
     """
-    Create a JWT access token
+    Create a short-lived JWT access token
     
     Args:
-        data: Payload data to encode in token
+        data: Payload data to encode in token (see build_token_claims)
         
     Returns:
         Encoded JWT token
     """
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "type": ACCESS_TOKEN_TYPE, "jti": uuid.uuid4().hex})
     
     encoded_jwt = jwt.encode(
         to_encode, 
@@ -107,12 +200,34 @@ def create_access_token(data: dict) -> str:
     return encoded_jwt
 
 
-def verify_token(token: str) -> dict | None:
+def create_refresh_token(user_id: str) -> str:
+    """
+    Create a long-lived JWT refresh token
+    
+    Refresh tokens only identify the user; they are exchanged at
+    ``/api/auth/refresh`` for a new access token with up-to-date claims.
+    
+    Args:
+        user_id: User ID
+        
+    Returns:
+        Encoded JWT token
+    """
+    expire = datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
+    return jwt.encode(
+        {"user_id": user_id, "exp": expire, "type": REFRESH_TOKEN_TYPE, "jti": uuid.uuid4().hex},
+        settings.jwt_secret_key,
+        algorithm=settings.jwt_algorithm
+    )
+
+
+def verify_token(token: str, token_type: str = ACCESS_TOKEN_TYPE) -> dict | None:
     """
     Verify and decode a JWT token
     
     Args:
         token: JWT token to verify
+        token_type: Expected token type ("access" or "refresh")
         
     Returns:
         Decoded token payload if valid, None if invalid
@@ -123,20 +238,25 @@ def verify_token(token: str) -> dict | None:
             settings.jwt_secret_key, 
             algorithms=[settings.jwt_algorithm]
         )
-        return payload
     except JWTError:
         return None
+    
+    # Tokens issued before token types existed are access tokens
+    if payload.get("type", ACCESS_TOKEN_TYPE) != token_type:
+        return None
+    return payload
 
 
 def get_user_from_token(token: str) -> dict | None:
     """
-    Extract user information from JWT token
+    Extract user information from JWT access token
     
     Args:
         token: JWT token
         
     Returns:
-        User info dict if token is valid, None otherwise
+        User info dict if token is valid, None otherwise; "fullName",
+        "points" and "jti" are None for tokens issued without those claims
     """
     payload = verify_token(token)
     if payload is None:
@@ -148,4 +268,11 @@ def get_user_from_token(token: str) -> dict | None:
     if user_id is None or email is None:
         return None
     
-    return {"user_id": user_id, "email": email}
\ No newline at end of file
+    return {
+        "user_id": user_id,
+        "email": email,
+        "fullName": payload.get("fullName"),
+        "points": payload.get("points"),
+        "jti": payload.get("jti"),
+        "expiresAt": datetime.utcfromtimestamp(payload["exp"]) if "exp" in payload else None
+    }
@@ -0,0 +1,476 @@
+"""
+In-process course catalog cache
+
+The catalog changes rarely (seeding, imports) but is read on almost every
+request, so each worker keeps the course documents in memory together with
+a catalog version. The version is a digest of the course IDs and their
+``updatedAt`` timestamps, which makes it identical across workers that
+loaded the same data; it doubles as the ETag of catalog payloads.
+
+Writers publish their changes by bumping the version document in
+``catalog_meta`` once they are complete (``CatalogCache.publish``). Workers
+check that document when their cache expires and only reload the courses
+when it moved, so they never pick up half of an import, and an import run
+from the command line reaches every worker.
+
+Derived artefacts (serialized and pre-compressed payloads, the course list
+template) are cached per version and dropped whenever the version changes.
+They are built in a thread, once per version however many requests ask for
+them meanwhile, so a large catalog does not stall the event loop.
+The search and suggestion indexes are instead updated incrementally to each
+new version; suggestion popularity (enrollment counts) is kept current by
+this worker's enrollments and refreshed from the database in the background.
+
+The cache is served stale rather than waited for: while one request reloads
+the catalog, concurrent ones get the previous version, and while the
+database is unreachable the last loaded catalog is kept (``stale`` is set)
+instead of failing.
+"""
+from ..config import settings
+from ..repositories import get_courses_repository, get_enrollments_repository
+from ..models.course import CatalogCourse, CatalogResponse, CourseOverlay
+from .compression import compress, SUPPORTED_ENCODINGS
+from .db import DATABASE_UNAVAILABLE_ERRORS
+from .metrics import Metrics
+from .search import CourseSearchIndex
+from .single_flight import SingleFlight
+from .suggest import CourseSuggestIndex
+import asyncio
+import hashlib
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Pre-compressed payloads are built once per catalog version, so spend CPU on ratio
+PRECOMPRESSION_LEVELS = {"gzip": 9, "br": 11}
+
+# Builds of derived artefacts, keyed by (artefact, catalog version)
+catalog_builds = SingleFlight("catalog.builds")
+
+
+def compute_catalog_version(courses: list[dict]) -> str:
+    """
+    Compute a stable version string for a set of course documents
+
+    Args:
+        courses: Course documents
+
+    Returns:
+        Short hexadecimal digest
+    """
+    digest = hashlib.sha1()
+    for course in sorted(courses, key=lambda course: str(course["_id"])):
+        updated_at = course.get("updatedAt")
+        digest.update(f"{course['_id']}:{updated_at.isoformat() if updated_at else ''};".encode())
+    return digest.hexdigest()[:16]
+
+
+def to_catalog_course(course: dict) -> CatalogCourse:
+    """
+    Convert a course document to its user-independent response model
+
+    Args:
+        course: Course document
+
+    Returns:
+        CatalogCourse model
+    """
+    return CatalogCourse(
+        id=str(course["_id"]),
+        title=course["title"],
+        description=course["description"],
+        instructor=course["instructor"],
+        duration=course["duration"],
+        lessonsCount=course["lessonsCount"],
+        level=course["level"],
+        syllabus=course["syllabus"],
+        objectives=course["objectives"],
+        thumbnail=course["thumbnail"]
+    )
+
+
+def serialize_overlay(overlay: CourseOverlay) -> bytes:
+    """
+    Serialize per-learner fields as the tail of a course JSON object
+
+    Args:
+        overlay: Per-learner course fields
+
+    Returns:
+        Bytes of the form ``,"isCompleted":...,"progress":...}``
+    """
+    return b"," + overlay.model_dump_json().encode()[1:]
+
+
+def serialize_catalog(version: str, courses: list[dict]) -> bytes:
+    """
+    Serialize the user-independent catalog response
+
+    Args:
+        version: Catalog version
+        courses: Course documents
+
+    Returns:
+        JSON response body
+    """
+    return CatalogResponse(
+        success=True,
+        version=version,
+        courses=[to_catalog_course(course) for course in courses]
+    ).model_dump_json().encode()
+
+
+DEFAULT_OVERLAY = serialize_overlay(CourseOverlay())
+
+
+class CourseListTemplate:
+    """
+    Pre-serialized ``GET /api/courses`` body for a learner without progress
+
+    Each course is serialized once per catalog version. Rendering for a
+    learner splices that learner's overlays over the default per-course
+    tail, so the Python-level work is proportional to the number of courses
+    the learner has progress in, not to the catalog size.
+    """
+
+    PREFIX = b'{"success":true,"stale":false,"courses":['
+    STALE_PREFIX = b'{"success":true,"stale":true,"courses":['
+
+    def __init__(self, courses: list[dict]):
+        prefix = self.PREFIX
+        parts = [prefix]
+        position = len(prefix)
+        self.fragments: dict[str, bytes] = {}
+        self.spans: dict[str, tuple[int, int]] = {}
+        self.module_counts: dict[str, int] = {}
+        for index, course in enumerate(courses):
+            if index:
+                parts.append(b",")
+                position += 1
+            course_id = str(course["_id"])
+            # Static fields without the closing brace; overlays provide it
+            fragment = to_catalog_course(course).model_dump_json().encode()[:-1]
+            entry = fragment + DEFAULT_OVERLAY
+            self.fragments[course_id] = fragment
+            self.spans[course_id] = (position, position + len(entry))
+            self.module_counts[course_id] = len(course.get("syllabus", []))
+            parts.append(entry)
+            position += len(entry)
+        parts.append(b"]}")
+        self.body = b"".join(parts)
+        self.count = len(courses)
+
+    def render(self, overlays: dict[str, bytes], stale: bool = False) -> bytes:
+        """
+        Render the course list for one learner
+
+        Args:
+            overlays: Serialized overlays (see serialize_overlay) by course ID;
+                courses not in the catalog are ignored
+            stale: Flag the list as served from the last known catalog
+
+        Returns:
+            JSON response body
+        """
+        if not overlays and not stale:
+            return self.body
+        view = memoryview(self.body)
+        chunks = [self.STALE_PREFIX if stale else self.PREFIX]
+        cursor = len(self.PREFIX)
+        for course_id in sorted((course_id for course_id in overlays if course_id in self.spans), key=lambda course_id: self.spans[course_id][0]):
+            start, end = self.spans[course_id]
+            chunks.append(view[cursor:start])
+            chunks.append(self.fragments[course_id])
+            chunks.append(overlays[course_id])
+            cursor = end
+        chunks.append(view[cursor:])
+        return b"".join(chunks)
+
+
+class CatalogCache:
+    """Per-process cache of the course catalog and its derived payloads"""
+
+    courses: list[dict] | None = None
+    courses_by_id: dict[str, dict] = {}
+    version: str | None = None
+    # catalog_meta version the courses were loaded at
+    published_version: int | None = None
+    loaded_at: float = 0.0
+    # Set while the last reload failed because the database was unreachable
+    stale: bool = False
+    payloads: dict[str, bytes] = {}
+    course_list_template: CourseListTemplate | None = None
+    search_index: CourseSearchIndex | None = None
+    suggest_index: CourseSuggestIndex | None = None
+    _lock: asyncio.Lock | None = None
+    _refresh_task: asyncio.Task | None = None
+
+    @classmethod
+    def _is_fresh(cls) -> bool:
+        return cls.courses is not None and time.monotonic() - cls.loaded_at < settings.catalog_cache_ttl_seconds
+
+    @classmethod
+    async def load(cls, force: bool = False):
+        """
+        Load the catalog from the repository if the cache is stale
+
+        An expired cache costs one round trip for the published version; the
+        courses are only reloaded when it changed.
+
+        Args:
+            force: Reload even if the cache is fresh and the version unchanged
+        """
+        if not force and cls._is_fresh():
+            return
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+        if not force and cls.courses is not None and cls._lock.locked():
+            # Another request is reloading: serve the previous version meanwhile
+            return
+        async with cls._lock:
+            if not force and cls._is_fresh():
+                return
+            courses_repository = get_courses_repository()
+            try:
+                # Read before the courses: a publish in between causes another reload, not a missed one
+                published_version = await courses_repository.get_catalog_version()
+                if not force and cls.courses is not None and published_version == cls.published_version:
+                    courses = None
+                else:
+                    courses = await courses_repository.find_all()
+            except DATABASE_UNAVAILABLE_ERRORS as e:
+                if cls.courses is None:
+                    raise
+                if not cls.stale:
+                    logger.warning("Serving stale catalog version %s, database unreachable: %s", cls.version, e)
+                    cls.stale = True
+                Metrics.increment("catalog.stale_reloads")
+                return
+            if cls.stale:
+                logger.info("Database reachable again, catalog reloaded")
+                cls.stale = False
+            if courses is None:
+                cls.loaded_at = time.monotonic()
+                return
+            version = compute_catalog_version(courses)
+            if version != cls.version:
+                cls.payloads = {}
+                cls.course_list_template = None
+                logger.info("Catalog version %s loaded (%s courses)", version, len(courses))
+            cls.courses = courses
+            cls.courses_by_id = {str(course["_id"]): course for course in courses}
+            cls.version = version
+            cls.published_version = published_version
+            cls.loaded_at = time.monotonic()
+
+    @classmethod
+    async def warm(cls):
+        """
+        Build the catalog caches ahead of the first request
+
+        Loads the catalog and pre-builds the course list template and every
+        catalog payload encoding, so the first learners do not pay for them.
+        """
+        await cls.load(force=True)
+        await cls.get_course_list_template()
+        await cls.get_search_index()
+        await cls.get_suggest_index()
+        for encoding in ("identity",) + SUPPORTED_ENCODINGS:
+            await cls.get_payload(encoding)
+        logger.info("Catalog caches warmed for version %s", cls.version)
+
+    @classmethod
+    def get_cached_course(cls, course_id: str) -> dict | None:
+        """
+        Get a course document from the last loaded catalog, without reloading
+
+        Args:
+            course_id: Course ID
+
+        Returns:
+            Course document (do not mutate), or None if unknown
+        """
+        return cls.courses_by_id.get(course_id)
+
+    @classmethod
+    def invalidate(cls):
+        """Force the next access of this worker to check the published version"""
+        cls.loaded_at = 0.0
+
+    @classmethod
+    async def publish(cls) -> int:
+        """
+        Make completed catalog writes visible to every worker
+
+        Call once after the last write of a change (seeding, an import), from
+        the application or a script.
+
+        Returns:
+            New published version
+        """
+        published_version = await get_courses_repository().bump_catalog_version()
+        cls.invalidate()
+        logger.info("Catalog version %s published", published_version)
+        return published_version
+
+    @classmethod
+    async def get_courses(cls) -> list[dict]:
+        """
+        Get every course document
+
+        Returns:
+            Cached course documents (do not mutate)
+        """
+        await cls.load()
+        return cls.courses
+
+    @classmethod
+    async def get_version(cls) -> str:
+        """Get the current catalog version"""
+        await cls.load()
+        return cls.version
+
+    @classmethod
+    async def get_course_list_template(cls) -> CourseListTemplate:
+        """
+        Get the pre-serialized course list for the current catalog version
+
+        Returns:
+            CourseListTemplate built once per version
+        """
+        await cls.load()
+        template = cls.course_list_template
+        if template is None:
+            version, courses = cls.version, cls.courses
+            template = await catalog_builds.do(("template", version), lambda: asyncio.to_thread(CourseListTemplate, courses))
+            if cls.version == version:
+                cls.course_list_template = template
+        return template
+
+    @classmethod
+    async def get_search_index(cls) -> CourseSearchIndex:
+        """
+        Get the full-text search index for the current catalog version
+
+        Built on first use, then re-indexes only the courses that changed
+        when the catalog version moves on.
+
+        Returns:
+            CourseSearchIndex
+        """
+        await cls.load()
+        index = cls.search_index
+        if index is None:
+            index = CourseSearchIndex()
+            cls.search_index = index
+        if index.version != cls.version:
+            changed = index.sync(cls.courses, cls.version)
+            logger.info("Search index synced to catalog version %s (%s course(s) re-indexed)", cls.version, changed)
+        return index
+
+    @classmethod
+    async def _load_popularity(cls) -> dict[str, int]:
+        counts = await get_enrollments_repository().count_by_course()
+        return {str(course_id): count for course_id, count in counts.items()}
+
+    @classmethod
+    async def get_suggest_index(cls) -> CourseSuggestIndex:
+        """
+        Get the typeahead index for the current catalog version
+
+        Built on first use with the enrollment count of every course, then
+        updated incrementally like the search index.
+
+        Returns:
+            CourseSuggestIndex
+        """
+        await cls.load()
+        index = cls.suggest_index
+        if index is None:
+            index = CourseSuggestIndex(cls.courses, await cls._load_popularity())
+            index.version = cls.version
+            cls.suggest_index = index
+        elif index.version != cls.version:
+            changed = index.sync(cls.courses, cls.version)
+            logger.info("Suggestion index synced to catalog version %s (%s course(s) re-indexed)", cls.version, changed)
+        return index
+
+    @classmethod
+    def record_enrollment(cls, course_id: str):
+        """
+        Count a new enrollment towards a course's suggestion ranking
+
+        Args:
+            course_id: Course ID
+        """
+        if cls.suggest_index is not None:
+            cls.suggest_index.increment_popularity(course_id)
+
+    @classmethod
+    async def refresh_popularity(cls):
+        """Catch up with enrollments recorded by other workers"""
+        if cls.suggest_index is None:
+            return
+        grown = cls.suggest_index.merge_popularity(await cls._load_popularity())
+        logger.debug("Suggestion popularity refreshed (%s course(s) changed)", grown)
+
+    @classmethod
+    async def _refresh_loop(cls, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await cls.refresh_popularity()
+            except Exception as e:
+                logger.warning("Failed to refresh suggestion popularity: %s", e)
+
+    @classmethod
+    def start(cls):
+        """Start refreshing derived data in the background (application startup)"""
+        cls._refresh_task = asyncio.create_task(cls._refresh_loop(settings.suggest_popularity_refresh_seconds))
+
+    @classmethod
+    async def stop(cls):
+        """Stop the background refresh (application shutdown)"""
+        if cls._refresh_task is not None:
+            cls._refresh_task.cancel()
+            try:
+                await cls._refresh_task
+            except asyncio.CancelledError:
+                pass
+            cls._refresh_task = None
+
+    @classmethod
+    async def get_payload(cls, encoding: str = "identity") -> tuple[str, bytes]:
+        """
+        Get the serialized catalog response, pre-compressed for an encoding
+
+        Serialization and compression happen once per catalog version and
+        encoding, in a thread; later calls return the cached bytes.
+
+        Args:
+            encoding: "identity", "gzip" or "br"
+
+        Returns:
+            Tuple of (catalog version, payload bytes)
+        """
+        await cls.load()
+        version, courses = cls.version, cls.courses
+        payload = cls.payloads.get(encoding)
+        if payload is None:
+            payload = await catalog_builds.do((encoding, version), lambda: cls._build_payload(version, courses, encoding))
+        return version, payload
+
+    @classmethod
+    async def _build_payload(cls, version: str, courses: list[dict], encoding: str) -> bytes:
+        if encoding == "identity":
+            payload = await asyncio.to_thread(serialize_catalog, version, courses)
+        else:
+            identity = cls.payloads.get("identity") if cls.version == version else None
+            if identity is None:
+                identity = await catalog_builds.do(("identity", version), lambda: cls._build_payload(version, courses, "identity"))
+            payload = await asyncio.to_thread(compress, identity, encoding, PRECOMPRESSION_LEVELS[encoding])
+        # Not cached if the catalog moved on meanwhile (the payloads of the new version replaced these)
+        if cls.version == version:
+            cls.payloads[encoding] = payload
+        return payload
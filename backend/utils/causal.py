@@ -0,0 +1,78 @@
+"""
+Causal consistency tokens carried by the client
+
+A user's requests are spread over several workers, and each worker only
+remembers the cluster and operation times of the sessions it ran itself
+(``CausalTokens``). So that a read on worker B sees a write made through
+worker A, every response of a request that ran a user session carries the
+session's times in the ``X-Causal-Token`` header; the client sends the
+latest token back with its next requests and the session reading the
+progress starts from it.
+
+Tokens are BSON, signed with an HMAC of the JWT secret so clients cannot
+feed arbitrary cluster times to MongoDB, and bound to the user they were
+issued for.
+"""
+from contextvars import ContextVar
+from ..config import settings
+import base64
+import bson
+import hashlib
+import hmac
+
+CAUSAL_TOKEN_HEADER = "X-Causal-Token"
+
+# Longer headers are ignored
+MAX_CAUSAL_TOKEN_LENGTH = 1024
+
+_SIGNATURE_BYTES = 16
+
+# Causal token of the current request:
+# {"incoming": (user ID, cluster time, operation time) | None, "outgoing": str | None}
+current_causal_token: ContextVar[dict | None] = ContextVar("causal_token", default=None)
+
+
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(settings.jwt_secret_key.encode(), payload, hashlib.sha256).digest()[:_SIGNATURE_BYTES]
+
+
+def encode_causal_token(user_id, cluster_time: dict, operation_time) -> str:
+    """
+    Build the token of a user's latest session times
+
+    Args:
+        user_id: User the session ran for
+        cluster_time: Session cluster time ($clusterTime document)
+        operation_time: Session operation time (BSON Timestamp)
+
+    Returns:
+        URL-safe token
+    """
+    payload = bson.encode({"u": str(user_id), "c": cluster_time, "o": operation_time})
+    return base64.urlsafe_b64encode(payload + _sign(payload)).decode().rstrip("=")
+
+
+def decode_causal_token(token: str) -> tuple[str, dict, object] | None:
+    """
+    Verify and read a token sent back by a client
+
+    Args:
+        token: Token from the X-Causal-Token header
+
+    Returns:
+        (user ID, cluster time, operation time), or None if the token is invalid
+    """
+    if len(token) > MAX_CAUSAL_TOKEN_LENGTH:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (ValueError, TypeError):
+        return None
+    payload, signature = raw[:-_SIGNATURE_BYTES], raw[-_SIGNATURE_BYTES:]
+    if not payload or not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    try:
+        doc = bson.decode(payload)
+        return doc["u"], doc["c"], doc["o"]
+    except (bson.errors.BSONError, KeyError):
+        return None
@@ -0,0 +1,93 @@
+"""
+Circuit breaker for a remote dependency
+
+While a dependency is down, every call waits for its timeout before failing,
+so requests pile up behind it. A breaker counts consecutive failures and,
+past a threshold, opens: calls are refused immediately. After
+``reset_seconds`` it lets one trial call through (half-open); the first
+success closes it again, a failure re-opens it for another period.
+
+Outcomes are reported by whoever observes them (command and topology
+listeners for MongoDB), possibly from other threads.
+"""
+from .metrics import Metrics
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker with a consecutive-failure threshold"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 10.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self._opened_at: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Current state (open turns half-open once ``reset_seconds`` have passed)"""
+        opened_at = self._opened_at
+        if opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - opened_at >= self.reset_seconds:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may go through
+
+        Returns:
+            True when closed, or for the one trial call of a half-open period
+        """
+        if self._opened_at is None:
+            return True
+        with self._lock:
+            state = self.state
+            if state == self.OPEN:
+                Metrics.increment(f"{self.name}.circuit.rejected")
+                return False
+            if state == self.HALF_OPEN:
+                # Further calls wait for the trial's outcome (or the next period)
+                self._opened_at = time.monotonic()
+            return True
+
+    def record_success(self):
+        """Report a successful call, closing the breaker"""
+        if self._opened_at is None and not self.failures:
+            return
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Circuit %s closed", self.name)
+                Metrics.set_gauge(f"{self.name}.circuit.open", 0)
+            self._opened_at = None
+            self.failures = 0
+
+    def record_failure(self):
+        """Report a failed call, opening the breaker past the threshold or after a failed trial"""
+        with self._lock:
+            self.failures += 1
+            if self._opened_at is not None or self.failures >= self.failure_threshold:
+                self._open(f"{self.failures} consecutive failures")
+
+    def trip(self, reason: str):
+        """Open the breaker immediately (e.g. the dependency is known to be unreachable)"""
+        with self._lock:
+            self._open(reason)
+
+    def _open(self, reason: str):
+        if self._opened_at is None:
+            logger.warning("Circuit %s opened: %s", self.name, reason)
+            Metrics.increment(f"{self.name}.circuit.opened")
+            Metrics.set_gauge(f"{self.name}.circuit.open", 1)
+        self._opened_at = time.monotonic()
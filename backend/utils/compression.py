@@ -0,0 +1,110 @@
+"""
+HTTP response compression helpers (content negotiation, gzip and brotli)
+
+Brotli is optional: install the ``brotli`` package (``pip install
+.[compression]``) to enable it, otherwise only gzip is offered.
+"""
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+BROTLI_AVAILABLE = brotli is not None
+
+# Preferred order when the client accepts several encodings equally
+SUPPORTED_ENCODINGS = ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+
+
+def parse_accept_encoding(header: str | None) -> dict[str, float]:
+    """
+    Parse an Accept-Encoding header into encoding -> quality
+
+    Args:
+        header: Raw Accept-Encoding header value
+
+    Returns:
+        Mapping of lower-cased encodings to their q-values
+    """
+    accepted = {}
+    if not header:
+        return accepted
+    for part in header.split(","):
+        fields = part.strip().split(";")
+        encoding = fields[0].strip().lower()
+        if not encoding:
+            continue
+        quality = 1.0
+        for param in fields[1:]:
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[encoding] = quality
+    return accepted
+
+
+def choose_encoding(header: str | None) -> str:
+    """
+    Pick the best supported content encoding for a request
+
+    Args:
+        header: Raw Accept-Encoding header value
+
+    Returns:
+        "br", "gzip" or "identity"
+    """
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = "identity", 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data: bytes, encoding: str, level: int | None = None) -> bytes:
+    """
+    Compress a complete payload
+
+    Args:
+        data: Bytes to compress
+        encoding: "br", "gzip" or "identity"
+        level: gzip level (1-9) or brotli quality (0-11); None for a fast default
+
+    Returns:
+        Encoded bytes
+    """
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6 if level is None else level)
+    if encoding == "br":
+        return brotli.compress(data, quality=4 if level is None else level)
+    return data
+
+
+class StreamCompressor:
+    """Incremental compressor for streamed responses"""
+
+    def __init__(self, encoding: str, level: int | None = None):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        else:
+            self._compressor = brotli.Compressor(quality=4 if level is None else level)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it so the client can decode it right away"""
+        if self.encoding == "gzip":
+            return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        """Terminate the compressed stream"""
+        if self.encoding == "gzip":
+            return self._compressor.flush(zlib.Z_FINISH)
+        return self._compressor.finish()
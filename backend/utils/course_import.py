@@ -0,0 +1,200 @@
+"""
+Bulk course import from NDJSON
+
+Each line is one course shaped like the ``Course`` model, without
+``createdAt`` / ``updatedAt``. A line with an ``id`` (or ``_id``) updates or
+creates that course; other lines are matched on title and instructor.
+
+Lines are validated a batch at a time in a worker thread, and every valid
+course of a batch is written with one unordered bulk upsert, so a bad row
+neither stops the import nor costs a round trip of its own. Failures are
+reported per line.
+
+Every imported course gets the same ``updatedAt``, and the catalog is
+published once after the last batch: workers reload it once per import, never
+in the middle of one, and rebuild the derived caches and indexes once, not
+per course. Every worker, including when the import runs from the command
+line, picks the new version up within ``CATALOG_CACHE_TTL_SECONDS``.
+"""
+from collections.abc import AsyncIterator
+from bson import ObjectId
+from datetime import datetime
+from pydantic import ValidationError
+from ..models.course import Course
+from ..repositories import get_courses_repository
+from .catalog import CatalogCache
+from .metrics import Metrics
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Lines validated and upserted together
+COURSE_IMPORT_BATCH_SIZE = 1000
+
+# Per-line errors kept in the report (the failure count is always exact)
+MAX_REPORTED_IMPORT_ERRORS = 1000
+
+# Lines accepted by one import request (the command-line import has no limit)
+MAX_IMPORT_ROWS_PER_REQUEST = 50000
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Split a byte stream into lines without holding more than one line
+
+    Args:
+        chunks: Raw body chunks
+
+    Yields:
+        Decoded lines, without their line terminator
+    """
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r").decode("utf-8", errors="replace")
+    if pending:
+        yield pending.rstrip(b"\r").decode("utf-8", errors="replace")
+
+
+def format_validation_error(error: ValidationError) -> str:
+    """Summarize a pydantic validation error on one line"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'course'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def validate_course_line(line: str, imported_at: datetime) -> tuple[dict, dict]:
+    """
+    Parse and validate one course line
+
+    Args:
+        line: JSON object
+        imported_at: updatedAt of every course of the import
+
+    Returns:
+        (filter, fields) of the course upsert
+
+    Raises:
+        ValueError: If the line is not a valid course
+    """
+    try:
+        row = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e.msg}")
+    if not isinstance(row, dict):
+        raise ValueError("Expected a JSON object")
+
+    course_id = row.pop("id", None)
+    legacy_id = row.pop("_id", None)
+    course_id = course_id if course_id is not None else legacy_id
+    if course_id is not None and not ObjectId.is_valid(course_id):
+        raise ValueError("id: Invalid ObjectId")
+
+    try:
+        course = Course.model_validate({**row, "createdAt": imported_at, "updatedAt": imported_at})
+    except ValidationError as e:
+        raise ValueError(format_validation_error(e))
+
+    fields = course.model_dump(exclude={"id", "createdAt"})
+    fields["level"] = course.level.value
+    query = {"_id": ObjectId(course_id)} if course_id is not None else {"title": course.title, "instructor": course.instructor}
+    return query, fields
+
+
+def _course_key(query: dict) -> tuple:
+    return ("_id", query["_id"]) if "_id" in query else ("title", query["title"], query["instructor"])
+
+
+class CourseImport:
+    """State and report of one course import"""
+
+    def __init__(self, max_rows: int | None = None, batch_size: int = COURSE_IMPORT_BATCH_SIZE):
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.imported_at = datetime.utcnow()
+        self.received = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: list[dict] = []
+        self.truncated = False
+        # Line of the first occurrence of each course, to reject duplicates
+        self.seen: dict[tuple, int] = {}
+
+    def _fail(self, line_number: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_IMPORT_ERRORS:
+            self.errors.append({"line": line_number, "error": message})
+
+    def _validate_batch(self, batch: list[tuple[int, str]]) -> list[tuple[int, dict, dict]]:
+        valid = []
+        for line_number, line in batch:
+            try:
+                query, fields = validate_course_line(line, self.imported_at)
+            except ValueError as e:
+                self._fail(line_number, str(e))
+                continue
+            key = _course_key(query)
+            if key in self.seen:
+                self._fail(line_number, f"Duplicate of line {self.seen[key]}")
+                continue
+            self.seen[key] = line_number
+            valid.append((line_number, query, fields))
+        return valid
+
+    async def _write_batch(self, batch: list[tuple[int, str]]):
+        valid = await asyncio.to_thread(self._validate_batch, batch)
+        if not valid:
+            return
+        inserted, updated, errors = await get_courses_repository().bulk_upsert(
+            [(query, fields) for _, query, fields in valid]
+        )
+        self.inserted += inserted
+        self.updated += updated
+        for index, message in sorted(errors.items()):
+            self._fail(valid[index][0], message)
+
+    async def run(self, lines: AsyncIterator[str]) -> "CourseImport":
+        """
+        Import every course line
+
+        Args:
+            lines: NDJSON lines (blank lines are skipped)
+
+        Returns:
+            This import, with its report filled in
+        """
+        batch: list[tuple[int, str]] = []
+        line_number = 0
+        try:
+            async for line in lines:
+                line_number += 1
+                if not line.strip():
+                    continue
+                if self.max_rows is not None and self.received >= self.max_rows:
+                    self.truncated = True
+                    break
+                self.received += 1
+                batch.append((line_number, line))
+                if len(batch) >= self.batch_size:
+                    await self._write_batch(batch)
+                    batch = []
+            if batch:
+                await self._write_batch(batch)
+        finally:
+            # One catalog version change per import, even if it failed midway
+            if self.inserted or self.updated:
+                await CatalogCache.publish()
+
+        Metrics.increment("courses.imported", self.inserted + self.updated)
+        Metrics.increment("courses.import_failed", self.failed)
+        logger.info(
+            "Imported %d course line(s): %d inserted, %d updated, %d failed",
+            self.received, self.inserted, self.updated, self.failed,
+        )
+        return self
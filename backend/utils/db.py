@@ -2,35 +2,187 @@
 MongoDB database connection utility
 """
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import ConnectionFailure
+from pymongo import monitoring
+from pymongo.errors import AutoReconnect, ConnectionFailure, DuplicateKeyError, NetworkTimeout, NotPrimaryError
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime
 from ..config import settings
+from .causal import current_causal_token, encode_causal_token
+from .circuit_breaker import CircuitBreaker
+from .db_ops import DBOpsListener
+from .metrics import Metrics
+import asyncio
 import logging
+import random
 
 logger = logging.getLogger(__name__)
 
+# Read preference classes by name, as used in Settings
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def make_read_preference(name: str, max_staleness: int = -1):
+    """
+    Build a pymongo read preference from its name
+    
+    Args:
+        name: Read preference mode name (e.g. "secondaryPreferred")
+        max_staleness: Maximum replication lag in seconds, -1 for no limit
+        
+    Returns:
+        pymongo read preference instance
+        
+    Raises:
+        ValueError: If the name is unknown
+    """
+    if name not in READ_PREFERENCES:
+        raise ValueError(f"Unknown read preference '{name}', expected one of {list(READ_PREFERENCES)}")
+    if name == "primary":
+        return Primary()
+    return READ_PREFERENCES[name](max_staleness=max_staleness)
+
+
+class DatabaseUnavailableError(Exception):
+    """Raised without contacting MongoDB while it is not connected or its circuit is open"""
+
+
+# Errors meaning MongoDB could not be reached (as opposed to a failed operation)
+DATABASE_UNAVAILABLE_ERRORS = (DatabaseUnavailableError, ConnectionFailure)
+
+# Failure types of command events that count against the circuit breaker
+_NETWORK_ERROR_TYPES = frozenset(error.__name__ for error in (ConnectionFailure, AutoReconnect, NetworkTimeout, NotPrimaryError))
+
+
+class DatabaseHealthListener(monitoring.CommandListener):
+    """pymongo command listener reporting command outcomes to the database circuit breaker"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        Database.breaker.record_success()
+
+    def failed(self, event):
+        if event.failure.get("errtype") in _NETWORK_ERROR_TYPES:
+            Database.breaker.record_failure()
+
+
+class DatabaseTopologyListener(monitoring.TopologyListener):
+    """pymongo topology listener opening the circuit when no server can be reached"""
+
+    def opened(self, event):
+        pass
+
+    def description_changed(self, event):
+        # Fed by pymongo's background heartbeats, so no request waits to find out
+        if event.new_description.has_known_servers:
+            Database.breaker.record_success()
+        elif event.previous_description.has_known_servers:
+            Database.breaker.trip("no MongoDB server reachable")
+
+    def closed(self, event):
+        pass
+
+
+class CausalTokens:
+    """
+    Remembers the cluster and operation time of each user's latest operation
+    
+    Sessions started for a user are advanced to these times, so reads routed
+    to a secondary wait until it has replicated the user's own writes. The
+    map is bounded (least recently used users are forgotten) and per process.
+    """
+    
+    def __init__(self, max_users: int = 100000):
+        self.max_users = max_users
+        self._tokens: OrderedDict = OrderedDict()
+    
+    def get(self, user_id):
+        """Get the (cluster_time, operation_time) recorded for a user"""
+        tokens = self._tokens.get(user_id)
+        if tokens is not None:
+            self._tokens.move_to_end(user_id)
+        return tokens
+    
+    def record(self, user_id, cluster_time, operation_time):
+        """Record the latest times observed by a user's session"""
+        if cluster_time is None or operation_time is None:
+            return
+        self._tokens[user_id] = (cluster_time, operation_time)
+        self._tokens.move_to_end(user_id)
+        if len(self._tokens) > self.max_users:
+            self._tokens.popitem(last=False)
+
 
 class Database:
     """MongoDB database connection manager"""
     
     client: AsyncIOMotorClient = None
+    database_name: str = settings.database_name
+    causal_tokens: CausalTokens = CausalTokens()
+    breaker: CircuitBreaker = CircuitBreaker(
+        "db",
+        failure_threshold=settings.db_circuit_failure_threshold,
+        reset_seconds=settings.db_circuit_reset_seconds
+    )
+    _reconnect_task: asyncio.Task | None = None
+    
+    # Read preference per workload, see Settings
+    read_preferences = {
+        "catalog": make_read_preference(settings.catalog_read_preference, settings.read_max_staleness_seconds),
+        "progress": make_read_preference(settings.progress_read_preference, settings.read_max_staleness_seconds),
+        "analytics": make_read_preference(settings.analytics_read_preference, settings.read_max_staleness_seconds),
+    }
     
     @classmethod
-    async def connect_db(cls):
+    async def connect_db(cls, reconnect: bool = False):
         """
         Establish connection to MongoDB and create indexes
+        
+        Args:
+            reconnect: If the connection fails, keep retrying in the background
+                (with exponential backoff) instead of staying disconnected
+        """
+        if await cls._connect():
+            return
+        # Don't raise the exception to allow server to start
+        logger.warning("Server starting without database connection")
+        if reconnect:
+            cls._reconnect_task = asyncio.create_task(cls._reconnect_loop())
+    
+    @classmethod
+    async def _connect(cls) -> bool:
+        """
+        Connect, then create indexes and run migrations
+        
+        Returns:
+            True if connected
         """
+        client = None
         try:
             # Add timeout and SSL configuration
-            cls.client = AsyncIOMotorClient(
+            client = AsyncIOMotorClient(
                 settings.mongodb_uri,
                 serverSelectionTimeoutMS=10000,  # 10 second timeout
                 connectTimeoutMS=10000,
                 socketTimeoutMS=10000,
                 tls=True,
-                tlsAllowInvalidCertificates=True
+                tlsAllowInvalidCertificates=True,
+                # Per-request round-trip counting and circuit breaking
+                event_listeners=[DBOpsListener(), DatabaseHealthListener(), DatabaseTopologyListener()]
             )
             # Verify connection
-            await cls.client.admin.command('ping')
+            await client.admin.command('ping')
+            cls.client = client
+            cls.breaker.record_success()
             logger.info("Successfully connected to MongoDB")
             
             # Create database indexes on startup
@@ -38,12 +190,27 @@ class Database:
             
             # Run migrations
             await cls._run_migrations()
+            return True
             
         except Exception as e:
-            logger.error(f"Failed to connect to MongoDB: {e}")
-            # Don't raise the exception to allow server to start
-            logger.warning("Server starting without database connection")
+            logger.error("Failed to connect to MongoDB: %s", e)
+            if client is not None:
+                client.close()
             cls.client = None
+            return False
+    
+    @classmethod
+    async def _reconnect_loop(cls):
+        """Retry connecting with exponential backoff and jitter until it succeeds"""
+        delay = settings.db_reconnect_initial_seconds
+        while cls.client is None:
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            Metrics.increment("db.reconnect.attempts")
+            if await cls._connect():
+                logger.info("Reconnected to MongoDB")
+                break
+            delay = min(delay * 2, settings.db_reconnect_max_seconds)
+        cls._reconnect_task = None
     
     @classmethod
     async def _create_indexes(cls):
@@ -81,10 +248,31 @@ class Database:
             await db.module_completions.create_index("courseId")
             await db.module_completions.create_index("completedAt")
             
+            # Rate limit buckets expire once they would have refilled
+            await db.rate_limits.create_index("expiresAt", expireAfterSeconds=0)
+            
+            # Revoked token IDs are only needed until the token would have expired
+            await db.revoked_tokens.create_index("expiresAt", expireAfterSeconds=0)
+            await db.revoked_tokens.create_index("revokedAt")
+            
+            # Activity buckets are read by scope and time range
+            await db.activity_rollups.create_index([("granularity", 1), ("courseId", 1), ("start", 1)])
+            # Active learner markers are only needed while their bucket is current
+            await db.activity_learners.create_index("expiresAt", expireAfterSeconds=0)
+            
+            # Recommendation tables are read and dropped by version
+            await db.course_similarities.create_index("version")
+            
+            # Durable background jobs are claimed in due order
+            await db.job_outbox.create_index("runAfter")
+            
+            # Idempotent responses are only replayed for a limited time
+            await db.idempotency_keys.create_index("expiresAt", expireAfterSeconds=0)
+            
             logger.info("Database indexes created successfully")
             
         except Exception as e:
-            logger.error(f"Failed to create database indexes: {e}")
+            logger.error("Failed to create database indexes: %s", e)
             # Continue without indexes - performance may be degraded but app will work
 
     @classmethod
@@ -103,18 +291,76 @@ class Database:
             )
             
             if result.modified_count > 0:
-                logger.info(f"Migration: Added points field to {result.modified_count} users")
+                logger.info("Migration: Added points field to %s users", result.modified_count)
+            
+            # Funnel counters are not backfilled here: replacing them while other
+            # workers increment them would drop those increments
+            if await db.course_funnels.estimated_document_count() == 0 and await db.enrollments.estimated_document_count() > 0:
+                logger.warning("Course funnel counters are empty, run python -m backend.scripts.backfill_funnels during quiet hours")
+            
+            # Migration 3: Derive completed-module bitsets of existing enrollments (one worker only)
+            if (
+                await db.enrollments.find_one({"completedModuleCount": {"$exists": False}}, {"_id": 1})
+                and await cls._claim_migration("module_bitsets")
+            ):
+                from .module_progress import backfill_module_progress
+                try:
+                    enrollments = await backfill_module_progress()
+                except Exception:
+                    await cls._release_migration("module_bitsets")
+                    raise
+                await cls._complete_migration("module_bitsets")
+                logger.info("Migration: Built completed-module bitsets for %s enrollments", enrollments)
             
             logger.info("Database migrations completed successfully")
             
         except Exception as e:
-            logger.error(f"Failed to run database migrations: {e}")
+            logger.error("Failed to run database migrations: %s", e)
+    
+    @classmethod
+    async def _claim_migration(cls, name: str) -> bool:
+        """
+        Take the one-time lock of a migration
+        
+        Every worker runs the migrations on startup; the first to insert the
+        migration's document in the ``migrations`` collection runs it, the
+        others (and later startups) skip it. Re-run a migration with its
+        script.
+        
+        Args:
+            name: Migration name
+            
+        Returns:
+            True if this worker should run the migration
+        """
+        try:
+            await cls.get_database().migrations.insert_one({"_id": name, "startedAt": datetime.utcnow(), "completedAt": None})
+            return True
+        except DuplicateKeyError:
+            return False
+    
+    @classmethod
+    async def _complete_migration(cls, name: str):
+        """Record a migration as done"""
+        await cls.get_database().migrations.update_one({"_id": name}, {"$set": {"completedAt": datetime.utcnow()}})
+    
+    @classmethod
+    async def _release_migration(cls, name: str):
+        """Drop the lock of a failed migration so the next startup retries it"""
+        await cls.get_database().migrations.delete_one({"_id": name})
     
     @classmethod
     async def close_db(cls):
         """
         Close MongoDB connection
         """
+        if cls._reconnect_task is not None:
+            cls._reconnect_task.cancel()
+            try:
+                await cls._reconnect_task
+            except asyncio.CancelledError:
+                pass
+            cls._reconnect_task = None
         if cls.client:
             cls.client.close()
             logger.info("MongoDB connection closed")
@@ -123,24 +369,76 @@ class Database:
     def get_database(cls):
         """
         Get database instance
+        
+        Raises:
+            DatabaseUnavailableError: If not connected, or while the circuit is open
         """
         if not cls.client:
-            raise Exception("Database not connected. Please check MongoDB connection string and network access.")
-        return cls.client[settings.database_name]
+            raise DatabaseUnavailableError("Database not connected. Please check MongoDB connection string and network access.")
+        if not cls.breaker.allow():
+            raise DatabaseUnavailableError("Database unreachable, failing fast while its circuit is open")
+        return cls.client[cls.database_name]
     
     @classmethod
-    def get_collection(cls, collection_name: str):
+    def get_collection(cls, collection_name: str, workload: str = None):
         """
         Get a specific collection from the database
         
         Args:
             collection_name: Name of the collection to retrieve
+            workload: Read workload ("catalog", "progress" or "analytics") whose
+                read preference applies; None reads from the primary
             
         Returns:
             Motor collection instance
         """
         db = cls.get_database()
-        return db[collection_name]
+        if workload is None:
+            return db[collection_name]
+        return db.get_collection(collection_name, read_preference=cls.read_preferences[workload])
+    
+    @classmethod
+    @asynccontextmanager
+    async def user_session(cls, user_id):
+        """
+        Causally-consistent session for operations on behalf of one user
+        
+        The session starts from the user's last recorded cluster/operation
+        time and records its own afterwards, so a user who just wrote (e.g.
+        completed a module) reads that write back even from a secondary.
+        Times recorded by other workers reach this one through the client's
+        X-Causal-Token header (see ``utils.causal``).
+        
+        Args:
+            user_id: User the operations are performed for
+            
+        Yields:
+            Motor client session, or None when causal consistency is disabled
+        """
+        if not settings.causal_consistency:
+            yield None
+            return
+        
+        session = await cls.client.start_session(causal_consistency=True)
+        try:
+            request = current_causal_token.get()
+            for tokens in (cls.causal_tokens.get(user_id), request and request["incoming"]):
+                if not tokens:
+                    continue
+                if len(tokens) == 3:
+                    # From the client: only for the user it was issued to
+                    if tokens[0] != str(user_id):
+                        continue
+                    tokens = tokens[1:]
+                # Sessions keep the later of their own and the advanced times
+                session.advance_cluster_time(tokens[0])
+                session.advance_operation_time(tokens[1])
+            yield session
+            cls.causal_tokens.record(user_id, session.cluster_time, session.operation_time)
+            if request is not None and session.cluster_time is not None and session.operation_time is not None:
+                request["outgoing"] = encode_causal_token(user_id, session.cluster_time, session.operation_time)
+        finally:
+            await session.end_session()
 
 
 # Convenience functions for accessing collections
@@ -149,19 +447,24 @@ def get_users_collection():
     return Database.get_collection("users")
 
 
-def get_courses_collection():
+def get_courses_collection(workload: str = None):
     """Get courses collection"""
-    return Database.get_collection("courses")
+    return Database.get_collection("courses", workload)
+
+
+def get_catalog_meta_collection():
+    """Get catalog metadata collection (catalog version)"""
+    return Database.get_collection("catalog_meta")
 
 
-def get_completions_collection():
+def get_completions_collection(workload: str = None):
     """Get completions collection"""
-    return Database.get_collection("completions")
+    return Database.get_collection("completions", workload)
 
 
-def get_enrollments_collection():
+def get_enrollments_collection(workload: str = None):
     """Get enrollments collection"""
-    return Database.get_collection("enrollments")
+    return Database.get_collection("enrollments", workload)
 
 
 def get_lessons_collection():
@@ -169,6 +472,46 @@ def get_lessons_collection():
     return Database.get_collection("lessons")
 
 
-def get_module_completions_collection():
+def get_module_completions_collection(workload: str = None):
     """Get module completions collection"""
-    return Database.get_collection("module_completions")
\ No newline at end of file
+    return Database.get_collection("module_completions", workload)
+
+
+def get_course_funnels_collection(workload: str = None):
+    """Get course funnels collection"""
+    return Database.get_collection("course_funnels", workload)
+
+
+def get_activity_rollups_collection(workload: str = None):
+    """Get activity rollups collection"""
+    return Database.get_collection("activity_rollups", workload)
+
+
+def get_activity_learners_collection():
+    """Get activity learner markers collection"""
+    return Database.get_collection("activity_learners")
+
+
+def get_course_similarities_collection():
+    """Get course similarities collection (recommendation table)"""
+    return Database.get_collection("course_similarities")
+
+
+def get_recommendations_meta_collection():
+    """Get recommendations metadata collection (current table version, build lease)"""
+    return Database.get_collection("recommendations_meta")
+
+
+def get_revoked_tokens_collection():
+    """Get revoked tokens collection"""
+    return Database.get_collection("revoked_tokens")
+
+
+def get_job_outbox_collection():
+    """Get background job outbox collection"""
+    return Database.get_collection("job_outbox")
+
+
+def get_idempotency_keys_collection():
+    """Get idempotency keys collection"""
+    return Database.get_collection("idempotency_keys")
\ No newline at end of file
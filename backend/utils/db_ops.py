@@ -0,0 +1,202 @@
+"""
+Per-request MongoDB operation tracking and round-trip budgets
+
+A pymongo command listener counts every command sent to MongoDB and charges
+it to the request that issued it. The request is identified through a
+context variable: Motor copies the caller's context into its executor
+threads, so the listener sees the counter of the request being served.
+
+Routes declare the maximum number of round trips they may make with the
+``db_ops_budget`` decorator; ``DBOpsMiddleware`` reports the count and the
+budget in the ``X-DB-Ops`` / ``X-DB-Ops-Budget`` headers and logs requests
+that go over budget.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pymongo import monitoring
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+DB_OPS_HEADER = "X-DB-Ops"
+DB_OPS_BUDGET_HEADER = "X-DB-Ops-Budget"
+
+
+class DBOpsCounter:
+    """Counts the MongoDB commands issued while serving one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.commands: list[str] = []
+        self._lock = threading.Lock()
+
+    def record(self, command_name: str):
+        """
+        Record a command sent to MongoDB
+
+        Args:
+            command_name: Name of the MongoDB command (find, insert, getMore, ...)
+        """
+        with self._lock:
+            self.count += 1
+            self.commands.append(command_name)
+
+
+_current_counter: ContextVar[DBOpsCounter | None] = ContextVar("db_ops_counter", default=None)
+
+
+class DBOpsListener(monitoring.CommandListener):
+    """pymongo command listener that charges commands to the current request"""
+
+    def started(self, event):
+        counter = _current_counter.get()
+        if counter is not None:
+            counter.record(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+@contextmanager
+def track_db_ops():
+    """
+    Count MongoDB commands issued inside the block
+
+    Yields:
+        DBOpsCounter for the block
+    """
+    counter = DBOpsCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+def current_db_ops() -> DBOpsCounter | None:
+    """
+    Get the counter of the request being served
+
+    Returns:
+        Current DBOpsCounter, or None outside of a tracked block
+    """
+    return _current_counter.get()
+
+
+def db_ops_budget(max_ops: int):
+    """
+    Declare the maximum number of MongoDB round trips a route may make
+
+    Usage:
+        @router.get("/{course_id}")
+        @db_ops_budget(4)
+        async def get_course(...):
+            ...
+
+    Args:
+        max_ops: Maximum number of commands per request, including authentication
+    """
+    def decorator(func):
+        func.db_ops_budget = max_ops
+        return func
+    return decorator
+
+
+def get_db_ops_budget(endpoint) -> int | None:
+    """
+    Get the round-trip budget declared for a route endpoint
+
+    Args:
+        endpoint: Route endpoint function
+
+    Returns:
+        Declared budget, or None if the route has none
+    """
+    return getattr(endpoint, "db_ops_budget", None)
+
+
+def iter_routes(routes, path_prefix: str = ""):
+    """
+    Walk the endpoint routes of an application, including included routers
+
+    FastAPI >= 0.143 keeps each ``include_router`` as a single route wrapping
+    the original router instead of copying its routes into the application.
+
+    Args:
+        routes: Routes to walk (``app.routes``)
+        path_prefix: Prefix added by the enclosing routers or mounts
+
+    Yields:
+        (full path, route) for every route with an endpoint
+    """
+    for route in routes:
+        included = getattr(route, "original_router", None)
+        if included is not None:
+            yield from iter_routes(included.routes, path_prefix + route.include_context.prefix)
+        elif getattr(route, "endpoint", None) is not None:
+            yield path_prefix + route.path, route
+        elif getattr(route, "routes", None):
+            # Mounted sub-applications
+            yield from iter_routes(route.routes, path_prefix + route.path)
+
+
+def routes_missing_db_ops_budget(app, prefix: str = "/api") -> list[str]:
+    """
+    List API routes that do not declare a round-trip budget
+
+    Args:
+        app: FastAPI application
+        prefix: Only routes under this path prefix are checked
+
+    Returns:
+        "METHOD path" strings for routes without a budget
+    """
+    missing = []
+    for path, route in iter_routes(app.routes):
+        if not path.startswith(prefix):
+            continue
+        if get_db_ops_budget(route.endpoint) is None:
+            for method in sorted(getattr(route, "methods", None) or []):
+                missing.append(f"{method} {path}")
+    return missing
+
+
+# Test helpers
+
+@contextmanager
+def assert_max_db_ops(max_ops: int):
+    """
+    Assert that the block issues at most ``max_ops`` MongoDB commands
+
+    Usage:
+        with assert_max_db_ops(4):
+            await get_course(course_id, current_user)
+
+    Args:
+        max_ops: Maximum number of commands allowed
+    """
+    with track_db_ops() as counter:
+        yield counter
+    assert counter.count <= max_ops, (
+        f"Expected at most {max_ops} database operations, got {counter.count}: {counter.commands}"
+    )
+
+
+def assert_db_ops_within_budget(response):
+    """
+    Assert that a response stayed within its route's declared budget
+
+    Works with any response object exposing ``headers`` (TestClient, httpx).
+
+    Args:
+        response: HTTP response returned by the application
+    """
+    assert DB_OPS_HEADER in response.headers, f"Response has no {DB_OPS_HEADER} header"
+    assert DB_OPS_BUDGET_HEADER in response.headers, "Route has no declared database budget"
+    used = int(response.headers[DB_OPS_HEADER])
+    budget = int(response.headers[DB_OPS_BUDGET_HEADER])
+    assert used <= budget, f"Route used {used} database operations, budget is {budget}"
@@ -0,0 +1,326 @@
+"""
+Live progress events
+
+Routes publish a learner's progress events (module completions, points
+changes, course completions) to a broker. Every worker's hub receives the
+events from the broker and fans them out to the learner's open streams on
+that worker, so all of a learner's tabs and devices update without polling.
+
+Brokers are pluggable:
+
+- ``MemoryEventBroker``: in-process delivery, no I/O (single worker)
+- ``MongoEventBroker``: shared by every worker through a capped collection
+  tailed with an awaitable cursor; needs no extra infrastructure and, unlike
+  change streams, works on a standalone server. It connects in the
+  background and keeps retrying, so a database that is down at startup
+  does not stop the worker
+
+Each stream has a bounded queue and publishing never waits for a stream.
+When a slow client lets its queue fill up, its queued events are replaced by
+a single "resync" event telling it to reload its progress, so one stalled
+connection costs at most ``PROGRESS_STREAM_QUEUE_SIZE`` events of memory.
+"""
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from bson import ObjectId
+from datetime import datetime
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+from ..config import settings
+from .db import Database
+from .metrics import Metrics
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sent instead of the events a slow stream could not keep up with
+RESYNC_EVENT = "resync"
+
+# Capped collection used by the MongoDB broker
+PROGRESS_EVENTS_COLLECTION = "progress_events"
+
+
+def format_sse(event: dict) -> bytes:
+    """
+    Encode an event in the server-sent events wire format
+
+    Args:
+        event: Event with "id", "type" and "data"
+
+    Returns:
+        One SSE message
+    """
+    data = json.dumps(event["data"], separators=(",", ":"), default=str)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n".encode()
+
+
+class ProgressSubscription:
+    """One open event stream of a learner, with a bounded queue"""
+
+    def __init__(self, user_id: str, max_queued: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+
+    def offer(self, event: dict | None):
+        """
+        Queue an event without waiting (None ends the stream)
+
+        Args:
+            event: Event to send
+        """
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The client is not reading: drop what it missed and ask it to reload
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            Metrics.increment("progress_events.resyncs")
+            self.queue.put_nowait({"id": str(ObjectId()), "type": RESYNC_EVENT, "data": {}})
+            if event is None:
+                self.queue.put_nowait(None)
+
+    async def next(self, timeout: float) -> dict | None:
+        """
+        Wait for the next event
+
+        Args:
+            timeout: Seconds to wait
+
+        Returns:
+            Next event, or None when the stream must end
+
+        Raises:
+            TimeoutError: If no event arrived in time
+        """
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class EventBroker(ABC):
+    """Transport of progress events between workers"""
+
+    @abstractmethod
+    async def start(self, deliver: Callable[[str, dict], None], resync: Callable[[], None]):
+        """
+        Start receiving events, passing each one to ``deliver(user_id, event)``
+
+        ``resync()`` is called when events may have been missed.
+        """
+
+    @abstractmethod
+    async def stop(self):
+        """Stop receiving events"""
+
+    @abstractmethod
+    async def publish(self, user_id: str, events: list[dict]):
+        """Send events of one learner to every worker"""
+
+
+class MemoryEventBroker(EventBroker):
+    """Delivers events to this worker's streams only"""
+
+    def __init__(self):
+        self.deliver = None
+
+    async def start(self, deliver: Callable[[str, dict], None], resync: Callable[[], None]):
+        self.deliver = deliver
+
+    async def stop(self):
+        self.deliver = None
+
+    async def publish(self, user_id: str, events: list[dict]):
+        if self.deliver is not None:
+            for event in events:
+                self.deliver(user_id, event)
+
+
+class MongoEventBroker(EventBroker):
+    """Events shared by every worker through a tailed capped collection"""
+
+    def __init__(self, collection_bytes: int = 16 * 1024 * 1024, min_retry_seconds: float = 1, max_retry_seconds: float = 30):
+        self.collection_bytes = collection_bytes
+        self.min_retry_seconds = min_retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self._task: asyncio.Task | None = None
+
+    def _collection(self):
+        return Database.get_collection(PROGRESS_EVENTS_COLLECTION)
+
+    async def start(self, deliver: Callable[[str, dict], None], resync: Callable[[], None]):
+        self._task = asyncio.create_task(self._tail(deliver, resync))
+
+    async def _create_collection(self):
+        try:
+            await Database.get_database().create_collection(
+                PROGRESS_EVENTS_COLLECTION, capped=True, size=self.collection_bytes
+            )
+        except CollectionInvalid:
+            pass  # Created by another worker
+
+    async def _tail(self, deliver: Callable[[str, dict], None], resync: Callable[[], None]):
+        """
+        Deliver events as they are inserted, reconnecting with backoff
+
+        A capped collection returns documents in insertion order, which the
+        ObjectIds of events published by several workers do not follow. So
+        instead of resuming after the last ``_id`` seen, every (re)opened
+        cursor reads the collection from the start and skips up to the last
+        event delivered. If that event was overwritten while disconnected,
+        the events in between are lost and every stream is asked to resync.
+        """
+        last_id: ObjectId | None = None
+        connected = False
+        retry_seconds = self.min_retry_seconds
+        while True:
+            try:
+                if not connected:
+                    await self._create_collection()
+                    # Only events published from now on
+                    last = await self._collection().find_one({}, {"_id": 1}, sort=[("$natural", -1)])
+                    last_id = last["_id"] if last else None
+                    connected = True
+                skipping = last_id is not None
+                cursor = self._collection().find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for doc in cursor:
+                        if skipping:
+                            skipping = doc["_id"] != last_id
+                            continue
+                        last_id = doc["_id"]
+                        deliver(doc["userId"], doc["event"])
+                    retry_seconds = self.min_retry_seconds
+                    if skipping:
+                        # Read to the end without meeting the last event delivered
+                        logger.warning("Progress events were overwritten while disconnected, asking streams to resync")
+                        Metrics.increment("progress_events.gaps")
+                        resync()
+                        skipping = False
+                    # Empty batch: the server already waited for new events
+                    await asyncio.sleep(0.05)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Progress event stream interrupted, reconnecting in %ss: %s", retry_seconds, e)
+            await asyncio.sleep(retry_seconds)
+            retry_seconds = min(retry_seconds * 2, self.max_retry_seconds)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def publish(self, user_id: str, events: list[dict]):
+        now = datetime.utcnow()
+        await self._collection().insert_many([
+            {"_id": ObjectId(event["id"]), "userId": user_id, "event": event, "createdAt": now}
+            for event in events
+        ])
+
+
+class ProgressEventHub:
+    """Per-process fan-out of progress events to open streams"""
+
+    subscriptions: dict[str, set[ProgressSubscription]] = {}
+    broker: EventBroker = MemoryEventBroker()
+
+    @classmethod
+    def configure(cls, broker_name: str):
+        """
+        Select the event broker
+
+        Args:
+            broker_name: "memory" or "mongo"
+
+        Raises:
+            ValueError: If the broker is unknown
+        """
+        if broker_name == "memory":
+            cls.broker = MemoryEventBroker()
+        elif broker_name == "mongo":
+            cls.broker = MongoEventBroker()
+        else:
+            raise ValueError(f"Unknown progress events broker '{broker_name}', expected 'memory' or 'mongo'")
+
+    @classmethod
+    def subscribe(cls, user_id: str) -> ProgressSubscription | None:
+        """
+        Open a stream for a learner
+
+        Args:
+            user_id: Learner ID
+
+        Returns:
+            New subscription, or None if the learner has too many open streams
+        """
+        streams = cls.subscriptions.setdefault(user_id, set())
+        if len(streams) >= settings.progress_stream_max_per_user:
+            return None
+        subscription = ProgressSubscription(user_id, settings.progress_stream_queue_size)
+        streams.add(subscription)
+        Metrics.set_gauge("progress_events.streams", sum(len(streams) for streams in cls.subscriptions.values()))
+        return subscription
+
+    @classmethod
+    def unsubscribe(cls, subscription: ProgressSubscription):
+        """Close a learner's stream"""
+        streams = cls.subscriptions.get(subscription.user_id)
+        if streams is not None:
+            streams.discard(subscription)
+            if not streams:
+                del cls.subscriptions[subscription.user_id]
+        Metrics.set_gauge("progress_events.streams", sum(len(streams) for streams in cls.subscriptions.values()))
+
+    @classmethod
+    def deliver(cls, user_id: str, event: dict):
+        """Queue an event on every stream of a learner open on this worker"""
+        for subscription in cls.subscriptions.get(user_id, ()):
+            subscription.offer(event)
+        Metrics.increment("progress_events.delivered")
+
+    @classmethod
+    def resync(cls):
+        """Ask every stream open on this worker to reload its progress (events were missed)"""
+        for streams in cls.subscriptions.values():
+            for subscription in streams:
+                subscription.offer({"id": str(ObjectId()), "type": RESYNC_EVENT, "data": {}})
+        Metrics.increment("progress_events.resyncs")
+
+    @classmethod
+    async def publish(cls, user_id: ObjectId, events: list[tuple[str, dict]]):
+        """
+        Publish events of one learner to all their streams, on every worker
+
+        Failures are logged rather than raised: the progress itself is stored
+        and clients reload it when they reconnect.
+
+        Args:
+            user_id: Learner ID
+            events: (event type, data) pairs, sent in order
+        """
+        try:
+            await cls.broker.publish(
+                str(user_id),
+                [{"id": str(ObjectId()), "type": event_type, "data": data} for event_type, data in events]
+            )
+            Metrics.increment("progress_events.published", len(events))
+        except Exception as e:
+            Metrics.increment("progress_events.publish_failed")
+            logger.warning("Failed to publish progress events for user %s: %s", user_id, e)
+
+    @classmethod
+    async def start(cls):
+        """Start receiving events from the broker (application startup)"""
+        await cls.broker.start(cls.deliver, cls.resync)
+
+    @classmethod
+    async def stop(cls):
+        """Stop receiving events and end every open stream (application shutdown)"""
+        await cls.broker.stop()
+        for streams in list(cls.subscriptions.values()):
+            for subscription in list(streams):
+                subscription.offer(None)
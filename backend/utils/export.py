@@ -0,0 +1,183 @@
+"""
+Streaming exports of progress data
+
+Rows are read from batched cursors and encoded as NDJSON or CSV chunk by
+chunk, so an export holds at most one cursor batch and one output chunk in
+memory whatever its size. The response is sent as it is produced and the
+ASGI server only asks for the next chunk once the previous one was written
+to the client, so a slow client slows the cursor down instead of buffering.
+"""
+from collections.abc import AsyncIterator, Callable
+from bson import ObjectId
+from datetime import datetime
+from ..repositories import (
+    get_enrollments_repository,
+    get_completions_repository,
+    get_module_completions_repository
+)
+from .metrics import Metrics
+import csv
+import io
+import json
+
+# Bytes accumulated before a chunk is sent
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+# Repository and columns of each exportable dataset ("id" is the document _id)
+EXPORT_DATASETS: dict[str, tuple[Callable, tuple[str, ...]]] = {
+    "enrollments": (get_enrollments_repository, ("id", "userId", "courseId", "enrolledAt")),
+    "completions": (get_completions_repository, ("id", "userId", "courseId", "completedAt")),
+    "module_completions": (
+        get_module_completions_repository,
+        ("id", "userId", "courseId", "moduleIndex", "moduleTitle", "completedAt")
+    ),
+}
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+# Exported form of the BSON types that JSON and CSV do not represent as wanted
+EXPORT_CONVERTERS = {
+    ObjectId: str,
+    datetime: datetime.isoformat,
+}
+
+
+def export_value(value):
+    """Convert a document value to its exported form (IDs as strings, dates as ISO 8601)"""
+    converter = EXPORT_CONVERTERS.get(type(value))
+    return converter(value) if converter is not None else value
+
+
+def _json_default(value):
+    converter = EXPORT_CONVERTERS.get(type(value))
+    if converter is None:
+        raise TypeError(f"Cannot export {type(value).__name__}")
+    return converter(value)
+
+
+# The C encoder only calls back into Python for IDs and dates
+_JSON_ENCODER = json.JSONEncoder(separators=(",", ":"), default=_json_default, check_circular=False)
+
+
+def document_keys(columns: tuple[str, ...]) -> tuple[str, ...]:
+    """Get the document field of each exported column ("id" is the document _id)"""
+    return tuple("_id" if column == "id" else column for column in columns)
+
+
+def export_row(doc: dict, keys: tuple[str, ...]) -> list:
+    """
+    Get the exported values of a document
+
+    Args:
+        doc: Document
+        keys: Document fields of the exported columns
+
+    Returns:
+        Values in column order (None for missing fields)
+    """
+    return [export_value(doc.get(key)) for key in keys]
+
+
+async def encode_ndjson(docs: AsyncIterator[dict], columns: tuple[str, ...]) -> AsyncIterator[bytes]:
+    """
+    Encode documents as newline-delimited JSON, one object per line
+
+    Args:
+        docs: Documents to export
+        columns: Exported fields
+
+    Yields:
+        Chunks of about EXPORT_CHUNK_BYTES
+    """
+    buffer = io.StringIO()
+    fields = tuple(zip(columns, document_keys(columns)))
+    rows = 0
+    async for doc in docs:
+        buffer.write(_JSON_ENCODER.encode({column: doc.get(key) for column, key in fields}))
+        buffer.write("\n")
+        rows += 1
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+    Metrics.increment("exports.rows", rows)
+
+
+async def encode_csv(docs: AsyncIterator[dict], columns: tuple[str, ...]) -> AsyncIterator[bytes]:
+    """
+    Encode documents as CSV with a header row
+
+    Args:
+        docs: Documents to export
+        columns: Exported fields
+
+    Yields:
+        Chunks of about EXPORT_CHUNK_BYTES
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    keys = document_keys(columns)
+    rows = 0
+    async for doc in docs:
+        writer.writerow(export_row(doc, keys))
+        rows += 1
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+    Metrics.increment("exports.rows", rows)
+
+
+EXPORT_ENCODERS = {
+    "ndjson": encode_ndjson,
+    "csv": encode_csv,
+}
+
+
+async def _prepend(first: dict | None, docs: AsyncIterator[dict]) -> AsyncIterator[dict]:
+    if first is not None:
+        yield first
+        async for doc in docs:
+            yield doc
+
+
+async def start_export(
+    dataset: str,
+    export_format: str,
+    course_id: ObjectId | None,
+    start: datetime | None,
+    end: datetime | None,
+    batch_size: int
+) -> AsyncIterator[bytes]:
+    """
+    Open an export and read its first batch
+
+    Reading the first batch before the response starts means an unreachable
+    database fails the request with an error status instead of an empty or
+    truncated file.
+
+    Args:
+        dataset: Key of EXPORT_DATASETS
+        export_format: Key of EXPORT_ENCODERS
+        course_id: Only export this course (all if None)
+        start: Only export rows dated at or after this time
+        end: Only export rows dated before this time
+        batch_size: Documents per cursor batch
+
+    Returns:
+        Encoded chunks of the export
+    """
+    get_repository, columns = EXPORT_DATASETS[dataset]
+    docs = get_repository().iter_export(course_id, start, end, batch_size)
+    first = await anext(docs, None)
+    Metrics.increment(f"exports.{dataset}.{export_format}")
+    return EXPORT_ENCODERS[export_format](_prepend(first, docs), columns)
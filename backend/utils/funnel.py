@@ -0,0 +1,112 @@
+"""
+Module completion funnels
+
+Every course has one counters document (see ``CourseFunnelRepository``)
+with its enrollments, course completions and completions of each syllabus
+module. Routes increment the counters as learners progress, so a funnel is
+one document read and O(modules) work however many learners a course has.
+
+``backfill_funnels`` rebuilds every counter from the progress collections
+with one aggregation each and replaces them. It only runs from its script
+(``python -m backend.scripts.backfill_funnels``), to build the counters of
+existing progress or repair them after failed increments. Progress recorded
+while a backfill runs may be missed, so run it during quiet hours; startup
+only warns when the counters are missing.
+"""
+from bson import ObjectId
+from datetime import datetime
+from ..repositories import (
+    get_courses_repository,
+    get_enrollments_repository,
+    get_completions_repository,
+    get_module_completions_repository,
+    get_course_funnels_repository
+)
+from .metrics import Metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def record_funnel_progress(course_id: ObjectId, enrollments: int = 0, completions: int = 0, module_index: int | None = None):
+    """
+    Count learner progress in a course's funnel
+
+    Failures are logged rather than raised: the progress itself is already
+    stored and a backfill repairs the counters.
+
+    Args:
+        course_id: Course ID
+        enrollments: New enrollments
+        completions: New course completions
+        module_index: Index of a newly completed module, if any
+    """
+    try:
+        await get_course_funnels_repository().increment(course_id, enrollments, completions, module_index)
+    except Exception as e:
+        Metrics.increment("funnel.increment_failed")
+        logger.warning("Failed to update funnel counters of course %s: %s", course_id, e)
+
+
+async def backfill_funnels() -> int:
+    """
+    Rebuild the funnel counters of every course from enrollments and completions
+
+    Returns:
+        Number of courses with counters
+    """
+    enrollments = await get_enrollments_repository().count_by_course()
+    completions = await get_completions_repository().count_by_course()
+    module_completions = await get_module_completions_repository().count_by_course_module()
+
+    now = datetime.utcnow()
+    funnels: dict[ObjectId, dict] = {}
+    for course in await get_courses_repository().find_all():
+        funnels[course["_id"]] = {"_id": course["_id"], "enrollments": 0, "completions": 0, "modules": {}, "updatedAt": now}
+    for course_id, count in enrollments.items():
+        if course_id in funnels:
+            funnels[course_id]["enrollments"] = count
+    for course_id, count in completions.items():
+        if course_id in funnels:
+            funnels[course_id]["completions"] = count
+    for (course_id, module_index), count in module_completions.items():
+        if course_id in funnels:
+            funnels[course_id]["modules"][str(module_index)] = count
+
+    await get_course_funnels_repository().replace_all(list(funnels.values()))
+    logger.info("Backfilled funnel counters of %s course(s)", len(funnels))
+    return len(funnels)
+
+
+def funnel_steps(syllabus: list[str], funnel: dict | None) -> list[dict]:
+    """
+    Compute the per-module steps of a course funnel
+
+    Args:
+        syllabus: Module titles of the course
+        funnel: Counters document of the course (None if it has no progress yet;
+            "modules" is missing until a module is completed)
+
+    Returns:
+        One dict per module with "moduleIndex", "moduleTitle", "learners"
+        (learners who completed it), "conversionRate" (percentage of enrolled
+        learners) and "dropOff" (learners lost since the previous step, the
+        enrollment for the first module; negative when a later module was
+        completed by more learners, as modules can be completed in any order)
+    """
+    enrollments = funnel["enrollments"] if funnel else 0
+    modules = funnel.get("modules", {}) if funnel else {}
+
+    steps = []
+    previous = enrollments
+    for module_index, module_title in enumerate(syllabus):
+        learners = modules.get(str(module_index), 0)
+        steps.append({
+            "moduleIndex": module_index,
+            "moduleTitle": module_title,
+            "learners": learners,
+            "conversionRate": round(learners / enrollments * 100, 2) if enrollments else 0.0,
+            "dropOff": previous - learners
+        })
+        previous = learners
+    return steps
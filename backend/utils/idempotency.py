@@ -0,0 +1,208 @@
+"""
+Idempotency keys
+
+Routes decorated with ``@idempotent`` accept an ``Idempotency-Key`` header.
+The first response for a (user, key) pair is stored and every retry with
+the same key gets that response back without running the route again, so a
+client retrying on a flaky network reads "Enrolled" twice instead of
+"Already enrolled". ``IdempotencyMiddleware`` reads the key and stores the
+response; the decorator claims the key or replays the stored response.
+
+Responses are kept for ``IDEMPOTENCY_KEY_TTL_HOURS`` in the
+``idempotency_keys`` collection (shared by every worker) and in a per-process
+LRU cache, so most retries cost no database round trip at all.
+"""
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from starlette.responses import JSONResponse, Response
+from ..config import settings
+from ..repositories import get_idempotency_keys_repository
+from .metrics import Metrics
+import asyncio
+import functools
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENT_REPLAY_HEADER = "Idempotent-Replayed"
+
+# Keys are client-generated (typically UUIDs); longer ones are rejected
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+# Statuses that depend on the moment rather than on the request are not stored
+UNSTORED_STATUSES = frozenset({401, 403, 409, 429})
+
+
+class IdempotentResponses:
+    """Per-process LRU cache of stored responses and the requests running for each key"""
+
+    cache: OrderedDict[str, dict] = OrderedDict()
+    # Key ID -> set once the request holding the key finished
+    in_flight: dict[str, asyncio.Event] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, key_id: str) -> dict | None:
+        """
+        Get a cached response
+
+        Args:
+            key_id: "<user ID>:<key>"
+
+        Returns:
+            Stored key document ("path", "response"), or None
+        """
+        with cls._lock:
+            doc = cls.cache.get(key_id)
+            if doc is not None:
+                cls.cache.move_to_end(key_id)
+            return doc
+
+    @classmethod
+    def put(cls, key_id: str, doc: dict):
+        """Cache a stored response, evicting the least recently used ones"""
+        with cls._lock:
+            cls.cache[key_id] = doc
+            cls.cache.move_to_end(key_id)
+            while len(cls.cache) > settings.idempotency_cache_size:
+                cls.cache.popitem(last=False)
+
+
+# Key of the current request, set by IdempotencyMiddleware:
+# {"key_id": "<user ID>:<key>", "path": str, "claimed": bool}
+current_idempotency_key: ContextVar[dict | None] = ContextVar("idempotency_key", default=None)
+
+
+def replay_response(doc: dict) -> Response:
+    """Rebuild a stored response, marked with the Idempotent-Replayed header"""
+    response = doc["response"]
+    headers = {name: value for name, value in response["headers"] if name.lower() != "content-length"}
+    headers[IDEMPOTENT_REPLAY_HEADER] = "true"
+    return Response(content=bytes(response["body"]), status_code=response["status"], headers=headers)
+
+
+async def claim_or_replay(request_key: dict) -> Response | None:
+    """
+    Claim the current request's key, or get the response retries receive
+
+    A retry arriving while the first request still runs waits for it on the
+    same worker and gets a 409 on another one.
+
+    Args:
+        request_key: Current request key (``claimed`` is set when claimed)
+
+    Returns:
+        Response to send instead of running the route, or None to run it
+    """
+    key_id = request_key["key_id"]
+    running = IdempotentResponses.in_flight.get(key_id)
+    if running is not None:
+        await running.wait()
+
+    doc = IdempotentResponses.get(key_id)
+    if doc is None:
+        now = datetime.utcnow()
+        try:
+            doc = await get_idempotency_keys_repository().claim(
+                key_id,
+                request_key["path"],
+                now + timedelta(seconds=settings.idempotency_lock_seconds),
+                now + timedelta(hours=settings.idempotency_key_ttl_hours)
+            )
+        except Exception as e:
+            logger.warning("Idempotency key store unavailable, running %s without replay: %s", request_key["path"], e)
+            return None
+        if doc is None:
+            request_key["claimed"] = True
+            IdempotentResponses.in_flight[key_id] = asyncio.Event()
+            return None
+        if doc["status"] == "completed":
+            IdempotentResponses.put(key_id, doc)
+
+    if doc["path"] != request_key["path"]:
+        return JSONResponse(
+            {"detail": f"{IDEMPOTENCY_KEY_HEADER} was already used for a different request"},
+            status_code=422
+        )
+    if doc["status"] != "completed":
+        Metrics.increment("idempotency.conflicts")
+        return JSONResponse(
+            {"detail": "A request with this Idempotency-Key is still being processed"},
+            status_code=409,
+            headers={"Retry-After": "1"}
+        )
+    Metrics.increment("idempotency.replayed")
+    return replay_response(doc)
+
+
+async def finish_request(request_key: dict, status: int | None, headers: list, body: bytes):
+    """
+    Store the response of a claimed key, or release the key so it can be retried
+
+    Args:
+        request_key: Current request key
+        status: Response status (None if no response was sent)
+        headers: Raw response headers
+        body: Response body
+    """
+    key_id = request_key["key_id"]
+    repository = get_idempotency_keys_repository()
+    try:
+        if status is not None and should_store(status):
+            doc = {
+                "path": request_key["path"],
+                "status": "completed",
+                "response": {
+                    "status": status,
+                    "headers": [[name.decode("latin-1"), value.decode("latin-1")] for name, value in headers],
+                    "body": body
+                }
+            }
+            IdempotentResponses.put(key_id, doc)
+            await repository.complete(
+                key_id,
+                doc["response"],
+                datetime.utcnow() + timedelta(hours=settings.idempotency_key_ttl_hours)
+            )
+            Metrics.increment("idempotency.stored")
+        else:
+            await repository.release(key_id)
+    except Exception as e:
+        # Retries on other workers get a 409 until the key's lock expires
+        logger.warning("Failed to store the response of idempotency key %s: %s", key_id, e)
+    finally:
+        done = IdempotentResponses.in_flight.pop(key_id, None)
+        if done is not None:
+            done.set()
+
+
+def idempotent(func):
+    """
+    Let clients retry a route safely with an Idempotency-Key header
+
+    Usage:
+        @router.post("/{course_id}/enroll")
+        @db_ops_budget(6)
+        @idempotent
+        async def enroll_in_course(...):
+            ...
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        request_key = current_idempotency_key.get()
+        if request_key is not None:
+            replay = await claim_or_replay(request_key)
+            if replay is not None:
+                return replay
+        return await func(*args, **kwargs)
+
+    wrapper.idempotent = True
+    return wrapper
+
+
+def should_store(status: int) -> bool:
+    """Check whether a response is replayed for retries (server errors and transient refusals are not)"""
+    return status < 500 and status not in UNSTORED_STATUSES
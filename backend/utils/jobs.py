@@ -0,0 +1,238 @@
+"""
+In-process background jobs
+
+Side effects a response does not depend on (login timestamps, course
+completion records and bonuses) are queued as jobs and run by a few worker
+tasks after the response is sent. Jobs are registered by name and take
+keyword arguments, so they can be stored and replayed:
+
+    @background_job("users.record_login")
+    async def record_login(user_id: ObjectId, fields: dict):
+        ...
+
+    await BackgroundJobs.enqueue("users.record_login", user_id=user_id, fields=fields)
+
+A failing job is retried ``BACKGROUND_JOB_MAX_ATTEMPTS`` times with
+exponential backoff. The queue is bounded: when it is full the job runs
+inline, slowing the request down instead of growing memory without limit.
+
+Durable jobs (``durable=True``) are first written to the ``job_outbox``
+collection, costing one insert on the request path, and deleted once done.
+Running one leases it for ``BACKGROUND_JOB_LEASE_SECONDS``; a sweeper on
+every worker re-runs outbox jobs whose lease expired, so jobs lost in a
+crash or still failing after their retries run again later, until
+``BACKGROUND_JOB_MAX_OUTBOX_ATTEMPTS`` runs have failed. Durable jobs run at
+least once and must tolerate being repeated.
+
+On shutdown the queue is drained for up to ``BACKGROUND_JOB_DRAIN_SECONDS``.
+"""
+from collections.abc import Awaitable, Callable
+from bson import ObjectId
+from datetime import datetime, timedelta
+from ..config import settings
+from ..repositories import get_job_outbox_repository
+from .metrics import Metrics
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundJobs:
+    """Registry of job handlers and the per-process job queue"""
+
+    handlers: dict[str, Callable[..., Awaitable[None]]] = {}
+    queue: asyncio.Queue | None = None
+    _workers: list[asyncio.Task] = []
+    _sweeper: asyncio.Task | None = None
+
+    @classmethod
+    def register(cls, name: str, handler: Callable[..., Awaitable[None]]):
+        """
+        Register the coroutine function running a job
+
+        Args:
+            name: Job name (dotted, e.g. "courses.record_completion")
+            handler: Called with the job's keyword arguments
+        """
+        cls.handlers[name] = handler
+
+    @classmethod
+    async def enqueue(cls, name: str, durable: bool = False, **payload):
+        """
+        Run a job after the current request
+
+        Args:
+            name: Registered job name
+            durable: Record the job in the outbox so it survives a crash
+            **payload: Keyword arguments of the handler (BSON-encodable if durable)
+
+        Raises:
+            KeyError: If no handler is registered under ``name``
+        """
+        if name not in cls.handlers:
+            raise KeyError(f"Unknown background job '{name}'")
+        job = {"_id": ObjectId(), "name": name, "payload": payload, "attempts": 0, "durable": durable}
+        if durable:
+            now = datetime.utcnow()
+            await get_job_outbox_repository().insert({
+                "_id": job["_id"],
+                "name": name,
+                "payload": payload,
+                "attempts": 0,
+                "runAfter": now + timedelta(seconds=settings.background_job_lease_seconds),
+                "createdAt": now,
+                "error": None
+            })
+        Metrics.increment("jobs.enqueued")
+        await cls._submit(job)
+
+    @classmethod
+    async def _submit(cls, job: dict):
+        job["enqueuedAt"] = time.perf_counter()
+        if cls.queue is None:
+            # Not started (scripts): run without a worker
+            await cls._run(job)
+            return
+        try:
+            cls.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            # Backpressure: the caller waits for its own job
+            Metrics.increment("jobs.overflow")
+            await cls._run(job)
+        Metrics.set_gauge("jobs.queue_depth", cls.queue.qsize())
+
+    @classmethod
+    async def _run(cls, job: dict):
+        """Run a job with retries, then delete or reschedule its outbox record"""
+        handler = cls.handlers[job["name"]]
+        Metrics.increment("jobs.wait_seconds", time.perf_counter() - job["enqueuedAt"])
+        error = None
+        for attempt in range(settings.background_job_max_attempts):
+            if attempt:
+                Metrics.increment("jobs.retried")
+                await asyncio.sleep(settings.background_job_retry_seconds * 2 ** (attempt - 1))
+            started = time.perf_counter()
+            try:
+                await handler(**job["payload"])
+            except Exception as e:
+                error = e
+                logger.warning("Background job %s failed (attempt %s): %s", job["name"], attempt + 1, e)
+                continue
+            Metrics.increment("jobs.completed")
+            Metrics.increment("jobs.run_seconds", time.perf_counter() - started)
+            Metrics.increment("jobs.latency_seconds", time.perf_counter() - job["enqueuedAt"])
+            if job["durable"]:
+                try:
+                    await get_job_outbox_repository().delete(job["_id"])
+                except Exception as e:
+                    # The sweeper runs it again once the lease expires
+                    logger.warning("Failed to delete completed job %s from the outbox: %s", job["_id"], e)
+            return
+
+        Metrics.increment("jobs.failed")
+        if not job["durable"]:
+            logger.error("Background job %s dropped after %s attempts: %s", job["name"], settings.background_job_max_attempts, error)
+            return
+        attempts = job["attempts"] + 1
+        if attempts >= settings.background_job_max_outbox_attempts:
+            run_after = None
+            Metrics.increment("jobs.dead")
+            logger.error("Background job %s (%s) is dead after %s runs: %s", job["_id"], job["name"], attempts, error)
+        else:
+            run_after = datetime.utcnow() + timedelta(seconds=settings.background_job_lease_seconds * 2 ** attempts)
+        try:
+            await get_job_outbox_repository().reschedule(job["_id"], run_after, attempts, str(error))
+        except Exception as e:
+            logger.warning("Failed to reschedule job %s: %s", job["_id"], e)
+
+    @classmethod
+    async def _worker(cls):
+        while True:
+            job = await cls.queue.get()
+            Metrics.set_gauge("jobs.queue_depth", cls.queue.qsize())
+            try:
+                await cls._run(job)
+            except Exception as e:
+                logger.error("Background job %s crashed: %s", job["name"], e)
+            finally:
+                cls.queue.task_done()
+
+    @classmethod
+    async def sweep(cls) -> int:
+        """
+        Queue the outbox jobs that are due (lease expired or retry time reached)
+
+        Returns:
+            Number of jobs queued
+        """
+        repository = get_job_outbox_repository()
+        recovered = 0
+        # Leave room in the queue for request jobs
+        while cls.queue is None or cls.queue.qsize() < cls.queue.maxsize // 2:
+            now = datetime.utcnow()
+            doc = await repository.claim_due(now, now + timedelta(seconds=settings.background_job_lease_seconds))
+            if doc is None:
+                break
+            if doc["name"] not in cls.handlers:
+                await repository.reschedule(doc["_id"], None, doc["attempts"], f"Unknown background job '{doc['name']}'")
+                continue
+            await cls._submit({"_id": doc["_id"], "name": doc["name"], "payload": doc["payload"], "attempts": doc["attempts"], "durable": True})
+            recovered += 1
+        if recovered:
+            Metrics.increment("jobs.recovered", recovered)
+            logger.info("Queued %s job(s) from the outbox", recovered)
+        return recovered
+
+    @classmethod
+    async def _sweep_loop(cls, interval: float):
+        while True:
+            try:
+                await cls.sweep()
+            except Exception as e:
+                logger.warning("Failed to sweep the job outbox: %s", e)
+            await asyncio.sleep(interval)
+
+    @classmethod
+    def start(cls):
+        """Start the job workers and the outbox sweeper (application startup)"""
+        cls.queue = asyncio.Queue(maxsize=settings.background_job_queue_size)
+        cls._workers = [asyncio.create_task(cls._worker()) for _ in range(settings.background_job_workers)]
+        cls._sweeper = asyncio.create_task(cls._sweep_loop(settings.background_job_sweep_seconds))
+
+    @classmethod
+    async def stop(cls):
+        """Finish queued jobs, waiting up to BACKGROUND_JOB_DRAIN_SECONDS, and stop the workers (application shutdown)"""
+        if cls._sweeper is not None:
+            cls._sweeper.cancel()
+            try:
+                await cls._sweeper
+            except asyncio.CancelledError:
+                pass
+            cls._sweeper = None
+        if cls.queue is None:
+            return
+        try:
+            await asyncio.wait_for(cls.queue.join(), settings.background_job_drain_seconds)
+        except asyncio.TimeoutError:
+            # Durable jobs are picked up from the outbox after a restart
+            logger.warning("Stopped with %s background job(s) still queued", cls.queue.qsize())
+        for worker in cls._workers:
+            worker.cancel()
+        await asyncio.gather(*cls._workers, return_exceptions=True)
+        cls._workers = []
+        cls.queue = None
+
+
+def background_job(name: str):
+    """
+    Register the decorated coroutine function as a background job
+
+    Args:
+        name: Job name passed to ``BackgroundJobs.enqueue``
+    """
+    def decorator(handler):
+        BackgroundJobs.register(name, handler)
+        return handler
+    return decorator
@@ -0,0 +1,217 @@
+"""
+Non-blocking structured logging
+
+Log records are put on a bounded queue by the thread that logs them and
+formatted and written by a background thread (``LogPipeline``), so logging
+on the event loop costs a queue put. Formatting is lazy: pass values as
+arguments (``logger.info("Retrieved %d courses", count)``) rather than as an
+f-string, and the message is only built on the writer thread, and not at all
+for records that are dropped. Arguments must not be mutated after logging.
+
+Records are written as one JSON object per line (``LOG_FORMAT=json``) and
+carry the ID of the request they were logged for (``X-Request-ID``, see
+``RequestIDMiddleware``). Info and debug records of hot routes are sampled
+per request with the ``log_sample_rate`` decorator; warnings and errors are
+always kept. When the queue is full, records are dropped and counted
+(``logging.dropped``) instead of blocking the request.
+"""
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from .metrics import Metrics
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+TEXT_LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes of every LogRecord, the others come from extra={...}
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "request_id", "http_method", "http_path"
+}
+
+# Request being served: {"request_id": str, "scope": dict, "sampled": bool | None}
+_current_request: ContextVar[dict | None] = ContextVar("log_request", default=None)
+
+
+def set_log_request(request_id: str, scope: dict):
+    """
+    Attach the records logged in the current context to a request
+
+    Args:
+        request_id: Request ID
+        scope: ASGI scope of the request (the router adds the endpoint)
+
+    Returns:
+        Token for ``reset_log_request``
+    """
+    return _current_request.set({"request_id": request_id, "scope": scope, "sampled": None})
+
+
+def reset_log_request(token):
+    """Detach the current context from its request"""
+    _current_request.reset(token)
+
+
+def current_request_id() -> str | None:
+    """Get the ID of the request being served, or None outside of a request"""
+    request = _current_request.get()
+    return request["request_id"] if request is not None else None
+
+
+def log_sample_rate(rate: float):
+    """
+    Keep only a fraction of a route's info and debug logs
+
+    The decision is made once per request, so a sampled request keeps all of
+    its records.
+
+    Usage:
+        @router.get("/")
+        @db_ops_budget(3)
+        @log_sample_rate(0.1)
+        async def get_courses(...):
+            ...
+
+    Args:
+        rate: Fraction of requests whose info and debug records are written
+    """
+    def decorator(func):
+        func.log_sample_rate = rate
+        return func
+    return decorator
+
+
+def get_log_sample_rate(endpoint) -> float:
+    """Get the sample rate declared for a route endpoint (1.0 if none)"""
+    return getattr(endpoint, "log_sample_rate", 1.0)
+
+
+class RequestContextFilter(logging.Filter):
+    """Tags records with their request and drops the info records of unsampled requests"""
+
+    def __init__(self, sampling: bool = True):
+        super().__init__()
+        self.sampling = sampling
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request = _current_request.get()
+        if request is None:
+            record.request_id = record.http_method = record.http_path = None
+            return True
+        scope = request["scope"]
+        record.request_id = request["request_id"]
+        record.http_method = scope.get("method")
+        record.http_path = scope.get("path")
+        if not self.sampling or record.levelno > logging.INFO:
+            return True
+        if request["sampled"] is None:
+            rate = get_log_sample_rate(scope.get("endpoint"))
+            request["sampled"] = rate >= 1 or random.random() < rate
+        if not request["sampled"]:
+            Metrics.increment("logging.sampled_out")
+        return request["sampled"]
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as one-line JSON objects"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None) is not None:
+            entry["requestId"] = record.request_id
+            entry["method"] = record.http_method
+            entry["path"] = record.http_path
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES and not name.startswith("_"):
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class LazyQueueHandler(QueueHandler):
+    """Queue handler that leaves formatting to the writer thread and never blocks"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The writer thread lives in this process: the record, its arguments
+        # and its traceback are handed over as they are
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            Metrics.increment("logging.dropped")
+
+
+class _LogWriter(QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room: the writer keeps draining the queue
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    """Root logger configuration: a queue handler and its writer thread"""
+
+    handler: LazyQueueHandler | None = None
+    _writer: _LogWriter | None = None
+
+    @classmethod
+    def configure(cls, level: str = "INFO", fmt: str = "json", queue_size: int = 10000, sampling: bool = True):
+        """
+        Route every log record through the queue (replaces the root handlers)
+
+        Args:
+            level: Root log level name
+            fmt: "json" or "text"
+            queue_size: Records buffered before new ones are dropped
+            sampling: Apply the routes' ``log_sample_rate``
+
+        Raises:
+            ValueError: If the format is unknown
+        """
+        if fmt not in ("json", "text"):
+            raise ValueError(f"Unknown log format '{fmt}', expected 'json' or 'text'")
+        cls.stop()
+
+        stream = logging.StreamHandler(sys.stderr)
+        stream.setFormatter(JSONFormatter() if fmt == "json" else logging.Formatter(TEXT_LOG_FORMAT))
+        records = queue.Queue(maxsize=queue_size)
+        cls.handler = LazyQueueHandler(records)
+        cls.handler.addFilter(RequestContextFilter(sampling))
+        cls._writer = _LogWriter(records, stream)
+
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(cls.handler)
+        root.setLevel(level.upper())
+        cls._writer.start()
+
+    @classmethod
+    def stop(cls):
+        """Write the queued records and stop the writer thread (process exit)"""
+        if cls._writer is None:
+            return
+        logging.getLogger().removeHandler(cls.handler)
+        cls._writer.stop()
+        cls._writer = None
+        cls.handler = None
+
+
+atexit.register(LogPipeline.stop)
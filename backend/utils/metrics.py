@@ -0,0 +1,55 @@
+"""
+Process-local metrics registry
+
+Counters and gauges are plain in-memory numbers, exposed as JSON by the
+``/metrics`` endpoint. Values are per worker process; aggregate across
+workers in the monitoring system.
+"""
+import threading
+
+
+class Metrics:
+    """Registry of named counters and gauges"""
+
+    counters: dict[str, float] = {}
+    gauges: dict[str, float] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def increment(cls, name: str, amount: float = 1):
+        """
+        Increase a counter
+
+        Args:
+            name: Counter name (dotted, e.g. "auth.login.rejected.ip")
+            amount: Amount to add
+        """
+        with cls._lock:
+            cls.counters[name] = cls.counters.get(name, 0) + amount
+
+    @classmethod
+    def set_gauge(cls, name: str, value: float):
+        """
+        Set a gauge to its current value
+
+        Args:
+            name: Gauge name
+            value: Current value
+        """
+        cls.gauges[name] = value
+
+    @classmethod
+    def get(cls, name: str) -> float:
+        """Get the current value of a counter or gauge (0 if unknown)"""
+        return cls.counters.get(name, cls.gauges.get(name, 0))
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        """
+        Get a copy of every metric
+
+        Returns:
+            Dict with "counters" and "gauges"
+        """
+        with cls._lock:
+            return {"counters": dict(cls.counters), "gauges": dict(cls.gauges)}
@@ -0,0 +1,140 @@
+"""
+Completed-module bitsets on enrollments
+
+Each enrollment carries the modules its learner completed as a bitset,
+``moduleBits`` (``{"<word>": int}``, MODULE_BITS_PER_WORD modules per word,
+missing words are zero), and their number, ``completedModuleCount``. Module
+completion sets the bit with ``$bit`` and increments the count with ``$inc``
+in one conditional update, next to the detailed ``module_completions``
+record, so progress percentage, full completion and the next module to take
+are read from the enrollment alone.
+
+``backfill_module_progress`` merges ``module_completions`` into the bitsets,
+streaming them in batches. Bits are only added, with a compare-and-set on
+each enrollment, so it is safe while learners complete modules. It runs once
+as a migration for enrollments created before the bitsets (one worker takes
+the migration lock) and can be re-run
+(``python -m backend.scripts.backfill_module_progress``) to repair them.
+"""
+from collections.abc import Iterable
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Modules per bitset word (words stay non-negative 64-bit integers for $bit)
+MODULE_BITS_PER_WORD = 32
+WORD_MASK = (1 << MODULE_BITS_PER_WORD) - 1
+
+# Enrollments merged per batch by the backfill
+BACKFILL_BATCH_SIZE = 1000
+
+
+def module_bit(module_index: int) -> tuple[str, int]:
+    """
+    Locate a module in the bitset
+
+    Args:
+        module_index: Index of the module in the syllabus
+
+    Returns:
+        (word key in "moduleBits", mask of the module's bit)
+    """
+    word, bit = divmod(module_index, MODULE_BITS_PER_WORD)
+    return str(word), 1 << bit
+
+
+def module_progress_fields(module_indexes: Iterable[int]) -> dict:
+    """
+    Build the bitset fields of an enrollment
+
+    Args:
+        module_indexes: Indexes of the completed modules
+
+    Returns:
+        {"moduleBits": ..., "completedModuleCount": ...}
+    """
+    words: dict[str, int] = {}
+    for module_index in set(module_indexes):
+        word, mask = module_bit(module_index)
+        words[word] = words.get(word, 0) | mask
+    return {"moduleBits": words, "completedModuleCount": sum(bin(bits).count("1") for bits in words.values())}
+
+
+def merge_module_bits(words: dict, module_indexes: Iterable[int]) -> dict:
+    """
+    Add completed modules to a bitset
+
+    Args:
+        words: Current "moduleBits" (not modified)
+        module_indexes: Indexes of modules to mark completed
+
+    Returns:
+        {"moduleBits": ..., "completedModuleCount": ...} of the merged bitset
+    """
+    merged = dict(words)
+    for word, bits in module_progress_fields(module_indexes)["moduleBits"].items():
+        merged[word] = merged.get(word, 0) | bits
+    return {"moduleBits": merged, "completedModuleCount": sum(bin(bits).count("1") for bits in merged.values())}
+
+
+def is_module_completed(enrollment: dict, module_index: int) -> bool:
+    """Check whether a module's bit is set on an enrollment"""
+    word, mask = module_bit(module_index)
+    return bool(enrollment.get("moduleBits", {}).get(word, 0) & mask)
+
+
+def completed_module_indexes(enrollment: dict, total_modules: int) -> list[int]:
+    """Get the completed module indexes of an enrollment, in syllabus order"""
+    words = enrollment.get("moduleBits", {})
+    return [
+        module_index for module_index in range(total_modules)
+        if words.get(str(module_index // MODULE_BITS_PER_WORD), 0) >> (module_index % MODULE_BITS_PER_WORD) & 1
+    ]
+
+
+def next_module_index(enrollment: dict, total_modules: int) -> int | None:
+    """
+    Find the first module of the syllabus not completed yet
+
+    Args:
+        enrollment: Enrollment document
+        total_modules: Number of modules in the syllabus
+
+    Returns:
+        Module index, or None if every module is completed
+    """
+    words = enrollment.get("moduleBits", {})
+    for word in range((total_modules + MODULE_BITS_PER_WORD - 1) // MODULE_BITS_PER_WORD):
+        free = ~words.get(str(word), 0) & WORD_MASK
+        if not free:
+            # Every module of the word is completed
+            continue
+        # Lowest clear bit of the word
+        module_index = word * MODULE_BITS_PER_WORD + (free & -free).bit_length() - 1
+        return module_index if module_index < total_modules else None
+    return None
+
+
+async def backfill_module_progress() -> int:
+    """
+    Merge module completions into the completed-module bitset of every enrollment
+
+    Returns:
+        Number of enrollments updated
+    """
+    # Imported here: the repositories use the bitset helpers above
+    from ..repositories import get_enrollments_repository, get_module_completions_repository
+
+    enrollments_repository = get_enrollments_repository()
+    updated = 0
+    batch = {}
+    async for key, module_indexes in get_module_completions_repository().iter_module_indexes_by_user_course():
+        batch[key] = module_indexes
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            updated += await enrollments_repository.merge_module_progress(batch)
+            batch = {}
+    if batch:
+        updated += await enrollments_repository.merge_module_progress(batch)
+    await enrollments_repository.initialize_module_progress()
+    logger.info("Backfilled completed-module bitsets of %s enrollment(s)", updated)
+    return updated
@@ -0,0 +1,175 @@
+"""
+Token-bucket rate limiting
+
+Buckets hold up to ``capacity`` tokens and refill continuously at
+``refill_per_second``; each attempt consumes one token. Buckets live in a
+pluggable store:
+
+- ``MemoryTokenBucketStore``: per-process, no I/O (single worker or sticky routing)
+- ``MongoTokenBucketStore``: shared by every worker, one atomic
+  ``findOneAndUpdate`` per check, expired buckets removed by a TTL index
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from ..config import settings
+from .db import Database
+from .metrics import Metrics
+import math
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketStore(ABC):
+    """Storage backend for token buckets"""
+
+    @abstractmethod
+    async def consume(self, key: str, capacity: float, refill_per_second: float) -> float:
+        """
+        Try to take one token from a bucket
+
+        Args:
+            key: Bucket key
+            capacity: Maximum number of tokens (burst size)
+            refill_per_second: Tokens added per second
+
+        Returns:
+            0 if the token was taken, otherwise seconds until one is available
+        """
+
+
+class MemoryTokenBucketStore(TokenBucketStore):
+    """Buckets kept in process memory, bounded to the most recently used keys"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self.buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def consume(self, key: str, capacity: float, refill_per_second: float) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self.buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+
+        if tokens >= 1:
+            tokens -= 1
+            retry_after = 0.0
+        else:
+            retry_after = (1 - tokens) / refill_per_second
+
+        self.buckets[key] = (tokens, now)
+        self.buckets.move_to_end(key)
+        if len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return retry_after
+
+
+class MongoTokenBucketStore(TokenBucketStore):
+    """Buckets shared across workers in the ``rate_limits`` collection"""
+
+    collection_name = "rate_limits"
+
+    async def consume(self, key: str, capacity: float, refill_per_second: float) -> float:
+        now = time.time()
+        # A bucket untouched long enough to refill completely can be forgotten
+        expires_at = datetime.utcnow() + timedelta(seconds=capacity / refill_per_second)
+        refilled = {
+            "$min": [
+                capacity,
+                {"$add": [
+                    {"$ifNull": ["$tokens", capacity]},
+                    {"$multiply": [{"$subtract": [now, {"$ifNull": ["$updatedAt", now]}]}, refill_per_second]}
+                ]}
+            ]
+        }
+        # Refill and consume atomically in a single pipeline update
+        bucket = await Database.get_collection(self.collection_name).find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updatedAt": now, "expiresAt": expires_at}},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]}}}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if bucket["allowed"]:
+            return 0.0
+        return (1 - bucket["tokens"]) / refill_per_second
+
+
+def normalize_email(email: str) -> str:
+    """Normalize an email address for use as a rate-limit key"""
+    return email.strip().lower()
+
+
+class LoginRateLimiter:
+    """
+    Limits login attempts per client IP and per target email
+
+    Checked before the user lookup and the bcrypt verification, so abusive
+    clients are rejected without spending CPU on password hashing.
+    """
+
+    def __init__(self, store: TokenBucketStore = None, ip_burst: float = 20, ip_per_minute: float = 10,
+                 email_burst: float = 5, email_per_minute: float = 2):
+        self.store = store or MemoryTokenBucketStore()
+        self.ip_burst = ip_burst
+        self.ip_rate = ip_per_minute / 60
+        self.email_burst = email_burst
+        self.email_rate = email_per_minute / 60
+
+    def configure(self, store_name: str):
+        """
+        Select the bucket store
+
+        Args:
+            store_name: "memory" or "mongo"
+
+        Raises:
+            ValueError: If the store is unknown
+        """
+        if store_name == "memory":
+            self.store = MemoryTokenBucketStore()
+        elif store_name == "mongo":
+            self.store = MongoTokenBucketStore()
+        else:
+            raise ValueError(f"Unknown rate limit store '{store_name}', expected 'memory' or 'mongo'")
+
+    async def check(self, client_ip: str | None, email: str) -> int:
+        """
+        Consume one login attempt for a client IP and an email
+
+        Args:
+            client_ip: Address of the client (None if unknown)
+            email: Email the client is trying to log in as
+
+        Returns:
+            0 if the attempt is allowed, otherwise whole seconds to wait (Retry-After)
+        """
+        if client_ip:
+            retry_after = await self.store.consume(f"login:ip:{client_ip}", self.ip_burst, self.ip_rate)
+            if retry_after > 0:
+                Metrics.increment("auth.login.rejected.ip")
+                logger.warning("Login rate limit exceeded for IP %s", client_ip)
+                return max(1, math.ceil(retry_after))
+
+        retry_after = await self.store.consume(f"login:email:{normalize_email(email)}", self.email_burst, self.email_rate)
+        if retry_after > 0:
+            Metrics.increment("auth.login.rejected.email")
+            logger.warning("Login rate limit exceeded for email %s", normalize_email(email))
+            return max(1, math.ceil(retry_after))
+
+        Metrics.increment("auth.login.allowed")
+        return 0
+
+
+# Shared limiter for POST /api/auth/login, store selected at startup
+login_rate_limiter = LoginRateLimiter(
+    ip_burst=settings.login_ip_burst,
+    ip_per_minute=settings.login_ip_per_minute,
+    email_burst=settings.login_email_burst,
+    email_per_minute=settings.login_email_per_minute
+)
@@ -0,0 +1,292 @@
+"""
+Course recommendations from co-enrollment
+
+Learners who took a course (enrolled in or completed it) form a sparse
+learner x course matrix ``X``. ``X.T @ X`` counts, for every pair of
+courses, the learners who took both; normalizing by the course sizes gives
+a cosine similarity that does not simply favour the most popular courses.
+
+The matrix is rebuilt every ``RECOMMENDATIONS_REFRESH_SECONDS`` and reduced
+to the top ``RECOMMENDATIONS_TOP_K`` similar courses per course. One worker
+builds it, holding a lease in ``recommendations_meta`` (or the
+``build_recommendations`` script does, offline), streaming the learner /
+course pairs into NumPy index arrays and stores the table in
+``course_similarities``. Every worker loads each new table version once, so
+serving "learners who took this also took" is a dictionary lookup and a
+learner's personalised list merges the lists of the courses they took.
+
+The matrix computation needs NumPy and SciPy (``recommendations`` extra).
+Without them, only the popularity fallback is available.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from ..config import settings
+from ..repositories import get_enrollments_repository, get_completions_repository, get_recommendations_repository
+from .metrics import Metrics
+import asyncio
+import heapq
+import logging
+
+try:
+    import numpy as np
+    from scipy import sparse
+    RECOMMENDATIONS_AVAILABLE = True
+except ImportError:
+    np = None
+    sparse = None
+    RECOMMENDATIONS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Popular courses kept for learners without co-enrollment signal
+POPULAR_COURSES_KEPT = 200
+
+# Learner/course pairs read from the database and encoded at a time
+PAIR_BATCH_SIZE = 10000
+
+
+class LearnerCoursePairs:
+    """
+    (learner, course) pairs encoded as NumPy index arrays as they stream in
+
+    Each pair costs 8 bytes of int32 indexes instead of a Python tuple, so
+    the build holds one entry per learner and per course, not per pair.
+    """
+
+    def __init__(self):
+        self.learner_index: dict = {}
+        self.course_index: dict = {}
+        self.count = 0
+        self._rows: list = []
+        self._cols: list = []
+
+    def add(self, pairs: list[tuple]):
+        """
+        Encode a batch of pairs
+
+        Args:
+            pairs: (learner ID, course ID) pairs; duplicates are counted once
+        """
+        learners, courses = self.learner_index, self.course_index
+        self._rows.append(np.fromiter((learners.setdefault(learner, len(learners)) for learner, _ in pairs), dtype=np.int32, count=len(pairs)))
+        self._cols.append(np.fromiter((courses.setdefault(course, len(courses)) for _, course in pairs), dtype=np.int32, count=len(pairs)))
+        self.count += len(pairs)
+
+    def arrays(self) -> tuple:
+        """Get the (learner indexes, course indexes) arrays of every pair"""
+        if not self._rows:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        rows, cols = np.concatenate(self._rows), np.concatenate(self._cols)
+        self._rows, self._cols = [rows], [cols]
+        return rows, cols
+
+
+def build_similarity_table(pairs: LearnerCoursePairs, top_k: int, min_co_enrollments: int = 2) -> tuple[dict[str, list[tuple[str, float]]], list[str]]:
+    """
+    Compute the most similar courses of every course from learner/course pairs
+
+    Args:
+        pairs: Encoded (learner ID, course ID) pairs
+        top_k: Similar courses kept per course
+        min_co_enrollments: Minimum number of shared learners for two courses to be similar
+
+    Returns:
+        Tuple of (similar courses by course ID as [(course ID, score), ...]
+        by decreasing score, course IDs by decreasing number of learners)
+    """
+    course_ids = [str(course) for course in pairs.course_index]
+    if not course_ids:
+        return {}, []
+    rows, cols = pairs.arrays()
+
+    taken = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(len(pairs.learner_index), len(course_ids))
+    )
+    taken.sum_duplicates()
+    taken.data[:] = 1  # Enrolled and completed counts once
+    learners_per_course = np.asarray(taken.sum(axis=0)).ravel()
+
+    co_enrollments = (taken.T @ taken).tocsr()
+    co_enrollments.setdiag(0)
+    co_enrollments.data[co_enrollments.data < min_co_enrollments] = 0
+    co_enrollments.eliminate_zeros()
+
+    # Cosine similarity: shared learners / sqrt(learners of each course)
+    inverse_norms = sparse.diags(1 / np.sqrt(np.maximum(learners_per_course, 1)))
+    similarity = (inverse_norms @ co_enrollments @ inverse_norms).tocsr()
+
+    table: dict[str, list[tuple[str, float]]] = {}
+    for row in range(similarity.shape[0]):
+        start, end = similarity.indptr[row], similarity.indptr[row + 1]
+        if start == end:
+            continue
+        scores = similarity.data[start:end]
+        columns = similarity.indices[start:end]
+        if end - start > top_k:
+            best = np.argpartition(-scores, top_k)[:top_k]
+            scores, columns = scores[best], columns[best]
+        order = np.argsort(-scores, kind="stable")
+        table[course_ids[row]] = [
+            (course_ids[column], round(float(score), 4))
+            for column, score in zip(columns[order], scores[order])
+        ]
+
+    popular = [course_ids[column] for column in np.argsort(-learners_per_course, kind="stable")[:POPULAR_COURSES_KEPT]]
+    return table, popular
+
+
+def rank_by_popularity(pairs: set[tuple]) -> list[str]:
+    """Get course IDs by decreasing number of distinct learners (no NumPy needed)"""
+    counts = Counter(str(course) for _, course in pairs)
+    return [course_id for course_id, _ in counts.most_common(POPULAR_COURSES_KEPT)]
+
+
+class Recommendations:
+    """Per-process copy of the shared similar-courses table, kept current in the background"""
+
+    similar: dict[str, list[tuple[str, float]]] = {}
+    popular: list[str] = []
+    built_at: datetime | None = None
+    # Version of the stored table loaded by this worker
+    version: int | None = None
+    _task: asyncio.Task | None = None
+
+    @classmethod
+    async def build(cls) -> int:
+        """
+        Rebuild the similarity table from enrollments and completions and store it
+
+        Returns:
+            Version of the stored table
+        """
+        if RECOMMENDATIONS_AVAILABLE:
+            pairs = LearnerCoursePairs()
+        else:
+            pairs = set()
+        count = 0
+        for repository in (get_enrollments_repository(), get_completions_repository()):
+            async for batch in repository.iter_user_course_pairs(PAIR_BATCH_SIZE):
+                count += len(batch)
+                if RECOMMENDATIONS_AVAILABLE:
+                    await asyncio.to_thread(pairs.add, batch)
+                else:
+                    pairs.update(batch)
+
+        if RECOMMENDATIONS_AVAILABLE:
+            similar, popular = await asyncio.to_thread(
+                build_similarity_table,
+                pairs,
+                settings.recommendations_top_k,
+                settings.recommendations_min_co_enrollments
+            )
+        else:
+            similar, popular = {}, await asyncio.to_thread(rank_by_popularity, pairs)
+        del pairs
+
+        version = await get_recommendations_repository().save_table(similar, popular, datetime.utcnow())
+        logger.info("Recommendations table %s built from %s enrollment(s)/completion(s) (%s course(s) with similar courses)", version, count, len(similar))
+        return version
+
+    @classmethod
+    async def sync(cls):
+        """Load the stored table if a newer version was built"""
+        repository = get_recommendations_repository()
+        meta = await repository.find_current()
+        if meta is None or meta["version"] == cls.version:
+            return
+        similar = await repository.find_table(meta["version"])
+
+        # Swap whole tables so readers never see a partial refresh
+        cls.similar, cls.popular = similar, meta["popular"]
+        cls.built_at = meta["builtAt"]
+        cls.version = meta["version"]
+        Metrics.set_gauge("recommendations.courses_with_similar", len(similar))
+        logger.info("Recommendations table %s loaded (%s course(s) with similar courses)", cls.version, len(similar))
+
+    @classmethod
+    async def refresh(cls):
+        """Rebuild the table if it is due and no other worker is on it, then load the latest version"""
+        if settings.recommendations_build_in_workers:
+            now = datetime.utcnow()
+            claimed = await get_recommendations_repository().claim_build(
+                now,
+                now - timedelta(seconds=settings.recommendations_refresh_seconds),
+                now + timedelta(seconds=settings.recommendations_build_lease_seconds)
+            )
+            if claimed:
+                # A failed build is retried by any worker once the lease expires
+                await cls.build()
+        await cls.sync()
+
+    @classmethod
+    def similar_to(cls, course_id: str, limit: int = 5) -> list[tuple[str, float]]:
+        """
+        Get the courses most often taken by learners of a course
+
+        Args:
+            course_id: Course ID
+            limit: Maximum number of courses
+
+        Returns:
+            [(course ID, similarity), ...] by decreasing similarity
+        """
+        return cls.similar.get(course_id, [])[:limit]
+
+    @classmethod
+    def recommend_for(cls, taken: set[str], limit: int = 10) -> tuple[list[tuple[str, float]], bool]:
+        """
+        Recommend courses to a learner from the courses they took
+
+        Sums the similarity of every candidate to each course the learner
+        took, then tops up with the most popular courses.
+
+        Args:
+            taken: IDs of the courses the learner enrolled in or completed
+            limit: Maximum number of courses
+
+        Returns:
+            Tuple of ([(course ID, score), ...] by decreasing score, whether
+            any recommendation came from co-enrollment)
+        """
+        scores: dict[str, float] = {}
+        for course_id in taken:
+            for other_id, similarity in cls.similar.get(course_id, ()):
+                if other_id not in taken:
+                    scores[other_id] = scores.get(other_id, 0.0) + similarity
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+        personalized = bool(ranked)
+
+        for course_id in cls.popular:
+            if len(ranked) >= limit:
+                break
+            if course_id not in taken and course_id not in scores:
+                ranked.append((course_id, 0.0))
+        return ranked, personalized
+
+    @classmethod
+    async def _refresh_loop(cls, interval: float):
+        while True:
+            try:
+                await cls.refresh()
+            except Exception as e:
+                logger.warning("Failed to refresh recommendations: %s", e)
+            await asyncio.sleep(interval)
+
+    @classmethod
+    def start(cls):
+        """Load the table and keep it current in the background (application startup)"""
+        if not RECOMMENDATIONS_AVAILABLE and settings.recommendations_build_in_workers:
+            logger.warning("NumPy/SciPy not installed, course recommendations fall back to popularity")
+        cls._task = asyncio.create_task(cls._refresh_loop(settings.recommendations_poll_seconds))
+
+    @classmethod
+    async def stop(cls):
+        """Stop the background refresh (application shutdown)"""
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
@@ -0,0 +1,181 @@
+"""
+Access and refresh token revocation
+
+Every token carries a unique ``jti`` claim. Revoking a token stores its
+``jti`` in the ``revoked_tokens`` collection until the token would have
+expired (a TTL index removes it afterwards).
+
+Each worker mirrors the revoked IDs in an in-process Bloom filter, synced
+incrementally every ``TOKEN_REVOCATION_SYNC_SECONDS``. A token whose ``jti``
+is not in the filter is definitely not revoked, which is the answer for
+almost every request and costs a few hash lookups. Only a possible match
+(a revoked token, or a rare false positive) is confirmed against the
+database.
+
+Revocations made by another worker take effect here after at most one
+sync interval; revocations made by this worker take effect immediately.
+Each incremental sync re-reads the last ``TOKEN_REVOCATION_SYNC_OVERLAP_SECONDS``
+before the previous one: ``revokedAt`` is stamped by the revoking worker's
+clock before its insert commits, so a revocation committed late or stamped
+by a host whose clock lags would otherwise fall before the window for good.
+"""
+from datetime import datetime, timedelta
+from ..config import settings
+from ..repositories import get_revoked_tokens_repository
+from .metrics import Metrics
+import asyncio
+import hashlib
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings
+
+    Sized for ``capacity`` items at a target false positive rate; positions
+    come from double hashing a single 128-bit BLAKE2b digest.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + index * second) % self.size for index in range(self.hash_count))
+
+    def add(self, item: str):
+        """Add an item (adding it again does not count towards capacity)"""
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class TokenRevocationList:
+    """Per-process view of revoked token IDs"""
+
+    bloom: BloomFilter | None = None
+    synced_until: datetime | None = None
+    _task: asyncio.Task | None = None
+
+    @classmethod
+    def _new_filter(cls) -> BloomFilter:
+        return BloomFilter(settings.token_revocation_bloom_capacity, settings.token_revocation_bloom_error_rate)
+
+    @classmethod
+    async def sync(cls, full: bool = False):
+        """
+        Add revocations recorded since the last sync to the Bloom filter
+
+        The filter is rebuilt from scratch when no sync has succeeded yet or
+        when it holds more items than it was sized for, which also drops
+        revocations that have since expired.
+
+        Args:
+            full: Rebuild the filter from every unexpired revocation
+        """
+        if cls.bloom is None or cls.synced_until is None or cls.bloom.count > cls.bloom.capacity:
+            full = True
+        # Query from the start of the sync so revocations written meanwhile are not skipped,
+        # re-reading an overlap for late commits and clock skew (re-adding is harmless)
+        started_at = datetime.utcnow()
+        since = None if full else cls.synced_until - timedelta(seconds=settings.token_revocation_sync_overlap_seconds)
+        revoked = await get_revoked_tokens_repository().find_revoked_since(since)
+
+        bloom = cls._new_filter() if full else cls.bloom
+        for doc in revoked:
+            bloom.add(doc["_id"])
+        cls.bloom = bloom
+        cls.synced_until = started_at
+
+        Metrics.set_gauge("auth.revocation.bloom_items", bloom.count)
+        if full:
+            logger.info("Token revocation filter rebuilt with %s revoked token(s)", len(revoked))
+
+    @classmethod
+    async def revoke(cls, jti: str, expires_at: datetime) -> bool:
+        """
+        Revoke a token
+
+        Args:
+            jti: Token ID
+            expires_at: Token expiry, after which the revocation can be forgotten
+
+        Returns:
+            False if the token had already been revoked
+        """
+        revoked = await get_revoked_tokens_repository().insert(jti, expires_at)
+        # Without a synced filter every check goes to the database: a filter
+        # holding only this worker's revocations would clear everyone else's
+        if cls.bloom is not None:
+            cls.bloom.add(jti)
+        Metrics.increment("auth.revocation.revoked" if revoked else "auth.revocation.already_revoked")
+        return revoked
+
+    @classmethod
+    async def is_revoked(cls, jti: str | None) -> bool:
+        """
+        Check whether a token has been revoked
+
+        Args:
+            jti: Token ID (None for tokens issued before token IDs existed)
+
+        Returns:
+            True if the token is revoked
+        """
+        if jti is None:
+            return False
+        if cls.bloom is not None and jti not in cls.bloom:
+            Metrics.increment("auth.revocation.filter_negative")
+            return False
+
+        # Possible match (or no filter yet): confirm against the database
+        revoked = await get_revoked_tokens_repository().exists(jti)
+        Metrics.increment("auth.revocation.confirmed" if revoked else "auth.revocation.false_positive")
+        return revoked
+
+    @classmethod
+    async def _sync_loop(cls, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await cls.sync()
+            except Exception as e:
+                logger.warning("Failed to sync token revocations: %s", e)
+
+    @classmethod
+    async def start(cls):
+        """Load the revocation filter and start the periodic sync (application startup)"""
+        try:
+            await cls.sync(full=True)
+        except Exception as e:
+            # Without a filter every check goes to the database until a sync succeeds
+            logger.warning("Failed to load token revocations: %s", e)
+        cls._task = asyncio.create_task(cls._sync_loop(settings.token_revocation_sync_seconds))
+
+    @classmethod
+    async def stop(cls):
+        """Stop the periodic sync (application shutdown)"""
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
@@ -0,0 +1,216 @@
+"""
+In-memory full-text course search
+
+An inverted index over the searchable course fields maps each term to the
+courses containing it and the term's field-weighted frequency. Queries are
+ranked with BM25 over those weighted frequencies, so a match in the title
+counts more than one in the description.
+
+The index is derived from the catalog cache and kept in step with it
+incrementally: when the catalog version changes, only the courses whose
+``updatedAt`` changed (or that were added or removed) are re-indexed.
+"""
+from collections import defaultdict
+import heapq
+import math
+import re
+import unicodedata
+
+# Field weights: a term in the title is worth three in the description
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "instructor": 2.0,
+    "syllabus": 1.5,
+    "objectives": 1.0,
+    "description": 1.0,
+}
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how in into is it its of on or that the this to with you your".split()
+)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Lower-case text and strip accents
+
+    Args:
+        text: Text to normalize
+
+    Returns:
+        Normalized text
+    """
+    text = text.lower()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split text into normalized search terms, without stopwords
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        Terms in order of appearance
+    """
+    return [token for token in TOKEN_PATTERN.findall(normalize_text(text)) if token not in STOPWORDS]
+
+
+def course_field_texts(course: dict) -> dict[str, str]:
+    """Get the searchable text of each indexed field of a course document"""
+    return {
+        "title": course.get("title", ""),
+        "instructor": course.get("instructor", ""),
+        "syllabus": " ".join(course.get("syllabus", [])),
+        "objectives": " ".join(course.get("objectives", [])),
+        "description": course.get("description", ""),
+    }
+
+
+class CourseSearchIndex:
+    """Inverted index with BM25 ranking over course documents"""
+
+    def __init__(self, courses: list[dict] = ()):
+        self.postings: dict[str, dict[str, float]] = defaultdict(dict)
+        self.doc_terms: dict[str, dict[str, float]] = {}
+        self.doc_lengths: dict[str, float] = {}
+        self.levels: dict[str, str] = {}
+        self.signatures: dict[str, object] = {}
+        self.total_length = 0.0
+        self.version: str | None = None
+        # BM25 length normalization per course, recomputed after changes
+        self._norms: dict[str, float] | None = None
+        for course in courses:
+            self.add(course)
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, course: dict):
+        """
+        Index a course, replacing any previous version of it
+
+        Args:
+            course: Course document
+        """
+        course_id = str(course["_id"])
+        if course_id in self.doc_lengths:
+            self.remove(course_id)
+
+        terms: dict[str, float] = defaultdict(float)
+        for field, text in course_field_texts(course).items():
+            weight = FIELD_WEIGHTS[field]
+            for term in tokenize(text):
+                terms[term] += weight
+
+        for term, frequency in terms.items():
+            self.postings[term][course_id] = frequency
+        length = sum(terms.values())
+        self.doc_terms[course_id] = dict(terms)
+        self.doc_lengths[course_id] = length
+        self.levels[course_id] = course.get("level")
+        self.signatures[course_id] = course.get("updatedAt")
+        self.total_length += length
+        self._norms = None
+
+    def remove(self, course_id: str):
+        """
+        Remove a course from the index
+
+        Args:
+            course_id: Course ID
+        """
+        terms = self.doc_terms.pop(course_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self.postings[term]
+            postings.pop(course_id, None)
+            if not postings:
+                del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(course_id)
+        self.levels.pop(course_id, None)
+        self.signatures.pop(course_id, None)
+        self._norms = None
+
+    def sync(self, courses: list[dict], version: str | None = None) -> int:
+        """
+        Bring the index in line with a catalog snapshot
+
+        Only courses that were added, removed or whose ``updatedAt`` changed
+        are re-indexed.
+
+        Args:
+            courses: Every course document of the catalog
+            version: Catalog version of the snapshot
+
+        Returns:
+            Number of courses added, updated or removed
+        """
+        changed = 0
+        seen = set()
+        for course in courses:
+            course_id = str(course["_id"])
+            seen.add(course_id)
+            if course_id not in self.signatures or self.signatures[course_id] != course.get("updatedAt"):
+                self.add(course)
+                changed += 1
+        for course_id in [course_id for course_id in self.doc_lengths if course_id not in seen]:
+            self.remove(course_id)
+            changed += 1
+        self.version = version
+        return changed
+
+    def search(self, query: str, level: str | None = None, offset: int = 0, limit: int = 20) -> tuple[int, list[tuple[str, float]]]:
+        """
+        Rank courses matching any query term with BM25
+
+        Args:
+            query: Free-text query
+            level: Only return courses of this level
+            offset: Number of ranked results to skip
+            limit: Maximum number of results to return
+
+        Returns:
+            Tuple of (total number of matches, [(course ID, score), ...])
+        """
+        terms = set(tokenize(query))
+        count = len(self.doc_lengths)
+        if not terms or not count:
+            return 0, []
+
+        norms = self._norms
+        if norms is None:
+            average_length = self.total_length / count or 1.0
+            norms = {
+                course_id: BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                for course_id, length in self.doc_lengths.items()
+            }
+            self._norms = norms
+
+        scores: dict[str, float] = {}
+        get_score = scores.get
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            weight = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5)) * (BM25_K1 + 1)
+            for course_id, frequency in postings.items():
+                scores[course_id] = get_score(course_id, 0.0) + weight * frequency / (frequency + norms[course_id])
+
+        if level is not None:
+            scores = {course_id: score for course_id, score in scores.items() if self.levels.get(course_id) == level}
+
+        # Ties broken by course ID so pagination is stable
+        ranked = heapq.nlargest(offset + limit, scores.items(), key=lambda item: (item[1], item[0]))
+        return len(scores), ranked[offset:]
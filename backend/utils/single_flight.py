@@ -0,0 +1,66 @@
+"""
+Single-flight coalescing of identical concurrent reads
+
+When many requests need the same document at once (a popular course just
+launched, one user's tabs all loading), each would send its own query. A
+``SingleFlight`` group lets the first caller for a key run the query and
+every caller arriving while it is in flight await the same result, so a
+thundering herd costs one round trip per key. Nothing is cached: the entry
+is dropped as soon as the query finishes.
+
+Only coalesce reads that may be slightly older than the caller's own writes,
+and do not mutate the shared result. Coalesced calls are counted in
+``singleflight.<name>.coalesced`` (``/metrics``).
+"""
+from collections.abc import Awaitable, Callable, Hashable
+from typing import TypeVar
+from .metrics import Metrics
+import asyncio
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Group of keyed calls, at most one in flight per key"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run a call, or join the one already in flight for the same key
+
+        The call runs as its own task, so a caller being cancelled (client
+        disconnected) does not cancel it for the others.
+
+        Args:
+            key: Identity of the call (e.g. the document ID)
+            call: Coroutine function making the call
+
+        Returns:
+            Result of the call, shared by every caller of the flight
+
+        Raises:
+            Exception: Whatever the call raised, for every caller of the flight
+        """
+        task = self._calls.get(key)
+        if task is None:
+            Metrics.increment(f"singleflight.{self.name}.executed")
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            Metrics.increment(f"singleflight.{self.name}.coalesced")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Retrieved here in case every caller was cancelled
+            task.exception()
+
+    def in_flight(self) -> int:
+        """Get the number of keys with a call in flight"""
+        return len(self._calls)
@@ -0,0 +1,269 @@
+"""
+In-memory typeahead suggestions for course titles and instructors
+
+Every word start of a course title or instructor name ("modern web
+development", "web development", "development", ...) is normalized and kept
+in one sorted array, so the keys starting with a prefix form a contiguous
+range found with two bisections.
+
+Short prefixes match a large share of the catalog, so the top suggestions
+for every prefix of up to ``CACHED_PREFIX_LENGTH`` characters are kept
+precomputed. Suggestions are ranked by enrollment count, which only ever
+grows: a course can only enter a cached top list by overtaking its last
+entry, so enrollments update those lists incrementally.
+
+A catalog change touching a few courses is applied key by key; a larger one
+(a bulk import) rebuilds the sorted array and the top lists in one pass,
+since each single insertion shifts the whole array.
+"""
+from bisect import bisect_left, insort
+from .search import normalize_text, TOKEN_PATTERN
+import heapq
+
+# Prefixes up to this length are served from precomputed top lists
+CACHED_PREFIX_LENGTH = 5
+
+# Suggestions kept per cached prefix (the maximum "limit" of a lookup)
+MAX_SUGGESTIONS = 20
+
+MAX_KEY_CHAR = "\uffff"
+
+# Syncs changing more courses than this rebuild the index in one pass
+MAX_INCREMENTAL_SYNC_CHANGES = 32
+
+
+def normalize_key(text: str) -> str:
+    """
+    Normalize text for prefix matching (lower-case, no accents or punctuation)
+
+    Args:
+        text: Title, name or typed prefix
+
+    Returns:
+        Words separated by single spaces
+    """
+    return " ".join(TOKEN_PATTERN.findall(normalize_text(text)))
+
+
+def word_start_keys(text: str) -> list[str]:
+    """Get the normalized text from each of its word starts"""
+    words = normalize_key(text).split(" ")
+    return [" ".join(words[index:]) for index in range(len(words)) if words[index]]
+
+
+class CourseSuggestIndex:
+    """Sorted prefix index over course titles and instructor names"""
+
+    def __init__(self, courses: list[dict] = (), popularity: dict[str, int] = None):
+        # (key, course ID, field) sorted by key
+        self.entries: list[tuple[str, str, str]] = []
+        self.course_keys: dict[str, list[tuple[str, str, str]]] = {}
+        self.signatures: dict[str, object] = {}
+        self.popularity: dict[str, int] = dict(popularity or {})
+        self.top: dict[str, list[str]] = {}
+        self.version: str | None = None
+
+        for course in courses:
+            course_id = str(course["_id"])
+            self.course_keys[course_id] = self._keys(course)
+            self.signatures[course_id] = course.get("updatedAt")
+            self.entries.extend(self.course_keys[course_id])
+        self.entries.sort()
+        self._build_top()
+
+    def __len__(self) -> int:
+        return len(self.course_keys)
+
+    @staticmethod
+    def _keys(course: dict) -> list[tuple[str, str, str]]:
+        course_id = str(course["_id"])
+        keys = {(key, course_id, "title") for key in word_start_keys(course.get("title", ""))}
+        keys |= {(key, course_id, "instructor") for key in word_start_keys(course.get("instructor", ""))}
+        return sorted(keys)
+
+    def _rank(self, course_id: str) -> tuple[int, str]:
+        return self.popularity.get(course_id, 0), course_id
+
+    def _prefixes(self, course_id: str) -> set[str]:
+        return {
+            key[:length]
+            for key, _, _ in self.course_keys.get(course_id, ())
+            for length in range(1, min(CACHED_PREFIX_LENGTH, len(key)) + 1)
+        }
+
+    def _range(self, prefix: str) -> list[tuple[str, str, str]]:
+        start = bisect_left(self.entries, (prefix,))
+        end = bisect_left(self.entries, (prefix + MAX_KEY_CHAR,), start)
+        return self.entries[start:end]
+
+    def _scan(self, prefix: str, limit: int) -> list[str]:
+        matches = {course_id for _, course_id, _ in self._range(prefix)}
+        return heapq.nlargest(limit, matches, key=self._rank)
+
+    def _build_top(self):
+        candidates: dict[str, set[str]] = {}
+        for course_id in self.course_keys:
+            for prefix in self._prefixes(course_id):
+                candidates.setdefault(prefix, set()).add(course_id)
+        self.top = {
+            prefix: heapq.nlargest(MAX_SUGGESTIONS, course_ids, key=self._rank)
+            for prefix, course_ids in candidates.items()
+        }
+
+    def _offer(self, course_id: str):
+        """Re-rank a course whose popularity grew in the cached lists of its prefixes"""
+        rank = self._rank(course_id)
+        for prefix in self._prefixes(course_id):
+            top = self.top.setdefault(prefix, [])
+            if course_id not in top:
+                if len(top) >= MAX_SUGGESTIONS and rank <= self._rank(top[-1]):
+                    continue
+                top.append(course_id)
+            top.sort(key=self._rank, reverse=True)
+            del top[MAX_SUGGESTIONS:]
+
+    def add(self, course: dict):
+        """
+        Index a course, replacing any previous version of it
+
+        Args:
+            course: Course document
+        """
+        course_id = str(course["_id"])
+        if course_id in self.course_keys:
+            self.remove(course_id)
+        self.course_keys[course_id] = self._keys(course)
+        self.signatures[course_id] = course.get("updatedAt")
+        for entry in self.course_keys[course_id]:
+            insort(self.entries, entry)
+        self._offer(course_id)
+
+    def remove(self, course_id: str):
+        """
+        Remove a course from the index
+
+        Args:
+            course_id: Course ID
+        """
+        prefixes = self._prefixes(course_id)
+        for entry in self.course_keys.pop(course_id, ()):
+            position = bisect_left(self.entries, entry)
+            if position < len(self.entries) and self.entries[position] == entry:
+                del self.entries[position]
+        self.signatures.pop(course_id, None)
+        # The course may have held a slot another course should now take
+        for prefix in prefixes:
+            if course_id in self.top.get(prefix, ()):
+                self.top[prefix] = self._scan(prefix, MAX_SUGGESTIONS)
+                if not self.top[prefix]:
+                    del self.top[prefix]
+
+    def sync(self, courses: list[dict], version: str | None = None) -> int:
+        """
+        Bring the index in line with a catalog snapshot
+
+        Args:
+            courses: Every course document of the catalog
+            version: Catalog version of the snapshot
+
+        Returns:
+            Number of courses added, updated or removed
+        """
+        seen = set()
+        updated = []
+        for course in courses:
+            course_id = str(course["_id"])
+            seen.add(course_id)
+            if course_id not in self.signatures or self.signatures[course_id] != course.get("updatedAt"):
+                updated.append(course)
+        removed = [course_id for course_id in self.course_keys if course_id not in seen]
+
+        if len(updated) + len(removed) > MAX_INCREMENTAL_SYNC_CHANGES:
+            self._rebuild(updated, removed)
+        else:
+            for course in updated:
+                self.add(course)
+            for course_id in removed:
+                self.remove(course_id)
+        self.version = version
+        return len(updated) + len(removed)
+
+    def _rebuild(self, updated: list[dict], removed: list[str]):
+        """Apply many changes at once: merge the new keys into the sorted array, then rebuild the top lists"""
+        replaced = set(removed)
+        for course_id in removed:
+            del self.course_keys[course_id]
+            self.signatures.pop(course_id, None)
+        added = []
+        for course in updated:
+            course_id = str(course["_id"])
+            replaced.add(course_id)
+            self.course_keys[course_id] = self._keys(course)
+            self.signatures[course_id] = course.get("updatedAt")
+            added.extend(self.course_keys[course_id])
+        added.sort()
+        self.entries = list(heapq.merge((entry for entry in self.entries if entry[1] not in replaced), added))
+        self._build_top()
+
+    def increment_popularity(self, course_id: str, amount: int = 1):
+        """
+        Record new enrollments in a course
+
+        Args:
+            course_id: Course ID
+            amount: Number of new enrollments (must be positive)
+        """
+        if amount <= 0:
+            return
+        self.popularity[course_id] = self.popularity.get(course_id, 0) + amount
+        if course_id in self.course_keys:
+            self._offer(course_id)
+
+    def merge_popularity(self, counts: dict[str, int]) -> int:
+        """
+        Catch up with enrollment counts recorded elsewhere (e.g. other workers)
+
+        Counts lower than the ones already known are ignored, so popularity
+        never decreases and the cached top lists stay exact.
+
+        Args:
+            counts: Enrollment count by course ID
+
+        Returns:
+            Number of courses whose popularity grew
+        """
+        grown = 0
+        for course_id, count in counts.items():
+            delta = count - self.popularity.get(course_id, 0)
+            if delta > 0:
+                self.increment_popularity(course_id, delta)
+                grown += 1
+        return grown
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[tuple[str, str]]:
+        """
+        Get the most popular courses whose title or instructor has a word starting with a prefix
+
+        Args:
+            prefix: Typed text (normalized like the indexed keys)
+            limit: Maximum number of suggestions (at most MAX_SUGGESTIONS)
+
+        Returns:
+            [(course ID, matched field), ...] by decreasing popularity
+        """
+        key = normalize_key(prefix)
+        if not key:
+            return []
+        limit = min(limit, MAX_SUGGESTIONS)
+
+        if len(key) <= CACHED_PREFIX_LENGTH:
+            course_ids = self.top.get(key, [])[:limit]
+        else:
+            course_ids = self._scan(key, limit)
+
+        # Report the field that matched, preferring the title
+        suggestions = []
+        for course_id in course_ids:
+            fields = {field for course_key, _, field in self.course_keys[course_id] if course_key.startswith(key)}
+            suggestions.append((course_id, "title" if "title" in fields else "instructor"))
+        return suggestions
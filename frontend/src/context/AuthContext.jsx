@@ -3,7 +3,7 @@
  * Provides authentication state and functions across the application
  */
 import React, { createContext, useContext, useState, useEffect } from 'react';
-import { authAPI } from '../services/api';
+import { authAPI, storeTokens } from '../services/api';
 
 // Create Authentication Context
 const AuthContext = createContext();
@@ -77,7 +77,7 @@ export const AuthProvider = ({ children }) => {
         setUser(userData);
         
         // Store in localStorage
-        localStorage.setItem('authToken', authToken);
+        storeTokens(response);
         localStorage.setItem('userData', JSON.stringify(userData));
         
         return { success: true };
@@ -112,7 +112,7 @@ export const AuthProvider = ({ children }) => {
         setUser(userData);
         
         // Store in localStorage
-        localStorage.setItem('authToken', authToken);
+        storeTokens(response);
         localStorage.setItem('userData', JSON.stringify(userData));
         
         return { success: true };
@@ -130,11 +130,17 @@ export const AuthProvider = ({ children }) => {
    * Logout user
    */
   const logout = () => {
+    // Revoke tokens server-side (best effort, local state is cleared regardless)
+    if (localStorage.getItem('authToken')) {
+      authAPI.logout().catch(() => {});
+    }
     setUser(null);
     setToken(null);
     setError(null);
     localStorage.removeItem('authToken');
+    localStorage.removeItem('refreshToken');
     localStorage.removeItem('userData');
+    localStorage.removeItem('causalToken');
   };
 
   /**
@@ -145,7 +151,7 @@ export const AuthProvider = ({ children }) => {
   };
 
   /**
-   * Refresh current user data
+   * Refresh current user data (and tokens, so their claims carry current points)
    * @returns {Promise<boolean>} Success status
    */
   const refreshUser = async () => {
@@ -153,12 +159,12 @@ export const AuthProvider = ({ children }) => {
       console.log('refreshUser called, token:', !!token);
       if (!token) return false;
       
-      console.log('Fetching current user...');
-      const currentUser = await authAPI.getCurrentUser();
+      console.log('Refreshing tokens and current user...');
+      const { token: authToken, user: currentUser } = await authAPI.refresh();
       console.log('Current user data:', currentUser);
       
+      setToken(authToken);
       setUser(currentUser);
-      localStorage.setItem('userData', JSON.stringify(currentUser));
       return true;
     } catch (error) {
       console.error('Error refreshing user data:', error);
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, Link } from 'react-router-dom';
-import api from '../services/api';
+import api, { courseAPI } from '../services/api';
 import LoadingSpinner from '../components/LoadingSpinner';
 import { useToast } from '../context/ToastContext';
 import { useAuth } from '../context/AuthContext';
@@ -44,12 +44,22 @@ const CourseDetailPage = () => {
     }
   }, [id]);
 
+  // Live progress from the user's other tabs and devices
+  useEffect(() => {
+    if (!id) return undefined;
+    return courseAPI.subscribeToProgressEvents(({ type, data }) => {
+      if (type === 'resync' || data.courseId === id) {
+        fetchProgress();
+      }
+    });
+  }, [id]);
+
   const handleEnroll = async () => {
     try {
       setEnrolling(true);
       setError(null);
       
-      await api.post(`/api/courses/${id}/enroll`);
+      await courseAPI.enrollInCourse(id);
       
       // Show success toast
       showSuccess(`Successfully enrolled in "${course?.title}"!`);
@@ -78,8 +88,7 @@ const CourseDetailPage = () => {
     try {
       setError(null);
       
-      const response = await api.post(`/api/courses/${id}/modules/${moduleIndex}/complete`);
-      const completionData = response.data;
+      const completionData = await courseAPI.completeModule(id, moduleIndex);
       
       // Refresh user data to get updated points
       if (refreshUser && typeof refreshUser === 'function') {
@@ -96,9 +105,6 @@ const CourseDetailPage = () => {
       
       await fetchProgress();
       
-      const updatedProgress = await api.get(`/api/courses/${id}/progress`);
-      setProgress(updatedProgress.data);
-      
     } catch (err) {
       const errorMessage = err.response?.data?.detail || 'Failed to mark module as completed';
       showError(errorMessage);
@@ -344,6 +350,26 @@ const CourseDetailPage = () => {
                 ))}
               </div>
             </div>
+
+            {course.alsoTaken?.length > 0 && (
+              <div className="mb-8">
+                <h2 className="text-xl font-semibold text-gray-900 mb-4">Learners Also Took</h2>
+                <div className="grid grid-cols-1 md:grid-cols-2 gap-3">
+                  {course.alsoTaken.map((related) => (
+                    <Link
+                      key={related.id}
+                      to={`/courses/${related.id}`}
+                      className="block p-4 border border-gray-200 rounded-lg hover:bg-gray-50 transition-colors"
+                    >
+                      <div className="font-medium text-gray-900">{related.title}</div>
+                      <div className="text-sm text-gray-600">
+                        {related.instructor} · {related.level}
+                      </div>
+                    </Link>
+                  ))}
+                </div>
+              </div>
+            )}
           </div>
 
           {/* Action Button at Bottom */}
@@ -2,16 +2,76 @@
  * Course List Page Component
  * Displays list of available courses
  */
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
+import { useNavigate } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
-import api from '../services/api';
+import api, { courseAPI } from '../services/api';
 import CourseCard from '../components/CourseCard';
 
+// Wait for a pause in typing before asking for suggestions
+const SUGGEST_DEBOUNCE_MS = 150;
+
 const CourseListPage = () => {
   const { user, refreshUser } = useAuth();
   const [courses, setCourses] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [query, setQuery] = useState('');
+  const [suggestions, setSuggestions] = useState([]);
+  const [searchResultIds, setSearchResultIds] = useState(null);
+  const latestSuggestRequest = useRef(0);
+  const navigate = useNavigate();
+
+  // Search-as-you-type: debounced, and only the latest response is shown
+  useEffect(() => {
+    const prefix = query.trim();
+    if (!prefix) {
+      setSuggestions([]);
+      return undefined;
+    }
+    const timer = setTimeout(async () => {
+      const requestId = ++latestSuggestRequest.current;
+      try {
+        const results = await courseAPI.suggestCourses(prefix);
+        if (requestId === latestSuggestRequest.current) {
+          setSuggestions(results);
+        }
+      } catch (err) {
+        console.error('Error fetching suggestions:', err);
+      }
+    }, SUGGEST_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [query]);
+
+  const handleSearch = async (event) => {
+    event.preventDefault();
+    const text = query.trim();
+    latestSuggestRequest.current += 1;
+    setSuggestions([]);
+    if (!text) {
+      setSearchResultIds(null);
+      return;
+    }
+    try {
+      const response = await courseAPI.searchCourses(text, { pageSize: 100 });
+      setSearchResultIds(response.results.map((result) => result.id));
+    } catch (err) {
+      console.error('Error searching courses:', err);
+      setError(err.response?.data?.detail || 'Failed to search courses');
+    }
+  };
+
+  const clearSearch = () => {
+    setQuery('');
+    setSuggestions([]);
+    setSearchResultIds(null);
+  };
+
+  // Search results keep their ranking but use the list entries (with progress)
+  const coursesById = new Map(courses.map((course) => [course.id, course]));
+  const visibleCourses = searchResultIds
+    ? searchResultIds.map((id) => coursesById.get(id)).filter(Boolean)
+    : courses;
 
   useEffect(() => {
     const loadData = async () => {
@@ -158,10 +218,55 @@ const CourseListPage = () => {
           </div>
         )}
 
+        {/* Course Search */}
+        <form onSubmit={handleSearch} className="mb-8 relative">
+          <div className="flex gap-2">
+            <input
+              type="search"
+              value={query}
+              onChange={(event) => setQuery(event.target.value)}
+              placeholder="Search courses, topics or instructors..."
+              className="flex-1 rounded-lg border border-gray-300 px-4 py-2 focus:outline-none focus:ring-2 focus:ring-blue-500"
+              autoComplete="off"
+            />
+            <button type="submit" className="rounded-lg bg-blue-600 px-4 py-2 text-white hover:bg-blue-700">
+              Search
+            </button>
+            {searchResultIds && (
+              <button type="button" onClick={clearSearch} className="rounded-lg border border-gray-300 px-4 py-2 text-gray-700 hover:bg-gray-100">
+                Show all
+              </button>
+            )}
+          </div>
+          {suggestions.length > 0 && (
+            <ul className="absolute z-10 mt-1 w-full rounded-lg border border-gray-200 bg-white shadow-lg">
+              {suggestions.map((suggestion) => (
+                <li key={suggestion.id}>
+                  <button
+                    type="button"
+                    onClick={() => navigate(`/courses/${suggestion.id}`)}
+                    className="w-full px-4 py-2 text-left hover:bg-gray-50"
+                  >
+                    <span className="font-medium text-gray-900">{suggestion.title}</span>
+                    <span className="ml-2 text-sm text-gray-500">
+                      {suggestion.instructor} · {suggestion.level}
+                    </span>
+                  </button>
+                </li>
+              ))}
+            </ul>
+          )}
+        </form>
+
         {/* Courses Grid - Responsive: 1 col mobile, 2 col tablet, 3 col desktop */}
-        {courses.length > 0 ? (
+        {searchResultIds && visibleCourses.length === 0 ? (
+          <div className="text-center py-16">
+            <h3 className="text-xl font-medium text-gray-900 mb-2">No courses match "{query}"</h3>
+            <p className="text-gray-500 text-lg">Try different keywords.</p>
+          </div>
+        ) : visibleCourses.length > 0 ? (
           <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 gap-6 lg:gap-8">
-            {courses.map((course) => (
+            {visibleCourses.map((course) => (
               <CourseCard key={course.id} course={course} />
             ))}
           </div>
@@ -19,6 +19,11 @@ api.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    // Lets whichever server handles the request see our latest writes
+    const causalToken = localStorage.getItem('causalToken');
+    if (causalToken) {
+      config.headers['X-Causal-Token'] = causalToken;
+    }
     return config;
   },
   (error) => {
@@ -26,19 +31,71 @@ api.interceptors.request.use(
   }
 );
 
-// Response interceptor to handle 401 errors (logout user)
+/**
+ * Store tokens returned by login, signup or refresh
+ * @param {object} data - Authentication response
+ */
+export const storeTokens = (data) => {
+  localStorage.setItem('authToken', data.token);
+  if (data.refreshToken) {
+    localStorage.setItem('refreshToken', data.refreshToken);
+  }
+};
+
+// Single in-flight refresh shared by concurrent requests that got a 401
+let refreshPromise = null;
+
+const refreshAccessToken = () => {
+  if (!refreshPromise) {
+    const refreshToken = localStorage.getItem('refreshToken');
+    refreshPromise = (refreshToken
+      ? axios.post(`${api.defaults.baseURL}/api/auth/refresh`, { refreshToken }).then((response) => {
+          storeTokens(response.data);
+          localStorage.setItem('userData', JSON.stringify(response.data.user));
+          return response.data;
+        })
+      : Promise.reject(new Error('No refresh token'))
+    ).finally(() => {
+      refreshPromise = null;
+    });
+  }
+  return refreshPromise;
+};
+
+// Response interceptor to handle 401 errors (refresh the access token once, then logout user)
 api.interceptors.response.use(
-  (response) => response,
-  (error) => {
+  (response) => {
+    const causalToken = response.headers['x-causal-token'];
+    if (causalToken) {
+      localStorage.setItem('causalToken', causalToken);
+    }
+    return response;
+  },
+  async (error) => {
     // Only auto-logout on 401 if it's not a login or signup attempt
     if (error.response?.status === 401) {
       const isAuthEndpoint = error.config?.url?.includes('/auth/login') || 
-                            error.config?.url?.includes('/auth/signup');
+                            error.config?.url?.includes('/auth/signup') ||
+                            error.config?.url?.includes('/auth/refresh') ||
+                            error.config?.url?.includes('/auth/logout');
+      
+      // Access tokens are short-lived: retry once with a refreshed token
+      if (!isAuthEndpoint && !error.config._retried) {
+        try {
+          await refreshAccessToken();
+          error.config._retried = true;
+          return api(error.config);
+        } catch (refreshError) {
+          // Fall through to logout
+        }
+      }
       
       if (!isAuthEndpoint) {
         // Clear authentication data
         localStorage.removeItem('authToken');
+        localStorage.removeItem('refreshToken');
         localStorage.removeItem('userData');
+        localStorage.removeItem('causalToken');
         
         // Redirect to login page (if not already there)
         if (window.location.pathname !== '/login') {
@@ -50,6 +107,28 @@ api.interceptors.response.use(
   }
 );
 
+/**
+ * POST that is safe to retry: the same Idempotency-Key is sent with every
+ * attempt, so the server replays its first response instead of running the
+ * action twice. Retries only on network errors (no response received).
+ * @param {string} url - Endpoint URL
+ * @param {number} retries - Retries after the first attempt
+ * @returns {Promise} Axios response
+ */
+const postIdempotent = async (url, retries = 2) => {
+  const headers = { 'Idempotency-Key': crypto.randomUUID() };
+  for (let attempt = 0; ; attempt += 1) {
+    try {
+      return await api.post(url, null, { headers });
+    } catch (error) {
+      if (error.response || attempt >= retries) {
+        throw error;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 500 * 2 ** attempt));
+    }
+  }
+};
+
 // Authentication API calls
 export const authAPI = {
   /**
@@ -85,13 +164,32 @@ export const authAPI = {
   },
 
   /**
-   * Get current user information
+   * Get current user information (points as of the last token refresh)
    * @returns {Promise} API response
    */
   getCurrentUser: async () => {
     const response = await api.get('/api/auth/me');
     return response.data;
   },
+
+  /**
+   * Revoke the current access and refresh tokens
+   * @returns {Promise} API response
+   */
+  logout: async () => {
+    const response = await api.post('/api/auth/logout', {
+      refreshToken: localStorage.getItem('refreshToken'),
+    });
+    return response.data;
+  },
+
+  /**
+   * Exchange the stored refresh token for new tokens and current user data
+   * @returns {Promise} API response
+   */
+  refresh: async () => {
+    return refreshAccessToken();
+  },
 };
 
 // Course API calls (placeholder for future implementation)
@@ -105,6 +203,44 @@ export const courseAPI = {
     return response.data.courses; // Extract courses array from the response
   },
 
+  /**
+   * Full-text course search
+   * @param {string} query - Search text
+   * @param {object} options - Optional level, page and pageSize
+   * @returns {Promise} API response
+   */
+  searchCourses: async (query, options = {}) => {
+    const response = await api.get('/api/courses/search', {
+      params: { q: query, ...options },
+    });
+    return response.data;
+  },
+
+  /**
+   * Typeahead suggestions for course titles and instructors
+   * @param {string} prefix - Text typed so far
+   * @param {number} limit - Maximum number of suggestions
+   * @returns {Promise} API response
+   */
+  suggestCourses: async (prefix, limit = 8) => {
+    const response = await api.get('/api/courses/suggest', {
+      params: { prefix, limit },
+    });
+    return response.data.suggestions;
+  },
+
+  /**
+   * Courses recommended from what learners with similar enrollments took
+   * @param {number} limit - Maximum number of courses
+   * @returns {Promise} API response
+   */
+  getRecommendedCourses: async (limit = 10) => {
+    const response = await api.get('/api/courses/recommended', {
+      params: { limit },
+    });
+    return response.data;
+  },
+
   /**
    * Get course by ID
    * @param {string} courseId - Course ID
@@ -121,7 +257,7 @@ export const courseAPI = {
    * @returns {Promise} API response
    */
   markCourseComplete: async (courseId) => {
-    const response = await api.post(`/api/courses/${courseId}/complete`);
+    const response = await postIdempotent(`/api/courses/${courseId}/complete`);
     return response.data;
   },
 
@@ -131,7 +267,7 @@ export const courseAPI = {
    * @returns {Promise} API response
    */
   enrollInCourse: async (courseId) => {
-    const response = await api.post(`/api/courses/${courseId}/enroll`);
+    const response = await postIdempotent(`/api/courses/${courseId}/enroll`);
     return response.data;
   },
 
@@ -152,9 +288,75 @@ export const courseAPI = {
    * @returns {Promise} API response
    */
   completeModule: async (courseId, moduleIndex) => {
-    const response = await api.post(`/api/courses/${courseId}/modules/${moduleIndex}/complete`);
+    const response = await postIdempotent(`/api/courses/${courseId}/modules/${moduleIndex}/complete`);
     return response.data;
   },
+
+  /**
+   * Receive the user's progress events (from every tab and device) as they happen
+   * Reconnects with backoff and refreshes the access token when it expires
+   * @param {function} onEvent - Called with { type, data } for each event
+   * @returns {function} Closes the stream
+   */
+  subscribeToProgressEvents: (onEvent) => {
+    const controller = new AbortController();
+    let retryDelay = 1000;
+
+    const dispatch = (message) => {
+      let type = 'message';
+      const dataLines = [];
+      message.split('\n').forEach((line) => {
+        if (line.startsWith('event:')) {
+          type = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+          dataLines.push(line.slice(5).trim());
+        }
+      });
+      if (dataLines.length > 0) {
+        onEvent({ type, data: JSON.parse(dataLines.join('\n')) });
+      }
+    };
+
+    const connect = async () => {
+      while (!controller.signal.aborted) {
+        try {
+          const response = await fetch(`${api.defaults.baseURL}/api/courses/events`, {
+            headers: { Authorization: `Bearer ${localStorage.getItem('authToken')}` },
+            signal: controller.signal,
+          });
+          if (response.status === 401) {
+            await refreshAccessToken();
+            continue;
+          }
+          if (!response.ok) {
+            throw new Error(`Event stream failed with status ${response.status}`);
+          }
+
+          retryDelay = 1000;
+          const reader = response.body.getReader();
+          const decoder = new TextDecoder();
+          let buffer = '';
+          for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const messages = buffer.split('\n\n');
+            buffer = messages.pop();
+            messages.forEach(dispatch);
+          }
+        } catch (error) {
+          if (controller.signal.aborted) return;
+        }
+        // Missed events while disconnected: ask the page to reload its progress
+        onEvent({ type: 'resync', data: {} });
+        await new Promise((resolve) => setTimeout(resolve, retryDelay));
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      }
+    };
+
+    connect();
+    return () => controller.abort();
+  },
 };
 
 // Health check